@@ -0,0 +1,233 @@
+"""
+Assembly
+Tree of detector components. Each Component holds (optionally) a
+PhysicalVolume, repeated count times, and the components it contains.
+The mass, activities and self-shielded activities of each component and
+of its subtree (Totals) are computed on demand and cached per node.
+
+Updating a component (its volume, thickness, count...) invalidates its own
+values and the totals of its ancestors only: the rest of the tree keeps
+its cached values. A cached total implies cached totals in the whole
+subtree, so the invalidation stops at the first ancestor already dirty.
+"""
+from collections import namedtuple
+from . system_of_units import *
+from . PhysicalVolume import PhysicalVolume
+from . CylindricalVessel import CylindricalVessel, CVD
+
+Totals = namedtuple('Totals', """mass activity_bi214 activity_tl208
+                                 self_shield_bi214 self_shield_tl208""")
+
+ZERO = Totals(0, 0, 0, 0, 0)
+
+
+def _sum(totals):
+    result = ZERO
+    for t in totals:
+        result = Totals(*(a + b for a, b in zip(result, t)))
+    return result
+
+
+class Component:
+    """Node of an assembly. volume is a PhysicalVolume (or None for a pure
+    container), self-shielded with thickness (by default the thickness of
+    its shape); activity (an Activity) is added without self-shielding,
+    e.g, for resistors. volume and activity count count times, and only
+    a fraction of the activities is counted (the solid angle towards the
+    active volume, 0.5 for the field cage as in NextFieldCage).
+    """
+
+    def __init__(self, name, volume=None, thickness=None, count=1, activity=None, children=(),
+                 fraction=1):
+        self.name        = name
+        self.parent      = None
+        self.children    = []
+        self.volume      = volume
+        self.thickness   = thickness
+        self.count       = count
+        self.activity    = activity
+        self.fraction    = fraction
+        self.evaluations = 0     # number of times own values were computed
+        self._own        = None
+        self._total      = None
+        for child in children:
+            self.add(child)
+
+    def add(self, child):
+        """Adds child (detaching it from its former parent) and returns it"""
+        if child.parent is not None:
+            child.parent.remove(child)
+        if any(c.name == child.name for c in self.children):
+            raise ValueError('{} already contains {}'.format(self.name, child.name))
+        child.parent = self
+        self.children.append(child)
+        self._invalidate_total()
+        return child
+
+    def remove(self, child):
+        self.children.remove(child)
+        child.parent = None
+        self._invalidate_total()
+
+    def update(self, **attributes):
+        """Sets attributes (volume, thickness, count, activity, fraction) and
+        invalidates the values of this component and its ancestors
+        """
+        for name, value in attributes.items():
+            if name not in ('volume', 'thickness', 'count', 'activity', 'fraction'):
+                raise AttributeError('cannot update {} of a Component'.format(name))
+            setattr(self, name, value)
+        self._own = None
+        self._invalidate_total()
+
+    def _invalidate_total(self):
+        node = self
+        while node is not None and node._total is not None:
+            node._total = None
+            node        = node.parent
+
+    def __getitem__(self, path):
+        """Descendant at path ('copper_shield/body')"""
+        node = self
+        for name in path.split('/'):
+            try:
+                node = next(c for c in node.children if c.name == name)
+            except StopIteration:
+                raise KeyError('{} has no component {}'.format(node.path, name))
+        return node
+
+    @property
+    def path(self):
+        return self.name if self.parent is None else self.parent.path + '/' + self.name
+
+    def walk(self, depth=0):
+        """(depth, component) of this component and its descendants, depth first"""
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def _compute_own(self):
+        self.evaluations += 1
+        own = ZERO
+        if self.volume is not None:
+            v = self.volume
+            z = v.thickness if self.thickness is None else self.thickness
+            own = Totals(mass              = v.mass,
+                         activity_bi214    = v.activity_bi214,
+                         activity_tl208    = v.activity_tl208,
+                         self_shield_bi214 = v.activity_bi214_self_shield(z),
+                         self_shield_tl208 = v.activity_tl208_self_shield(z))
+        if self.activity is not None:
+            a   = self.activity
+            own = _sum([own, Totals(0, a.bi214, a.tl208, a.bi214, a.tl208)])
+        f = self.fraction
+        return Totals(own.mass * self.count, *(x * self.count * f for x in own[1:]))
+
+    @property
+    def own(self):
+        """Totals of the component alone"""
+        if self._own is None:
+            self._own = self._compute_own()
+        return self._own
+
+    @property
+    def total(self):
+        """Totals of the component and its descendants"""
+        if self._total is None:
+            self._total = _sum([self.own] + [c.total for c in self.children])
+        return self._total
+
+    @property
+    def mass(self):
+        return self.total.mass
+
+    @property
+    def activity_bi214(self):
+        return self.total.activity_bi214
+
+    @property
+    def activity_tl208(self):
+        return self.total.activity_tl208
+
+    def __str__(self):
+        s = '{:40s} {:>12s} {:>14s} {:>14s}\n'.format('component', 'mass (kg)',
+                                                      'Bi-214 (mBq)', 'Tl-208 (mBq)')
+        for depth, c in self.walk():
+            t = c.total
+            s += '{:40s} {:12.4g} {:14.4g} {:14.4g}\n'.format(
+                 '  ' * depth + c.name, t.mass / kg, t.activity_bi214 / mBq, t.activity_tl208 / mBq)
+        return s
+
+    __repr__ = __str__
+
+
+class Vessel(Component):
+    """Cylindrical vessel (see CylindricalVessel) of dimensions cvd: a body
+    and two heads, self-shielded with their thicknesses. resize(**changes)
+    changes dimensions of the cvd (e.g, th_body) and updates both.
+    """
+
+    def __init__(self, name, material, cvd, children=()):
+        super().__init__(name)
+        self.material = material
+        self.cvd      = cvd
+        self.body     = self.add(Component('body'))
+        self.heads    = self.add(Component('heads', count=2))
+        self._set_volumes()
+        for child in children:
+            self.add(child)
+
+    def _set_volumes(self):
+        cvd = self.cvd
+        self.body.update(volume    = PhysicalVolume(self.name, self.material,
+                                                    CylindricalVessel._body_shape(cvd)),
+                         thickness = cvd.th_body)
+        self.heads.update(volume    = PhysicalVolume(self.name, self.material,
+                                                     CylindricalVessel._head_shape(cvd)),
+                          thickness = cvd.th_head)
+
+    def resize(self, **changes):
+        self.cvd = self.cvd._replace(**changes)
+        self._set_volumes()
+
+    def set_material(self, material):
+        self.material = material
+        self._set_volumes()
+
+
+def next100_assembly(data=None):
+    """NEXT-100 as an assembly: lead shield, pressure vessel, inner copper
+    shield and field cage (poly shell, electrodes and resistors), with the
+    dimensions of data (a NextPVData, the default one if None). As in
+    NextFieldCage, half of the activity of the field cage is counted.
+    """
+    from . NextData import NextPVData
+    from . Material import ti316, cu12, pb, poly
+    from . Shapes import CylinderShell
+    from . activity_functions import Activity
+
+    d = NextPVData() if data is None else data
+
+    def vessel(name, material, R, th_body, L, th_head):
+        return Vessel(name, material, CVD(name=name, R=R, th_body=th_body, L=L, th_head=th_head))
+
+    def shell(name, material, inner_diameter, thickness, length):
+        Rin = inner_diameter / 2
+        return PhysicalVolume(name, material, CylinderShell(Rin, Rin + thickness, length))
+
+    fc_length, pitch = 1300 * mm, 12 * mm
+    field_cage = Component('field_cage', shell('field_cage', poly, 1050 * mm, 20 * mm, fc_length),
+                           fraction=0.5, children=[
+        Component('electrodes', shell('electrode', cu12, 1050 * mm, 6 * mm, 10 * mm),
+                  count=fc_length / pitch, fraction=0.5),
+        Component('resistors', count=2 * fc_length / pitch, fraction=0.5,
+                  activity=Activity(name='resistor', bi214=17.9 * muBq, tl208=3.1 * muBq))])
+
+    return Component('next100', children=[
+        vessel('lead_shield', pb, d.pb_inner_radius, d.pb_body_thickness, d.pb_length,
+               d.pb_head_thickness),
+        vessel('pressure_vessel', ti316, d.pv_inner_radius, d.pv_body_thickness, d.pv_length,
+               d.pv_head_thickness),
+        vessel('copper_shield', cu12, d.cs_inner_radius, d.cs_body_thickness, d.cs_length,
+               d.cs_head_thickness),
+        field_cage])
@@ -0,0 +1,74 @@
+from . Assembly import Component, Vessel, next100_assembly
+from . NextData import next100_PV, next100_copper_shield
+from . PhysicalVolume import PhysicalVolume
+from . Material import pb
+from . Shapes import Brick
+from pynext.system_of_units import *
+
+from pytest import approx
+import pytest
+
+
+def test_next100_assembly():
+    a  = next100_assembly()
+    pv = next100_PV()
+    assert a['pressure_vessel/body'].mass  == approx(pv.body_mass)
+    assert a['pressure_vessel/heads'].mass == approx(2 * pv.head_mass)
+    assert a['pressure_vessel'].total.self_shield_bi214 == approx(
+           pv.body_self_shield_activity_bi214 + 2 * pv.head_self_shield_activity_bi214)
+    assert a.mass == approx(sum(c.mass for c in a.children))
+    assert a['field_cage/resistors'].mass == 0
+    assert a['field_cage'].activity_bi214 > a['field_cage'].own.activity_bi214
+    assert 'copper_shield' in str(a)
+    with pytest.raises(KeyError):
+        a['copper_shield/lid']
+
+
+def test_incremental_update():
+    a = next100_assembly()
+    a.total
+    evaluations = {c.path: c.evaluations for _, c in a.walk()}
+    mass        = a.mass
+
+    cu = a['copper_shield']
+    cu.resize(th_body=60 * mm)
+    assert a._total is None and a['lead_shield']._total is not None
+    a.total
+    changed = {c.path for _, c in a.walk() if c.evaluations != evaluations[c.path]}
+    assert changed == {'next100/copper_shield/body', 'next100/copper_shield/heads'}
+
+    ref = next100_copper_shield()
+    ref.cvd = ref.cvd._replace(th_body=60 * mm)
+    assert cu['body'].mass == approx(ref.body_mass)
+    assert a.mass == approx(mass - next100_copper_shield().body_mass + ref.body_mass)
+
+
+def test_tree_edits():
+    brick = PhysicalVolume('brick', pb, Brick(10 * cm, 10 * cm, 20 * cm))
+    root  = Component('castle')
+    wall  = root.add(Component('wall', brick, thickness=10 * cm, count=10))
+    assert root.mass == approx(10 * brick.mass)
+    wall.update(count=20)
+    assert root.mass == approx(20 * brick.mass)
+    other = Component('other')
+    other.add(wall)
+    assert wall.parent is other and root.mass == 0
+    with pytest.raises(ValueError):
+        other.add(Component('wall'))
+    with pytest.raises(AttributeError):
+        wall.update(name='tower')
+
+
+def test_field_cage_activity():
+    """Same activities as the field cage of src/activity_field_cage.py"""
+    import os
+    import runpy
+    src = os.path.join(os.path.dirname(__file__), '..', 'src', 'activity_field_cage.py')
+    ref = runpy.run_path(src)['field_cage_activity']().set_index('name')
+    fc  = next100_assembly()['field_cage']
+    for name, c in (('ActivityElectrodesFC', fc['electrodes']),
+                    ('ActivityResistorsFC',  fc['resistors']),
+                    ('ActivityPoly',         fc)):
+        assert c.own.activity_bi214 / mBq == approx(ref.loc[name, 'bi214'])
+        assert c.own.activity_tl208 / mBq == approx(ref.loc[name, 'tl208'])
+    assert fc.mass == approx(fc.own.mass + fc['electrodes'].mass)
@@ -14,10 +14,12 @@ from . Material import RadioactiveMaterial
 from . activity_functions import Activity
 from . activity_functions import CVA
 from pynext.activity_functions import str_activity
+from . cache import CacheInfo
 from collections import namedtuple
 
 # Cylindrical Vessel Dimensions (CVD)
 CVD = namedtuple('CVD', 'name R th_body L th_head')
+CV  = namedtuple('CV', 'name material body head')
 
 
 
@@ -149,19 +151,49 @@ class CylindricalVessel:
            body is a cylindrical shell
            head is a disk
            cvd is namedtuple (CVD = Cylindrical Vessel Dimensions)
+
+           Derived quantities are cached by the body and head physical volumes.
+           Assigning a new material or cvd updates them and invalidates the caches.
            """
 
-        CV = namedtuple('CV', 'name material body head')
+        self._cvd = cvd
+        self.cv = CV(name     = name,
+                     material = material,
+                     body     = PhysicalVolume(name, material, self._body_shape(cvd)),
+                     head     = PhysicalVolume(name, material, self._head_shape(cvd)))
 
-        self.cvd = cvd
-        Rout = cvd.R + cvd.th_body
-        cs =   CylinderShell(Rin=cvd.R, Rout=Rout, L=cvd.L)
-        ch =   Disk         (R=cvd.R, t=cvd.th_head)
+    @staticmethod
+    def _body_shape(cvd):
+        return CylinderShell(Rin=cvd.R, Rout=cvd.R + cvd.th_body, L=cvd.L)
 
-        self.cv = CV(name = name,
-                     material = material,
-                     body     = PhysicalVolume(name, material, cs),
-                     head     = PhysicalVolume(name, material, ch))
+    @staticmethod
+    def _head_shape(cvd):
+        return Disk(R=cvd.R, t=cvd.th_head)
+
+    @property
+    def cvd(self):
+        return self._cvd
+
+    @cvd.setter
+    def cvd(self, cvd):
+        self._cvd = cvd
+        self.cv.body.shape = self._body_shape(cvd)
+        self.cv.head.shape = self._head_shape(cvd)
+
+    @property
+    def material(self):
+        return self.cv.material
+
+    @material.setter
+    def material(self, material):
+        self.cv = self.cv._replace(material=material)
+        self.cv.body.material = material
+        self.cv.head.material = material
+
+    def cache_info(self):
+        """Hits, misses and size of the caches of body and head"""
+        body, head = self.cv.body.cache_info(), self.cv.head.cache_info()
+        return CacheInfo(*(b + h for b, h in zip(body, head)))
 
     @property
     def name(self):
@@ -251,13 +283,20 @@ class CylindricalVessel:
     def head_transmittance(self):
         return self.cv.head.transmittance(self.cvd.th_head)
 
+    def body_transmittance_at(self, E):
+        """Transmittance of the body for gammas of energy E (scalar or array)"""
+        return self.cv.body.transmittance_at(E, self.cvd.th_body)
+
+    def head_transmittance_at(self, E):
+        return self.cv.head.transmittance_at(E, self.cvd.th_head)
+
     @property
     def body_absorption(self):
-        return self.cv.absorption_at_qbb(self.cvd.th_body)
+        return self.cv.body.absorption(self.cvd.th_body)
 
     @property
     def head_absorption(self):
-        return self.cv.absorption_at_qbb(self.cvd.th_head)
+        return self.cv.head.absorption(self.cvd.th_head)
 
     def __str__(self):
 
@@ -127,3 +127,28 @@ def test_pv_properties(next100pv):
     assert pv.radius / mm                     == approx(1360 / 2, rel=1e-3)
     assert pv.body_thickness / mm            == approx(10, rel=1e-3)
     assert pv.head_thickness / mm            == approx(12, rel=1e-3)
+
+
+def test_cache_invalidation():
+    npvd = NextPVData()
+    cvd  = CVD(name    = 'Next100PV',
+               R       = npvd.pv_inner_radius,
+               th_body = npvd.pv_body_thickness,
+               L       = npvd.pv_length,
+               th_head = npvd.pv_head_thickness)
+    pv = CylindricalVessel(name=cvd.name, material=ti316, cvd=cvd)
+
+    str(pv)
+    info = pv.cache_info()
+    str(pv)
+    assert pv.cache_info().misses == info.misses
+    assert pv.cache_info().hits   >  info.hits
+
+    pv.cvd = cvd._replace(th_body = 2 * cvd.th_body)
+    att = attenuation_factor(ti316.mu, 2 * cvd.th_body)
+    assert pv.body_self_shield_activity_bi214  == approx(pv.body_activity_bi214 * att, rel=1e-5)
+    assert pv.body_transmittance == approx(exp(-2 * cvd.th_body * ti316.mu), rel=1e-5)
+
+    pv.material = pb
+    assert pv.body_mass == approx(pv.cv.body.shape.V * pb.rho, rel=1e-5)
+    assert pv.head_absorption == approx(1 - exp(-cvd.th_head * pb.mu), rel=1e-5)
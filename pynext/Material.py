@@ -3,9 +3,12 @@ Material
 Defines a material medium
 """
 from . system_of_units import *
+from . MaterialsData import materials_data, data_file_stamp, DATA_VERSION
+from . cache import load_array, save_array
+from . Shapes import Shape, Cylinder
+from . frozen import Frozen
 from math import pi, exp, log
 import numpy as np
-from scipy.integrate import quad
 
 
 class SelfAtt:
@@ -18,15 +21,34 @@ class SelfAtt:
         a2 = np.exp(-self.mu * self.L / np.cos(theta))
         return a1 * (1 - a2)
 
-class PhysicalMaterial:
-    """mu_over_rho is the mass attenuation coefficient at 2.5 MeV"""
-    def __init__(self, name, rho, mu_over_rho):
+class PhysicalMaterial(Frozen):
+    """mu_over_rho is the mass attenuation coefficient at 2.5 MeV.
+    mu_over_rho_table (optional) is a pair (energies, mass attenuation
+    coefficients) used by the energy-dependent methods (transmittance,
+    absorption...), which interpolate it in log-log scale. Without a table
+    they use mu_over_rho at all energies.
 
-        self.name        = name
-        self.rho         = rho
-        self.mu_over_rho = mu_over_rho
-        self.mu          = mu_over_rho * rho
-        self.Latt        = 1 / self.mu
+    Materials are immutable values (see Frozen): material.replace(rho=...)
+    returns a modified copy.
+    """
+    __slots__ = ('name', 'rho', 'mu_over_rho', 'mu_over_rho_table', '_loglog')
+
+    def __init__(self, name, rho, mu_over_rho, mu_over_rho_table=None):
+
+        self._init(name              = name,
+                   rho               = rho,
+                   mu_over_rho       = mu_over_rho,
+                   mu_over_rho_table = (None if mu_over_rho_table is None else
+                                        tuple(tuple(x) for x in mu_over_rho_table)),
+                   _loglog           = None)
+
+    @property
+    def mu(self):
+        return self.mu_over_rho * self.rho
+
+    @property
+    def Latt(self):
+        return 1 / self.mu
 
     @property
     def density(self):
@@ -45,10 +67,43 @@ class PhysicalMaterial:
         return self.Latt
 
     def transmittance_at_qbb(self, z):
-        return exp(-z*self.mu)
+        return np.exp(-z*self.mu)
 
     def absorption_at_qbb(self, z):
-        return 1 - exp(-z*self.mu)
+        return -np.expm1(-z*self.mu)
+
+    def mass_attenuation_coefficient_at(self, E):
+        """mu/rho at energy E (scalar or array). The table is interpolated
+        linearly in log-log scale, and extrapolated from its end segments.
+        """
+        E = np.asarray(E, dtype=float)
+        if self.mu_over_rho_table is None:
+            return np.full(E.shape, self.mu_over_rho)[()]
+        if self._loglog is None or self._loglog[0] is not self.mu_over_rho_table:
+            le, lm = np.log(self.mu_over_rho_table)
+            object.__setattr__(self, '_loglog', (self.mu_over_rho_table, le, lm,
+                                                 np.diff(lm) / np.diff(le)))
+        _, le, lm, slope = self._loglog
+        x = np.log(E)
+        i = np.clip(np.searchsorted(le, x) - 1, 0, len(le) - 2)
+        return np.exp(lm[i] + slope[i] * (x - le[i]))[()]
+
+    def attenuation_coefficient_at(self, E):
+        return self.mass_attenuation_coefficient_at(E) * self.rho
+
+    def attenuation_length_at(self, E):
+        return 1 / self.attenuation_coefficient_at(E)
+
+    def transmittance(self, E, z):
+        """Fraction of gammas of energy E crossing a thickness z without
+        interacting. E and z are broadcast against each other, e.g,
+        transmittance(E[:, np.newaxis], z) has shape (len(E), len(z)).
+        """
+        return np.exp(-np.asarray(z) * self.attenuation_coefficient_at(E))
+
+    def absorption(self, E, z):
+        """Fraction of gammas of energy E interacting in a thickness z"""
+        return -np.expm1(-np.asarray(z) * self.attenuation_coefficient_at(E))
 
     def __str__(self):
         g_cm3 = g / cm3
@@ -74,12 +129,14 @@ class PhysicalMaterial:
 
 
 class RadioactiveMaterial(PhysicalMaterial):
-    def __init__(self, name, rho, mu_over_rho, a_bi214, a_tl208):
+    __slots__ = ('a_bi214', 'a_tl208')
+    C         = 1 / 3
+
+    def __init__(self, name, rho, mu_over_rho, a_bi214, a_tl208, mu_over_rho_table=None):
 
-        super().__init__(name, rho, mu_over_rho)
-        self.a_bi214        = a_bi214
-        self.a_tl208        = a_tl208
-        self.C = 1 / 3
+        super().__init__(name, rho, mu_over_rho, mu_over_rho_table)
+        self._init(a_bi214 = a_bi214,
+                   a_tl208 = a_tl208)
 
     @property
     def mass_activity_bi214(self):
@@ -131,11 +188,12 @@ class PVMaterial(RadioactiveMaterial):
     """Material used for construction of PV
     Sm is the maximum allowable strength of the material
     """
+    __slots__ = ('Sm',)
 
-    def __init__(self, name, rho, mu_over_rho, a_bi214, a_tl208, Sm):
+    def __init__(self, name, rho, mu_over_rho, a_bi214, a_tl208, Sm, mu_over_rho_table=None):
 
-        super().__init__(name, rho, mu_over_rho, a_bi214, a_tl208)
-        self.Sm           = Sm
+        super().__init__(name, rho, mu_over_rho, a_bi214, a_tl208, mu_over_rho_table)
+        self._init(Sm = Sm)
 
     @property
     def maximum_allowable_strength(self):
@@ -152,60 +210,366 @@ class PVMaterial(RadioactiveMaterial):
 
     __repr__ = __str__
 
+def _column(name):
+    """property of a MaterialView reading and writing a column of its catalog"""
+    def get(self):
+        return float(getattr(self.catalog, name)[self.index])
+
+    def set(self, value):
+        getattr(self.catalog, name)[self.index] = value
+    return property(get, set)
+
+
+class MaterialView(RadioactiveMaterial):
+    """RadioactiveMaterial stored in row index of a MaterialCatalog.
+    Setting an attribute of the view (e.g, rho) changes the catalog, and
+    changes of the catalog arrays are seen by the view.
+
+    Unlike materials, views are mutable and compare by identity; their
+    _key (the catalog row) still keys caches by value. replace() returns
+    an immutable RadioactiveMaterial.
+    """
+    __setattr__ = object.__setattr__
+    __delattr__ = object.__delattr__
+    __eq__      = object.__eq__
+    __hash__    = object.__hash__
+
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index   = index
+
+    def replace(self, **changes):
+        return RadioactiveMaterial(**dict(self._asdict(), **changes))
+
+    rho         = _column('rho')
+    mu_over_rho = _column('mu_over_rho')
+    a_bi214     = _column('a_bi214')
+    a_tl208     = _column('a_tl208')
+
+    @property
+    def name(self):
+        return self.catalog.names[self.index]
+
+    @property
+    def mu(self):
+        return self.rho * self.mu_over_rho
+
+    @property
+    def Latt(self):
+        return 1 / self.mu
+
+    @property
+    def mu_over_rho_table(self):
+        row = self.catalog.mu_over_rho_e[self.index]
+        return None if np.isnan(row[0]) else (tuple(self.catalog.energies), tuple(row))
+
+    def _key(self):
+        # the row as bytes, so that unknown (NaN) activities compare equal
+        c   = self.catalog
+        row = np.concatenate([[c.rho[self.index], c.mu_over_rho[self.index],
+                               c.a_bi214[self.index], c.a_tl208[self.index]],
+                              c.mu_over_rho_e[self.index]])
+        return (type(self), self.name, self.C, row.tobytes())
+
+    def mass_attenuation_coefficient_at(self, E):
+        return self.catalog.mass_attenuation_coefficient_at(E, [self.index])[0][()]
+
+
+class MaterialCatalog:
+    """Columnar store of materials. Densities (rho), mass attenuation
+    coefficients at 2.5 MeV (mu_over_rho), specific activities (a_bi214,
+    a_tl208, NaN if unknown) and mass attenuation coefficients on the
+    energies grid (mu_over_rho_e, NaN rows for materials without a table)
+    are arrays indexed by the material id.
+
+    The vectorized methods take a selection of materials (ids or names,
+    all by default) and return arrays with the materials along the first
+    axis, e.g, catalog.transmittance_at_qbb(5 * cm) is the transmittance of
+    5 cm of each material. catalog[name] or catalog[id] is a MaterialView.
+    The default energies are those of the materials data file.
+    """
+    VERSION = 1
+
+    def __init__(self, energies=None):
+        self.energies      = np.array(materials_data().energies if energies is None else energies,
+                                      dtype=float)
+        self.names         = []
+        self.ids           = {}
+        self._views        = {}
+        self._set_columns(np.empty((4 + len(self.energies), 0)), 0)
+
+    @classmethod
+    def load(cls, name, cache=True):
+        """Catalog name of the materials data file (see MaterialsData).
+        The catalog arrays are also stored in the pynext cache directory,
+        and read from there while the data file does not change.
+        """
+        cname = 'material_catalog_{}_v{}'.format(name, cls.VERSION)
+        meta  = dict(version=cls.VERSION, data_version=DATA_VERSION, data_file=data_file_stamp())
+        rows, stored = load_array(cname, meta) if cache else (None, None)
+        if rows is not None:
+            catalog = cls(stored['energies'])
+            catalog._set_rows(stored['names'], np.array(rows))
+            return catalog
+
+        data    = materials_data()
+        catalog = cls(data.energies)
+        for e in data.catalogs[name]:
+            table = (data.energies, data.mu_over_rho_e[e['table']]) if 'table' in e else None
+            catalog.add(e['name'], e['rho'], e['mu_over_rho'], e['a_bi214'], e['a_tl208'], table)
+        if cache:
+            save_array(cname, catalog._rows(),
+                       dict(meta, names=catalog.names, energies=list(catalog.energies)))
+        return catalog
+
+    def _rows(self):
+        return np.column_stack([self.rho, self.mu_over_rho, self.a_bi214, self.a_tl208,
+                                self.mu_over_rho_e])
+
+    def _set_rows(self, names, rows):
+        self.names         = list(names)
+        self.ids           = {name: i for i, name in enumerate(self.names)}
+        self._views        = {}
+        self._set_columns(np.array(rows, dtype=float).T.copy(), len(self.names))
+
+    def _set_columns(self, columns, n):
+        """Sets the catalog arrays as views of the first n materials of
+        columns (rho, mu_over_rho, a_bi214, a_tl208, mu_over_rho_e...), an
+        array whose capacity (columns.shape[1]) grows geometrically in add
+        """
+        self._columns      = columns
+        self.rho           = columns[0, :n]
+        self.mu_over_rho   = columns[1, :n]
+        self.a_bi214       = columns[2, :n]
+        self.a_tl208       = columns[3, :n]
+        self.mu_over_rho_e = columns[4:, :n].T
+
+    def add(self, name, rho, mu_over_rho, a_bi214=np.nan, a_tl208=np.nan, mu_over_rho_table=None):
+        """Appends a material and returns its view. mu_over_rho_table must
+        be given on the energies of the catalog.
+        """
+        if name in self.ids:
+            raise ValueError('material {} already in the catalog'.format(name))
+        row = np.full(len(self.energies), np.nan)
+        if mu_over_rho_table is not None:
+            E, row = np.asarray(mu_over_rho_table, dtype=float)
+            if E.shape != self.energies.shape or not np.allclose(E, self.energies):
+                raise ValueError('table of {} is not given on the catalog energies'.format(name))
+
+        n       = len(self.names)
+        columns = self._columns
+        if n == columns.shape[1]:
+            columns = np.empty((columns.shape[0], max(8, 2 * n)))
+            columns[:, :n] = self._columns[:, :n]
+        columns[:, n] = np.concatenate([[rho, mu_over_rho, a_bi214, a_tl208], row])
+        self.ids[name] = n
+        self.names.append(name)
+        self._set_columns(columns, n + 1)
+        return self[name]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __getitem__(self, key):
+        index = self.ids[key] if isinstance(key, str) else range(len(self))[key]
+        if index not in self._views:
+            self._views[index] = MaterialView(self, index)
+        return self._views[index]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index(self, names=None):
+        """ids of a selection of materials: None (all), a name, an id or a
+        sequence of them
+        """
+        if names is None:
+            return np.arange(len(self))
+        if isinstance(names, (str, int, np.integer)):
+            names = [names]
+        return np.array([self.ids[n] if isinstance(n, str) else n for n in names], dtype=int)
+
+    @property
+    def mu(self):
+        return self.rho * self.mu_over_rho
+
+    @property
+    def Latt(self):
+        return 1 / self.mu
+
+    @property
+    def has_table(self):
+        return ~np.isnan(self.mu_over_rho_e[:, 0])
+
+    def _expand(self, x, ndim):
+        return x.reshape(x.shape + (1,) * ndim)
+
+    def mass_attenuation_coefficient_at(self, E, ids=None):
+        """mu/rho at energy E, shape (material,) + E.shape. The tables are
+        interpolated as in PhysicalMaterial; materials without a table take
+        mu_over_rho at all energies.
+        """
+        ids   = self.index(ids)
+        E     = np.asarray(E, dtype=float)
+        le    = np.log(self.energies)
+        lm    = np.log(self.mu_over_rho_e[ids])
+        slope = np.diff(lm, axis=1) / np.diff(le)
+        x     = np.log(E)
+        i     = np.clip(np.searchsorted(le, x) - 1, 0, len(le) - 2)
+        m     = np.exp(lm[:, i] + slope[:, i] * (x - le[i]))
+        return np.where(self._expand(self.has_table[ids], E.ndim), m,
+                        self._expand(self.mu_over_rho[ids], E.ndim))
+
+    def attenuation_coefficient_at(self, E, ids=None):
+        ids = self.index(ids)
+        return self.mass_attenuation_coefficient_at(E, ids) * self._expand(self.rho[ids],
+                                                                            np.ndim(E))
+
+    def _mu_z(self, E, z, ids):
+        E, z = np.asarray(E, dtype=float), np.asarray(z, dtype=float)
+        mu   = self.attenuation_coefficient_at(E, ids)
+        ndim = max(E.ndim, z.ndim)
+        return mu.reshape(mu.shape[:1] + (1,) * (ndim - E.ndim) + E.shape) * z
+
+    def transmittance(self, E, z, ids=None):
+        """Transmittance of a thickness z at energy E, shape
+        (material,) + broadcast shape of E and z
+        """
+        return np.exp(-self._mu_z(E, z, ids))
+
+    def absorption(self, E, z, ids=None):
+        return -np.expm1(-self._mu_z(E, z, ids))
+
+    def transmittance_at_qbb(self, z, ids=None):
+        """Transmittance of a thickness z at Qbb (mu_over_rho), shape (material,) + z.shape"""
+        z = np.asarray(z, dtype=float)
+        return np.exp(-self._expand(self.mu[self.index(ids)], z.ndim) * z)
+
+    def absorption_at_qbb(self, z, ids=None):
+        z = np.asarray(z, dtype=float)
+        return -np.expm1(-self._expand(self.mu[self.index(ids)], z.ndim) * z)
+
+    def __str__(self):
+        s = """
+        material catalog ({} materials)
+        name                 rho (g/cm3)  Latt (cm)   Bi-214 (Bq/kg)  Tl-208 (Bq/kg)
+""".format(len(self))
+        for i, name in enumerate(self.names):
+            s += "        {:20s} {:11.3g} {:10.3g} {:15.2e} {:15.2e}\n".format(
+                 name, self.rho[i] / (g / cm3), self.Latt[i] / cm,
+                 self.a_bi214[i] / (Bq / kg), self.a_tl208[i] / (Bq / kg))
+        return s
+
+    __repr__ = __str__
+
+
+class XenonMaterial(PhysicalMaterial):
+    """Xenon whose density rho is a scalar or an array (e.g, a grid of
+    densities). The derived quantities (mu, Latt, transmittance...) are
+    arrays of the same shape, and the methods broadcast their arguments
+    against rho; e.g, for rho of shape (n,) and thicknesses z of shape (m,),
+    transmittance_at_qbb(z[:, np.newaxis]) has shape (m, n).
+    """
+    __slots__ = ()
+
+    def __init__(self, rho=89.9 * kg/m3, name='GXe', mu_over_rho=0.039 * cm2/g,
+                 mu_over_rho_table=None):
+        rho = np.array(rho, dtype=float)
+        rho.setflags(write=False)
+        super().__init__(name, rho, mu_over_rho, mu_over_rho_table)
+
+    @classmethod
+    def from_PT(cls, P, T, temp='C', eos=None, **kwargs):
+        """Xenon at pressures P and temperatures T (broadcastable arrays),
+        with the density given by the equation of state eos (XenonES by default)
+        """
+        if eos is None:
+            from . XenonES import XenonES
+            eos = XenonES()
+        return cls(eos.density(P, T, temp=temp), **kwargs)
+
+    def mass(self, V):
+        """Mass of xenon in a volume V, which can be a Shape (its volume())"""
+        return self.rho * (V.volume() if isinstance(V, Shape) else V)
+
+    def fiducial_mass(self, R, L):
+        """Mass of xenon in a cylindrical fiducial volume of radius R and length L"""
+        return self.mass(Cylinder(R, L))
+
+    def __str__(self):
+        return """
+        material                                   = {}
+        density (rho)                              = {} g/cm3
+        mass attenuation coefficient (mu_over_rho) = {:7.2f} cm2/g
+        attenuation length (Latt)                  = {} cm
+    """.format(self.name, np.array2string(self.rho / (g / cm3), precision=4),
+               self.mu_over_rho / (cm2 / g), np.array2string(self.Latt / cm, precision=4))
+
+    __repr__ = __str__
+
+
 class GXe:
+    """Gaseous xenon at the reference densities rho_0520 ... rho_3020.
+    xenon is a XenonMaterial holding all of them (in the order of rho),
+    and xed[name] a XenonMaterial at density rho[name].
+    """
+    rho = {'rho_2020': 124.3 * kg/m3,
+           'rho_3020': 203.35 * kg/m3,
+           'rho_1520':   89.9 * kg/m3,
+           'rho_1020':    58 * kg/m3,
+           'rho_0520':    30 * kg/m3,
+           'rho_0720':    40 * kg/m3,
+           'rho_0920':    50 * kg/m3}
+
     def __init__(self, rho=89.9 * kg/m3):
+        self.xe     = XenonMaterial(rho)
+        self.xenon  = XenonMaterial(list(self.rho.values()))
+        self._xed   = None
 
-        self.rho = {'rho_2020': 124.3 * kg/m3,
-                    'rho_3020': 203.35 * kg/m3,
-                    'rho_1520':   89.9 * kg/m3,
-                    'rho_1020':    58 * kg/m3,
-                    'rho_0520':    30 * kg/m3,
-                    'rho_0720':    40 * kg/m3,
-                    'rho_0920':    50 * kg/m3}
-
-        self.xed = {}
-        self.xe = PhysicalMaterial(name='GXe', rho=rho, mu_over_rho=0.039 * cm2/g)
-        for name, r in self.rho.items():
-            self.xed[name] = PhysicalMaterial(name='GXe + %s'%name,
-                                              rho=r, mu_over_rho=0.039 * cm2/g)
-
-
-
-A_BI214_316Ti   =    1    * mBq/kg
-A_TL208_316Ti   =    0.15 * mBq/kg
-A_BI214_CU_LIM  =   12    * muBq/kg
-A_TL208_CU_LIM  =    1.4  * muBq/kg
-A_BI214_CU_BEST =    3    * muBq/kg
-A_TL208_CU_BEST =    1.4  * muBq/kg
-A_BI214_PB      =  370    * muBq/kg
-A_TL208_PB      =   73    * muBq/kg
-A_BI214_Poly    =   62    * muBq/kg
-A_TL208_Poly    =    8    * muBq/kg
-
-vacuum = RadioactiveMaterial(name='vacuum', rho=1e-25 * g/cm3, mu_over_rho=1e-25 * cm2/g,
-                             a_bi214=0, a_tl208=0)
-ti316  = RadioactiveMaterial(name='316ti', rho=7.87 * g/cm3, mu_over_rho=0.039 * cm2/g,
-                            a_bi214=A_BI214_316Ti, a_tl208=A_TL208_316Ti)
-
-cu12 = RadioactiveMaterial(name='CuUpperLimits',
-                           rho = 8.96 * g/cm3,
-                           mu_over_rho = 0.039 * cm2/g,
-                           a_bi214 = A_BI214_CU_LIM,
-                           a_tl208 = A_TL208_CU_LIM )
-cu03 = RadioactiveMaterial(name='CuBest',
-                           rho = 8.96 * g/cm3,
-                           mu_over_rho = 0.039 * cm2/g,
-                           a_bi214 = A_BI214_CU_BEST,
-                           a_tl208 = A_TL208_CU_BEST )
-
-pb =   RadioactiveMaterial(name='Pb',
-                           rho = 11.33 * g/cm3,
-                           mu_over_rho = 0.044 * cm2/g,
-                           a_bi214 = A_BI214_PB,
-                           a_tl208 = A_TL208_PB )
-
-poly =   RadioactiveMaterial(name='Poly',
-                           rho = 0.97 * g/cm3,
-                           mu_over_rho = 1e-6 * cm2/g,
-                           a_bi214 = A_BI214_Poly,
-                           a_tl208 = A_TL208_Poly )
+    @property
+    def xed(self):
+        if self._xed is None:
+            self._xed = {name: XenonMaterial(r, name='GXe + %s'%name) for name, r in self.rho.items()}
+        return self._xed
+
+
+# The catalogs of the materials data file and the materials of NEXT-100
+# (views of catalog) are loaded on first access, e.g, by
+# from pynext.Material import pb
+_CATALOGS  = {'catalog':    'next100',
+              'candidates': 'candidates'}
+_MATERIALS = {'vacuum': 'vacuum',
+              'ti316':  '316ti',
+              'cu12':   'CuUpperLimits',
+              'cu03':   'CuBest',
+              'pb':     'Pb',
+              'poly':   'Poly'}
+
+# Specific activities of the NEXT-100 materials, read from the catalog
+# (e.g, A_BI214_PB is catalog['Pb'].a_bi214)
+_ACTIVITIES = {'A_{}_{}'.format(isotope.upper(), suffix): (material, 'a_' + isotope)
+               for suffix, material in (('316Ti',   '316ti'),
+                                        ('CU_LIM',  'CuUpperLimits'),
+                                        ('CU_BEST', 'CuBest'),
+                                        ('PB',      'Pb'),
+                                        ('Poly',    'Poly'))
+               for isotope in ('bi214', 'tl208')}
+
+
+def __getattr__(name):
+    if name in _CATALOGS:
+        value = MaterialCatalog.load(_CATALOGS[name])
+    elif name in _MATERIALS:
+        catalog = globals()['catalog'] if 'catalog' in globals() else __getattr__('catalog')
+        value   = catalog[_MATERIALS[name]]
+    elif name in _ACTIVITIES:
+        catalog = globals()['catalog'] if 'catalog' in globals() else __getattr__('catalog')
+        material, column = _ACTIVITIES[name]
+        return getattr(catalog[material], column)
+    else:
+        raise AttributeError('module {} has no attribute {}'.format(__name__, name))
+    globals()[name] = value
+    return value
@@ -6,6 +6,9 @@ from pytest import approx
 from pytest import fixture
 from operator import itemgetter, attrgetter
 from math import exp
+import numpy as np
+import pickle
+import pytest
 
 @fixture(scope='module')
 def latt():
@@ -67,3 +70,139 @@ def test_material(materials):
     assert ti316.maximum_allowable_strength / MPa      == approx(139, rel=1e-2)
     assert ti316.mass_activity_bi214 / mbq_kg          == approx(1, rel=1e-3)
     assert ti316.mass_activity_tl208 / mbq_kg          == approx(0.4, rel=1e-3)
+
+
+def test_energy_dependence():
+    from . Material import pb, ti316
+    from . NextData import RFlux
+    flux = RFlux()
+    E    = np.array([flux.energy_gamma_bi214, flux.energy_gamma_tl208])
+
+    assert pb.mass_attenuation_coefficient_at(1 * MeV) / (cm2/g) == approx(0.07102, rel=1e-6)
+    assert pb.mass_attenuation_coefficient_at(2.5 * MeV) / (cm2/g) == approx(0.044, rel=1e-2)
+    assert ti316.mass_attenuation_coefficient_at(2.5 * MeV) / (cm2/g) == approx(0.039, rel=1e-2)
+
+    z = np.array([1, 5, 10]) * cm
+    T = pb.transmittance(E[:, np.newaxis], z)
+    assert T.shape == (2, 3)
+    assert T[1, 2] == approx(exp(-pb.attenuation_coefficient_at(E[1]) * z[2]), rel=1e-9)
+    assert np.allclose(pb.absorption(E[:, np.newaxis], z), 1 - T)
+    assert pb.attenuation_length_at(E[0]) > pb.attenuation_length_at(1 * MeV)
+
+
+def test_energy_without_table(materials):
+    ti316, _ = materials
+    E = np.array([0.5, 2.5]) * MeV
+    assert np.allclose(ti316.attenuation_coefficient_at(E), ti316.mu)
+    assert ti316.transmittance(2.5 * MeV, 1 * cm) == approx(ti316.transmittance_at_qbb(1 * cm))
+
+
+def test_catalog():
+    from . Material import catalog, candidates, pb, cu12, MaterialView
+    assert isinstance(pb, MaterialView)
+    assert catalog['Pb'] is pb
+    assert pb.rho == catalog.rho[catalog.index('Pb')[0]]
+
+    z = 5 * cm
+    T = catalog.transmittance_at_qbb(z)
+    assert T.shape == (len(catalog),)
+    assert T[catalog.ids['Pb']] == approx(pb.transmittance_at_qbb(z))
+
+    E = np.array([1, 2.5]) * MeV
+    T = catalog.transmittance(E[:, np.newaxis], np.array([1, 5]) * cm, ids=['Pb', 'CuBest'])
+    assert T.shape == (2, 2, 2)
+    assert T[0, 1, 1] == approx(exp(-pb.attenuation_coefficient_at(E[1]) * 5 * cm))
+
+    key = cu12._key()
+    rho = cu12.rho
+    cu12.rho = 2 * rho
+    assert catalog.rho[cu12.index] == 2 * rho
+    assert cu12._key() != key
+    cu12.rho = rho
+    assert cu12._key() == key
+
+    assert len(candidates) == 20
+    assert candidates.has_table.sum() == 3
+    assert np.isnan(candidates['Cu'].a_bi214)
+    assert candidates['Fe'].mass_attenuation_coefficient_at(2.5 * MeV) / (cm2/g) == approx(0.039, rel=1e-2)
+
+
+def test_catalog_load(tmp_path, monkeypatch):
+    from . Material import MaterialCatalog, materials_data
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    data   = MaterialCatalog.load('next100')
+    cached = MaterialCatalog.load('next100')
+    assert list(tmp_path.glob('material_catalog_next100_*.npy'))
+    assert cached.names == data.names
+    assert np.array_equal(cached._rows(), data._rows(), equal_nan=True)
+    pb = next(e for e in materials_data().catalogs['next100'] if e['name'] == 'Pb')
+    assert cached['Pb'].a_bi214 == approx(pb['a_bi214'])
+    assert cached['Pb'].a_tl208 == approx(pb['a_tl208'])
+
+    cached['Pb'].rho = 0
+    assert MaterialCatalog.load('next100')['Pb'].rho == approx(11.33 * g/cm3)
+
+
+def test_lazy_import():
+    import os, sys, subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import sys, pynext.Material as M; "
+            "assert 'catalog' not in vars(M) and 'scipy' not in sys.modules; "
+            "from pynext.Material import pb; assert M.catalog['Pb'] is pb")
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
+
+
+def test_xenon_material(latt):
+    from . Material import XenonMaterial, GXe
+    rho = np.linspace(30, 124.3, 5) * kg/m3
+    xe  = XenonMaterial(rho)
+    z   = np.array([1, 2, 3]) * m
+    T   = xe.transmittance_at_qbb(z[:, np.newaxis])
+    assert T.shape == (3, 5)
+    assert T[1, -1] == approx(exp(-2 * m / xe.Latt[-1]))
+    assert xe.Latt[0] / m == approx(latt['rho_0520'], rel=1e-9)
+    assert xe.fiducial_mass(1 * m, 1 * m)[-1] / kg == approx(124.3 * np.pi)
+    assert xe._key() != XenonMaterial(rho * 2)._key()
+    assert GXe().xed['rho_1020'].Latt / m == approx(latt['rho_1020'], rel=1e-9)
+
+    xp = XenonMaterial.from_PT(np.array([5, 10, 15]) * bar, 20)
+    assert np.all(np.diff(xp.Latt) < 0)
+
+
+def test_frozen_materials():
+    from . Material import RadioactiveMaterial, XenonMaterial, pb
+    a = PVMaterial('Ti', 4.5 * g/cm3, 0.04 * cm2/g, 1 * mBq/kg, np.nan, 100 * MPa)
+    b = PVMaterial('Ti', 4.5 * g/cm3, 0.04 * cm2/g, 1 * mBq/kg, np.nan, 100 * MPa)
+    assert a == b and hash(a) == hash(b) and len({a, b}) == 1
+    assert not hasattr(a, '__dict__')
+    with pytest.raises(AttributeError):
+        a.rho = 0
+    c = a.replace(rho=9 * g/cm3)
+    assert c != a and c.mu == approx(2 * a.mu) and c.Sm == a.Sm
+    assert pickle.loads(pickle.dumps(c)) == c
+
+    xe = XenonMaterial(np.array([30, 60]) * kg/m3)
+    assert xe == XenonMaterial(np.array([30, 60]) * kg/m3) != XenonMaterial(30 * kg/m3)
+
+    snapshot = pb.replace()
+    assert type(snapshot) is RadioactiveMaterial and snapshot.rho == pb.rho
+
+
+def test_catalog_add_grows_geometrically():
+    from . Material import MaterialCatalog
+    c = MaterialCatalog(energies=[1, 2])
+    for i in range(100):
+        c.add('m{}'.format(i), i * g/cm3, 0.04 * cm2/g, i * Bq/kg, 0, ([1, 2], [i, 2 * i]))
+    assert c._columns.shape[1] == 128
+    assert c.rho / (g/cm3) == approx(np.arange(100))
+    assert c.mu_over_rho_e[:, 1] == approx(2 * np.arange(100))
+    c['m7'].rho = 70 * g/cm3
+    assert c.rho[7] == 70 * g/cm3
+
+
+def test_activity_constants():
+    from . import Material
+    from . Material import catalog
+    assert Material.A_BI214_PB    == catalog['Pb'].a_bi214
+    assert Material.A_TL208_316Ti == catalog['316ti'].a_tl208
+    assert Material.A_BI214_PB    == approx(370 * muBq/kg)
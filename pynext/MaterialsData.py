@@ -1,72 +1,66 @@
+"""
+Materials data
+The data are stored in materials.json (versioned), read on first use:
+mass attenuation coefficients as a function of energy, from the NIST
+tables of Hubbell and Seltzer (total attenuation, with coherent scattering),
+and densities, attenuation coefficients at 2.5 MeV and specific activities
+of the materials of each catalog (see Material.MaterialCatalog).
+
+XCOM_ENERGIES and MU_OVER_RHO_E are computed on first access.
+"""
+import os
+import json
+from collections import namedtuple
+from functools import lru_cache
+from . system_of_units import *
+
+DATA_FILE    = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'materials.json')
+DATA_VERSION = 1
+
+# catalogs maps the name of each catalog to a list of dicts (name, rho,
+# mu_over_rho, a_bi214, a_tl208 and optionally table, a key of mu_over_rho_e)
+MaterialsData = namedtuple('MaterialsData', 'energies mu_over_rho_e catalogs')
+
+
+@lru_cache(maxsize=None)
+def materials_data():
+    """Contents of DATA_FILE, in the units of system_of_units. Unknown
+    activities (null) are NaN.
+    """
+    with open(DATA_FILE) as f:
+        raw = json.load(f)
+    if raw['version'] != DATA_VERSION:
+        raise ValueError('{}: version {}, expected {}'.format(DATA_FILE, raw['version'], DATA_VERSION))
+
+    def value(x, unit):
+        return float('nan') if x is None else x * unit
+
+    catalogs = {}
+    for name, entries in raw['catalogs'].items():
+        catalogs[name] = [dict(e, rho         = value(e['rho'],         g/cm3),
+                                  mu_over_rho = value(e['mu_over_rho'], cm2/g),
+                                  a_bi214     = value(e['a_bi214'],     Bq/kg),
+                                  a_tl208     = value(e['a_tl208'],     Bq/kg)) for e in entries]
+    return MaterialsData(energies      = tuple(e * MeV for e in raw['energies']),
+                         mu_over_rho_e = {k: tuple(m * cm2/g for m in v)
+                                          for k, v in raw['mu_over_rho_e'].items()},
+                         catalogs      = catalogs)
+
+
+def data_file_stamp():
+    """(modification time, size) of DATA_FILE, keying the binary caches"""
+    st = os.stat(DATA_FILE)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def __getattr__(name):
+    if name == 'XCOM_ENERGIES':
+        return materials_data().energies
+    if name == 'MU_OVER_RHO_E':
+        return materials_data().mu_over_rho_e
+    raise AttributeError('module {} has no attribute {}'.format(__name__, name))
+
 
-#     MATERIALS=['H2O','Fe','Ti','Cu','Pb','LXe','GXe','Cu10','H2OX',
-#     'Kevlar','Tensylon','Vectran','Graphene','LSC','LSCTh','LSCU','Poly','Poly2','Peek','PTFE']
-#     MU = {'H2O': 0.045 * cm2/g,
-#           'H2OX': 0.045 * cm2/g,
-#           'Fe' : 0.039 * cm2/g,
-#           'Ti' : 0.038 * cm2/g,
-#           'Cu' : 0.039 * cm2/g,
-#           'Cu10' : 0.039 * cm2/g,
-#           'Pb' : 0.044 * cm2/g,
-#           'LXe' : 3.8e-2 * cm2/g,
-#           'GXe' : 3.8e-2 * cm2/g,
-#           'Kevlar' : 0.045  * cm2/g,
-#           'Tensylon' : 0.045  * cm2/g,
-#           'Vectran' : 0.045  * cm2/g,
-#           'Graphene' : 0.045  * cm2/g,
-#           'LSC' : 1e-6  * cm2/g,
-#           'LSCTh' : 1e-6  * cm2/g,
-#           'LSCU' : 1e-6  * cm2/g,
-#           'Poly' : 1e-6  * cm2/g,
-#           'Poly2' : 1e-6  * cm2/g,
-#           'Peek' : 1e-6  * cm2/g,
-#           'PTFE' : 1e-6  * cm2/g,
-#           }
-#
-#
-#     RHO = {'H2O': 1.00 * g/cm3,
-#            'H2OX': 1.00 * g/cm3,
-#            'Fe' : 7.87 * g/cm3,
-#            'Ti' : 4.54 * g/cm3,
-#            'Cu' : 8.96 * g/cm3,
-#            'Cu10' : 8.96 * g/cm3,
-#            'Pb' : 11.33 * g/cm3,
-#            'LXe' :2.98 * g/cm3,
-#            'GXe' :5.761 *kg/m3,
-#            'Kevlar' : 1440 * kg/m3,
-#            'Vectran' : 1.4 * g/cm3,
-#            'Tensylon' : 0.97 * g/cm3,
-#            'Graphene' : 2.0 * g/cm3,
-#            'LSC' : 1.0 * g/cm3,
-#            'LSCTh' : 1.0 * g/cm3,
-#            'LSCU' : 1.0 * g/cm3,
-#            'Poly' : 1.0 * g/cm3,
-#            'Poly2' : 1.0 * g/cm3,
-#            'Peek' : 1.3 * g/cm3,
-#            'PTFE' : 2.0 * g/cm3,
-#            }
-#
-#     AS = {'Fe' : {'BI214':1.9e-3 * becquerel/kg,'TL208':1.e-3/3. * becquerel/kg},
-#           'Fe-10': {'BI214':1.e-2 * becquerel/kg,'TL208':1.e-2/3. * becquerel/kg},
-#           'Ti': {'BI214':0.93e-3 * becquerel/kg,'TL208':0.22e-3 * becquerel/kg},
-#           'Ti-X' : {'BI214':1.e-4 * becquerel/kg,'TL208':1.e-4/3 * becquerel/kg},
-#           'Cu10' : {'BI214':12e-6 * becquerel/kg,'TL208':4.e-6/3 * becquerel/kg},
-#           'H2O'   : {'BI214':1.e-5 * becquerel/kg,'TL208':1.e-5/3 * becquerel/kg},
-#           'H2OX'   : {'BI214':1.e-3 * becquerel/kg,'TL208':1.e-3/3 * becquerel/kg},
-#           'LXe'   : {'BI214':1.e-12 * becquerel/kg,'TL208':1.e-12/3 * becquerel/kg},
-#           'GXe'   : {'BI214':1.e-12 * becquerel/kg,'TL208':1.e-12/3 * becquerel/kg},
-#           'Pb'   : {'BI214':370.0e-6 * becquerel/kg,'TL208':73e-6/3 * becquerel/kg},
-#           'Graphene'   : {'BI214':1e-18 * becquerel/kg,'TL208':1.e-18 * becquerel/kg},
-#           'Kevlar'   : {'BI214':0.17 * becquerel/kg,'TL208':0.17* becquerel/kg},
-#           'Poly'   : {'BI214':2.9e-3 * becquerel/kg,'TL208':1.e-3 * becquerel/kg},
-#           'Poly2'   : {'BI214':2.3e-4 * becquerel/kg,'TL208':1.4e-4/3 * becquerel/kg},
-#           'Tensylon'   : {'BI214':(0.05/81) * becquerel/kg,'TL208':(0.05/81/3) * becquerel/kg},
-#           'Vectran'   : {'BI214':(0.1/81) * becquerel/kg,'TL208':(0.1/81/3) * becquerel/kg},
-#           'Peek'   : {'BI214': 36e-3 * becquerel/kg,'TL208':4.3e-3/3 * becquerel/kg},
-#           'PTFE'   : {'BI214': 0.025e-3 * becquerel/kg,'TL208':0.031e-3/3 * becquerel/kg},
-#           'LSC'   : {'BI214':(3.5e-18/81e-9) * becquerel/kg,'TL208':(5.2e-17/81e-9) * becquerel/kg},
-#           }
-#
 ##
 # class RMaterial(Material):
 #     """
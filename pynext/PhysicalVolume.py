@@ -3,19 +3,46 @@ Physical Volume
 Defines a material medium + Shape
 """
 
+import numpy as np
 from . system_of_units import *
-from . math_functions import attenuation_factor
+from . math_functions import attenuation_table
+from . cache import DerivedCache, shared_cache
+
+
+def _arg_key(z):
+    """Hashable form of an argument of a cached quantity (arrays by value)"""
+    if isinstance(z, np.ndarray):
+        return (z.shape, z.tobytes())
+    return z
+
 
 class PhysicalVolume:
     def __init__(self,name, material,shape):
         """
-       Defines a physical volume
-
+       Defines a physical volume.
+       Derived quantities (mass, activities, self-shielded activities,
+       transmittances) are cached, and recomputed only when the material
+       or the shape change. The shape can be a ShapeBatch, and then the
+       derived quantities are arrays over the batch.
+       Volumes of equal materials and shapes share the derived quantities
+       (see cache.SharedCache).
        """
         self.name     = name
         self.material = material
         self.shape    = shape
-        self.M        = self.shape.V * self.material.rho
+        self.cache    = DerivedCache(shared_cache())
+
+    def _cached(self, name, compute):
+        key = (self.material._key(), self.shape._key())
+        return self.cache.get(key, name, compute)
+
+    def cache_info(self):
+        """Hits, misses and size of the cache of derived quantities"""
+        return self.cache.info()
+
+    @property
+    def M(self):
+        return self._cached('mass', lambda: self.shape.V * self.material.rho)
 
     @property
     def V(self):
@@ -47,30 +74,66 @@ class PhysicalVolume:
 
     @property
     def activity_bi214(self):
-        return self.M * self.material.mass_activity_bi214
+        return self._cached('activity_bi214',
+                            lambda: self.M * self.material.mass_activity_bi214)
 
     @property
     def activity_tl208(self):
-        return self.M * self.material.mass_activity_tl208
-
-    @property
-    def activity_tl208(self):
-        return self.M * self.material.mass_activity_tl208
+        return self._cached('activity_tl208',
+                            lambda: self.M * self.material.mass_activity_tl208)
 
     def transmittance(self, z):
-        return self.material.transmittance_at_qbb(z)
+        return self._cached(('transmittance', _arg_key(z)),
+                            lambda: self.material.transmittance_at_qbb(z))
 
     def absorption(self, z):
-        return self.material.absorption_at_qbb(z)
+        return self._cached(('absorption', _arg_key(z)),
+                            lambda: self.material.absorption_at_qbb(z))
+
+    def transmittance_at(self, E, z):
+        """Transmittance for gammas of energy E (E and z can be arrays)"""
+        return self.material.transmittance(E, z)
+
+    def absorption_at(self, E, z):
+        return self.material.absorption(E, z)
+
+    def transmittance_along(self, origin, direction, E=None):
+        """Transmittance along rays (arrays of origins and directions of
+        shape (..., 3), in the frame of the shape) for gammas of energy E
+        (Qbb by default), from the path length in the shape
+        """
+        mu = self.material.mu if E is None else self.material.attenuation_coefficient_at(E)
+        return np.exp(-mu * self.shape.path_length(origin, direction))
 
     def activity_bi214_self_shield(self, z):
-        return self.activity_bi214 * attenuation_factor(self.material.mu, z)
+        return self._cached(('activity_bi214_self_shield', _arg_key(z)),
+                            lambda: self.activity_bi214 *
+                            attenuation_table().attenuation_factor(self.material.mu, z))
 
     def activity_tl208_self_shield(self, z):
-        return self.activity_tl208 * attenuation_factor(self.material.mu, z)
+        return self._cached(('activity_tl208_self_shield', _arg_key(z)),
+                            lambda: self.activity_tl208 *
+                            attenuation_table().attenuation_factor(self.material.mu, z))
+
+    def escape_fraction(self):
+        """Fraction of the gammas emitted in the volume that leave it through
+        its inner surface (CylinderShell) or one face (Disk), computed for
+        the actual geometry. See self_shielding.
+        """
+        from . self_shielding import escape_fraction   # imports scipy
+        return self._cached('escape_fraction',
+                            lambda: escape_fraction(self.material.mu, self.shape))
+
+    def activity_bi214_finite_self_shield(self):
+        return self.activity_bi214 * self.escape_fraction()
 
+    def activity_tl208_finite_self_shield(self):
+        return self.activity_tl208 * self.escape_fraction()
 
     def __str__(self):
+        if np.ndim(self.V):
+            return '<PhysicalVolume {}: {}, mass in [{:.3g}, {:.3g}] kg>'.format(
+                    self.name, self.shape, self.M.min() / kg, self.M.max() / kg)
 
         s =  """ Physical Volume:
         Shape           = %s
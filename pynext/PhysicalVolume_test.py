@@ -3,11 +3,13 @@ from . system_of_units import *
 from . PhysicalVolume import PhysicalVolume
 from . Material import RadioactiveMaterial
 from . Shapes import Brick
+from . Shapes import BrickBatch
 
 from pytest import approx
 from pytest import fixture
 from operator import itemgetter, attrgetter
 from collections import namedtuple
+import numpy as np
 
 
 @fixture(scope='module')
@@ -28,3 +30,63 @@ def test_brick(leadBrick):
     pb, bs, lb = leadBrick
 
     assert lb.shape.V    == bs.width * bs.heigth * bs.length
+
+
+def test_cache(leadBrick):
+    pb, bs, _ = leadBrick
+    lb = PhysicalVolume('leadBrick', pb, bs)
+    z  = 10 * cm
+
+    a = lb.activity_bi214_self_shield(z)
+    misses = lb.cache_info().misses
+    assert lb.activity_bi214_self_shield(z) == a
+    assert lb.cache_info().misses == misses
+    assert lb.cache_info().hits   >= 1
+
+    lb.shape = Brick(width= 10 * cm, heigth= 10 * cm, length=20 * cm)
+    assert lb.mass == approx(2 * bs.V * pb.rho, rel=1e-5)
+    assert lb.activity_bi214_self_shield(z) == approx(2 * a, rel=1e-5)
+
+    lb.shape = lb.shape.replace(length=10 * cm)
+    assert lb.mass == approx(bs.V * pb.rho, rel=1e-5)
+
+
+def test_shape_batch(leadBrick):
+    pb, bs, lb = leadBrick
+    length = np.array([10, 20, 30]) * cm
+    pv = PhysicalVolume('bricks', pb, BrickBatch(10 * cm, 10 * cm, length))
+    assert pv.mass == approx(length / bs.length * lb.mass)
+    assert pv.activity_tl208 == approx(length / bs.length * lb.activity_tl208)
+
+    z = np.array([1, 10]) * cm
+    assert pv.transmittance(z) == approx(lb.transmittance(z))
+    a = pv.activity_bi214_self_shield(10 * cm)
+    assert a[0] == approx(lb.activity_bi214_self_shield(10 * cm))
+    assert pv.activity_bi214_self_shield(10 * cm) is a
+    assert 'bricks' in str(pv)
+
+
+def test_shared_cache():
+    from . NextData import next100_PV
+    pv1, pv2 = next100_PV(), next100_PV()
+    assert pv1.cv.body.shape == pv2.cv.body.shape
+    pv1.body_mass
+    assert pv2.body_mass == pv1.body_mass
+    assert pv2.cache_info().misses == 0 and pv2.cache_info().hits == 1
+
+
+def test_shared_cache_bytes():
+    from . cache import SharedCache
+    from . Material import XenonMaterial
+    cache = SharedCache(maxbytes=10**6)
+    for i in range(10):
+        cache.lookup(i, lambda: np.zeros(2 * 10**4))   # 160 kB each
+    assert cache.info().size < 10 and cache.nbytes <= 10**6
+    assert cache.lookup(9, lambda: None)[1] and not cache.lookup(0, lambda: None)[1]
+    cache.lookup('big', lambda: np.zeros(10**6))
+    assert 'big' not in cache.values and cache.nbytes <= 10**6
+
+    # the key of an immutable value is computed once
+    xe = XenonMaterial(np.linspace(1, 100, 10**5) * kg/m3)
+    assert xe._key() is xe._key()
+    assert xe._key() == XenonMaterial(np.linspace(1, 100, 10**5) * kg/m3)._key()
@@ -5,8 +5,24 @@ Defines a material shape
 from . system_of_units import *
 from math import pi
 from abc import ABC, abstractmethod
+from . frozen import Frozen
+from . ray_tracing import (rays, slab_interval, cylinder_interval, sphere_interval,
+                           intersect_intervals, solid_hits, shell_hits)
+from . sampling import (cylinder_points, sphere_points, box_points, box_surface_points,
+                        SURFACES)
+import hashlib
+import numpy as np
 
-class Shape(ABC):
+
+def _rho2(p):
+    return p[..., 0]**2 + p[..., 1]**2
+
+
+def _r2(p):
+    return _rho2(p) + p[..., 2]**2
+
+
+class Shape(Frozen, ABC):
 
     """An abstract class representing a geometrical shape.
     In the most general case, the shape is assumed to have a thickness
@@ -50,7 +66,20 @@ class Shape(ABC):
 
     Once the interface is defined, the methods volume() and surface()
     as well as the properties V and S come for free.
+
+    Shapes are immutable values (see Frozen): shapes with the same
+    dimensions are equal, hash alike and share cached results;
+    shape.replace(L=...) returns a modified copy.
+
+    intersect(origin, direction) gives the entry and exit distances and
+    the path length in the material of batches of rays, in the local frame
+    of the shape (see ray_tracing). sample_volume(rng, n) and
+    sample_surface(rng, n, surface) draw n points uniformly in the material
+    or on its inner or outer surface, in the same frame (see sampling);
+    contains(points) tells the points in the material and half_extent()
+    gives the half sizes of the bounding box along x, y and z.
     """
+    __slots__ = ()
 
 
     @abstractmethod
@@ -89,6 +118,46 @@ class Shape(ABC):
     def thickness_surface(self):
         pass
 
+    @abstractmethod
+    def _hits(self, o, d):
+        pass
+
+    @abstractmethod
+    def sample_volume(self, rng, n):
+        """n points (n, 3) uniformly distributed in the material (of shape
+        batch_shape + (n, 3) for a ShapeBatch)
+        """
+        pass
+
+    @abstractmethod
+    def _sample_surface(self, rng, n, surface):
+        pass
+
+    @abstractmethod
+    def contains(self, p):
+        """True for the points p (..., 3) in the material"""
+        pass
+
+    @abstractmethod
+    def half_extent(self):
+        pass
+
+    def sample_surface(self, rng, n, surface='outer'):
+        """n points (n, 3) uniformly distributed on the inner or outer surface"""
+        if surface not in SURFACES:
+            raise ValueError('surface must be one of {}'.format(SURFACES))
+        return self._sample_surface(rng, n, surface)
+
+    def intersect(self, origin, direction):
+        """RayHits (t_in, t_out, length) of rays from origin along direction,
+        arrays of shape (..., 3)
+        """
+        return self._hits(*rays(origin, direction))
+
+    def path_length(self, origin, direction):
+        """Length of the path of the rays in the material"""
+        return self.intersect(origin, direction).length
+
     @property
     def V(self):
         return self.volume()
@@ -126,10 +195,11 @@ class Shape(ABC):
 
 
 class Sphere(Shape):
+    __slots__ = ('R',)
 
     def __init__(self, R):
 
-        self.R = R
+        self._init(R=R)
 
     def inner_volume(self):
         return (4/3) * pi * self.R**3
@@ -158,6 +228,21 @@ class Sphere(Shape):
     def surface(self):
         return self.inner_surface()
 
+    def _hits(self, o, d):
+        return solid_hits(sphere_interval(o, d, self.R))
+
+    def sample_volume(self, rng, n):
+        return sphere_points(rng, n, 0, self.R)
+
+    def _sample_surface(self, rng, n, surface):
+        return sphere_points(rng, n, self.R, self.R)
+
+    def contains(self, p):
+        return _r2(p) <= self.R**2
+
+    def half_extent(self):
+        return (self.R, self.R, self.R)
+
 
     def __str__(self):
 
@@ -171,11 +256,12 @@ class Sphere(Shape):
 
 
 class SphereShell(Shape):
+    __slots__ = ('Rin', 'Rout')
 
     def __init__(self, Rin , Rout):
 
-        self.Rin  = Rin
-        self.Rout = Rout
+        self._init(Rin  = Rin,
+                   Rout = Rout)
 
     def inner_volume(self):
         return (4/3) * pi * self.Rin**3
@@ -204,6 +290,23 @@ class SphereShell(Shape):
     def surface(self):
         return self.outer_surface()
 
+    def _hits(self, o, d):
+        return shell_hits(sphere_interval(o, d, self.Rout), sphere_interval(o, d, self.Rin))
+
+    def sample_volume(self, rng, n):
+        return sphere_points(rng, n, self.Rin, self.Rout)
+
+    def _sample_surface(self, rng, n, surface):
+        R = self.Rin if surface == 'inner' else self.Rout
+        return sphere_points(rng, n, R, R)
+
+    def contains(self, p):
+        r2 = _r2(p)
+        return (r2 >= self.Rin**2) & (r2 <= self.Rout**2)
+
+    def half_extent(self):
+        return (self.Rout, self.Rout, self.Rout)
+
 
     def __str__(self):
 
@@ -217,11 +320,12 @@ class SphereShell(Shape):
 
 
 class Cylinder(Shape):
+    __slots__ = ('R', 'L')
 
     def __init__(self, R, L):
 
-        self.R = R
-        self.L = L
+        self._init(R = R,
+                   L = L)
 
     def inner_volume(self):
         return pi * self.R**2 * self.L
@@ -250,6 +354,22 @@ class Cylinder(Shape):
     def surface(self):
         return self.inner_surface()
 
+    def _hits(self, o, d):
+        return solid_hits(intersect_intervals(cylinder_interval(o, d, self.R),
+                                              slab_interval(o[..., 2], d[..., 2], self.L / 2)))
+
+    def sample_volume(self, rng, n):
+        return cylinder_points(rng, n, 0, self.R, self.L)
+
+    def _sample_surface(self, rng, n, surface):
+        return cylinder_points(rng, n, self.R, self.R, self.L)
+
+    def contains(self, p):
+        return (_rho2(p) <= self.R**2) & (np.abs(p[..., 2]) <= self.L / 2)
+
+    def half_extent(self):
+        return (self.R, self.R, self.L / 2)
+
 
     def __str__(self):
 
@@ -263,13 +383,13 @@ class Cylinder(Shape):
 
 
 class CylinderShell(Shape):
+    __slots__ = ('Rin', 'Rout', 'L')
 
     def __init__(self, Rin, Rout, L):
 
-
-        self.Rin  = Rin
-        self.Rout = Rout
-        self.L    = L
+        self._init(Rin  = Rin,
+                   Rout = Rout,
+                   L    = L)
 
     def inner_volume(self):
         return pi * self.Rin**2 * self.L
@@ -298,6 +418,25 @@ class CylinderShell(Shape):
     def surface(self):
         return self.inner_surface()
 
+    def _hits(self, o, d):
+        z = slab_interval(o[..., 2], d[..., 2], self.L / 2)
+        return shell_hits(intersect_intervals(cylinder_interval(o, d, self.Rout), z),
+                          intersect_intervals(cylinder_interval(o, d, self.Rin),  z))
+
+    def sample_volume(self, rng, n):
+        return cylinder_points(rng, n, self.Rin, self.Rout, self.L)
+
+    def _sample_surface(self, rng, n, surface):
+        R = self.Rin if surface == 'inner' else self.Rout
+        return cylinder_points(rng, n, R, R, self.L)
+
+    def contains(self, p):
+        rho2 = _rho2(p)
+        return (rho2 >= self.Rin**2) & (rho2 <= self.Rout**2) & (np.abs(p[..., 2]) <= self.L / 2)
+
+    def half_extent(self):
+        return (self.Rout, self.Rout, self.L / 2)
+
     def __str__(self):
 
         s= """
@@ -311,10 +450,11 @@ class CylinderShell(Shape):
 
 
 class Disk(Shape):
+    __slots__ = ('R', 't')
 
     def __init__(self, R, t):
-        self.R = R
-        self.t = t
+        self._init(R = R,
+                   t = t)
 
     def inner_volume(self):
         return pi * self.R**2 * self.t
@@ -335,7 +475,7 @@ class Disk(Shape):
         return self.t
 
     def radius(self):
-        return self.Rin
+        return self.R
 
     def volume(self):
         return self.inner_volume()
@@ -343,6 +483,25 @@ class Disk(Shape):
     def surface(self):
         return self.inner_surface()
 
+    def _hits(self, o, d):
+        return solid_hits(intersect_intervals(cylinder_interval(o, d, self.R),
+                                              slab_interval(o[..., 2], d[..., 2], self.t / 2)))
+
+    def sample_volume(self, rng, n):
+        return cylinder_points(rng, n, 0, self.R, self.t)
+
+    def _sample_surface(self, rng, n, surface):
+        """inner is the face at z = -t/2, outer the face at z = t/2"""
+        p = cylinder_points(rng, n, 0, self.R, 0)
+        p[..., 2] = (-0.5 if surface == 'inner' else 0.5) * np.asarray(self.t)[..., np.newaxis]
+        return p
+
+    def contains(self, p):
+        return (_rho2(p) <= self.R**2) & (np.abs(p[..., 2]) <= self.t / 2)
+
+    def half_extent(self):
+        return (self.R, self.R, self.t / 2)
+
     def __str__(self):
 
         s= """
@@ -355,12 +514,13 @@ class Disk(Shape):
 
 
 class Brick(Shape):
+    __slots__ = ('width', 'heigth', 'length')
 
     def __init__(self, width, heigth, length):
 
-        self.width  = width
-        self.heigth = heigth
-        self.length = length
+        self._init(width  = width,
+                   heigth = heigth,
+                   length = length)
 
     def inner_volume(self):
         return self.width * self.heigth * self.length
@@ -389,6 +549,25 @@ class Brick(Shape):
     def surface(self):
         return self.inner_surface()
 
+    def _hits(self, o, d):
+        return solid_hits(intersect_intervals(slab_interval(o[..., 0], d[..., 0], self.width  / 2),
+                                              slab_interval(o[..., 1], d[..., 1], self.heigth / 2),
+                                              slab_interval(o[..., 2], d[..., 2], self.length / 2)))
+
+    def sample_volume(self, rng, n):
+        return box_points(rng, n, self.width, self.heigth, self.length)
+
+    def _sample_surface(self, rng, n, surface):
+        return box_surface_points(rng, n, self.width, self.heigth, self.length)
+
+    def contains(self, p):
+        return ((np.abs(p[..., 0]) <= self.width  / 2) &
+                (np.abs(p[..., 1]) <= self.heigth / 2) &
+                (np.abs(p[..., 2]) <= self.length / 2))
+
+    def half_extent(self):
+        return (self.width / 2, self.heigth / 2, self.length / 2)
+
     def __str__(self):
 
         s= """
@@ -401,6 +580,112 @@ class Brick(Shape):
 
 FlatPlate = Disk
 
+
+class ShapeBatch:
+    """Structure of arrays of shapes of one kind: the parameters of the
+    shape (e.g. Rin, Rout, L of a CylinderShell) are broadcast read-only
+    arrays, and the interface methods return arrays of that shape
+    (batch_shape). Batches take the place of shapes in PhysicalVolume,
+    whose masses and activities then are arrays too; batch[i] is the
+    i-th shape.
+
+    Like shapes, batches are immutable; they are compared and hashed by a
+    digest of their parameters.
+
+    Subclasses derive from ShapeBatch and the scalar shape (single).
+    """
+    single = None
+
+    def __init__(self, *args, **kwargs):
+        self.single.__init__(self, *args, **kwargs)
+        fields = self._fields()
+        values = np.broadcast_arrays(*(np.asarray(getattr(self, k), dtype=float) for k in fields))
+        h      = hashlib.sha1()
+        for k, v in zip(fields, values):
+            v = np.array(v)
+            v.setflags(write=False)
+            h.update(v.tobytes())
+            object.__setattr__(self, k, v)
+        object.__setattr__(self, '_digest', h.hexdigest())
+
+    @property
+    def params(self):
+        return self._asdict()
+
+    @property
+    def batch_shape(self):
+        return getattr(self, self._fields()[0]).shape
+
+    def __len__(self):
+        return self.batch_shape[0]
+
+    def __getitem__(self, i):
+        params = {k: v[i] for k, v in self.params.items()}
+        if np.ndim(next(iter(params.values()))):
+            return type(self)(**params)
+        return self.single(**{k: float(v) for k, v in params.items()})
+
+    def _full(self, x):
+        return np.broadcast_to(np.asarray(x, dtype=float), self.batch_shape).copy()
+
+    def inner_volume(self):
+        return self._full(super().inner_volume())
+
+    def shell_volume(self):
+        return self._full(super().shell_volume())
+
+    def inner_surface(self):
+        return self._full(super().inner_surface())
+
+    def outer_surface(self):
+        return self._full(super().outer_surface())
+
+    def thickness_surface(self):
+        return self._full(super().thickness_surface())
+
+    def thickness(self):
+        return self._full(super().thickness())
+
+    def radius(self):
+        return self._full(super().radius())
+
+    def _key(self):
+        return (type(self), self.batch_shape, self._digest)
+
+    def __str__(self):
+        return '<{}: {} shapes, {}>'.format(
+                type(self).__name__, self.batch_shape,
+                ', '.join('{} in [{:.3g}, {:.3g}] mm'.format(k, v.min() / mm, v.max() / mm)
+                          if v.size else k for k, v in self.params.items()))
+
+    __repr__ = __str__
+
+
+class SphereBatch(ShapeBatch, Sphere):
+    single = Sphere
+
+
+class SphereShellBatch(ShapeBatch, SphereShell):
+    single = SphereShell
+
+
+class CylinderBatch(ShapeBatch, Cylinder):
+    single = Cylinder
+
+
+class CylinderShellBatch(ShapeBatch, CylinderShell):
+    single = CylinderShell
+
+
+class DiskBatch(ShapeBatch, Disk):
+    single = Disk
+
+
+class BrickBatch(ShapeBatch, Brick):
+    single = Brick
+
+FlatPlateBatch = DiskBatch
+
 #
 # class Wall:
 #     """
@@ -7,11 +7,20 @@ from . Shapes import CylinderShell
 from . Shapes import Disk
 from . Shapes import FlatPlate
 from . Shapes import Brick
+from . Shapes import CylinderShellBatch
+from . Shapes import SphereShellBatch
+from . Shapes import CylinderBatch
+from . Shapes import DiskBatch
+from . Shapes import BrickBatch
+from . Shapes import SphereBatch
 
 from pytest import approx
 from pytest import fixture
 from math import pi
 from collections import namedtuple
+import numpy as np
+import pytest
+import pickle
 
 ShapeParams = namedtuple('ShapeParams',
                          """inner_volume shell_volume
@@ -148,3 +157,47 @@ def test_flat_plate(Next100PV):
     assert fp.t / cm == approx(10, rel=1e-3)
     assert fp.S / mm2 == approx(8.49e+05, rel=1e-2)
     assert fp.V / mm3 == approx(8.49e+07, rel=1e-2)
+
+
+@pytest.mark.parametrize('batch, params', [
+    (SphereBatch,        ([1, 2, 3],)),
+    (SphereShellBatch,   ([1, 2, 3], 4)),
+    (CylinderBatch,      ([1, 2, 3], [[1], [2]])),
+    (CylinderShellBatch, ([1, 2, 3], [2, 3, 4], 5)),
+    (DiskBatch,          (2, [0.1, 0.2, 0.3])),
+    (BrickBatch,         ([1, 2, 3], 2, 3))])
+def test_shape_batch(batch, params):
+    sb = batch(*params)
+    for i in np.ndindex(sb.batch_shape):
+        sp = sb.single(*(float(np.broadcast_to(p, sb.batch_shape)[i]) for p in params))
+        for method in ('inner_volume', 'shell_volume', 'inner_surface', 'outer_surface',
+                       'thickness_surface', 'thickness', 'radius', 'volume', 'surface'):
+            value = getattr(sb, method)()
+            assert value.shape == sb.batch_shape
+            assert value[i] == approx(getattr(sp, method)())
+    assert type(sb[0]) in (sb.single, batch)
+
+
+def test_shape_batch_key():
+    sb  = CylinderShellBatch(np.array([1., 2.]), 3, 4)
+    key = sb._key()
+    assert sb._key() == key and hash(key)
+    with pytest.raises(ValueError):
+        sb.Rin[0] = 0
+    with pytest.raises(AttributeError):
+        sb.L = 5
+    sb = sb.replace(L=5)
+    assert sb._key() != key
+    assert sb.volume() == approx(pi * (9 - np.array([1, 4])) * 5)
+    assert sb[1].Rin == 2 and isinstance(sb[1], CylinderShell)
+
+
+def test_frozen_shapes():
+    a, b = CylinderShell(1, 2, 3), CylinderShell(1, 2, 3)
+    assert a == b and hash(a) == hash(b) and a is not b
+    assert a != Cylinder(1, 3) and a != CylinderShell(1, 2, 4)
+    assert not hasattr(a, '__dict__')
+    with pytest.raises(AttributeError):
+        a.L = 4
+    assert a.replace(L=4) == CylinderShell(1, 2, 4)
+    assert pickle.loads(pickle.dumps(Brick(1, 2, 3))) == Brick(1, 2, 3)
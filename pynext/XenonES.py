@@ -1,39 +1,58 @@
 from . system_of_units import *
 import numpy as np
 from math import pi, sqrt, exp, log
+from collections import namedtuple
+from . import virial
 import sys
+
+# Diagnostics of XenonES.density: converged and iterations per point, and
+# the relative residual |P(rho) / P - 1|
+InverseInfo = namedtuple('InverseInfo', 'converged iterations residual')
+
+# Pressure and its derivatives (see XenonES.state): Z is the compressibility
+# factor P / (rho R T) and kappa_T the isothermal compressibility
+EOSState = namedtuple('EOSState', 'P dP_drho dP_dT Z kappa_T')
+
 class XenonES:
     """Defines Xenon equation of state.
     https://www.nist.gov/sites/default/files/documents/srd/jpcrd470.pdf
 
     """
+    # Coefficients of the series of the reduced residual pressure:
+    # F[i, j - 1] multiplies j r^j in psi_i
+    F   = np.array([
+         [0.48176287000, -1.17810687000, -0.2405126300, -0.075090970300, -0.21382659500,
+          -0.00701074245, -3.56560121],
+         [-0.22996818000, 0.61145818500, -0.3576334170, -0.039464195900, 0.85313703300,
+          0.03926238030,  8.73657614],
+         [0.67678089000, -1.59127084000,  1.3854592100, -0.037603850100, -1.77422585000,
+          -0.11095677400, -11.83502506],
+         [-0.82687853, 2.18816951999, -2.2662842000,  0.404244668000, 2.11856977,
+          0.175796531,  9.56797096],
+         [0.59684665, -1.66416249,  1.89132269, -0.462622543, -1.53874755,
+          -0.158135317, -4.61464670],
+         [-0.26046265, 0.741574506, -0.896367224,  0.24081461, 0.693737872,
+          0.07524343650,  1.22917766],
+         [0.068249584, -0.192234256, 0.244259366, -0.06689881470, -0.190153915,
+          -0.0146753994, -0.13948161],
+         [-0.0098938026, 0.0268815303, -0.0356830831,  0.00967590594, 0.0290866982,
+          0.,     0.],
+         [0.00060938476    , -0.00156464723, 0.00216704074,  -0.000575094683
+          , -0.00190789666, 0.,     0.],
+         ]).T
+    rho = np.array([0., 2.970,0.405,2.325,1.113,0.611,1.485,1.101])
+    Q   = np.array([-1., 0.,1.,3.,21.,24.83,250.,21.00])
+    E   = np.array([1.5, 1.94,1.46,1.02,0.98, 1.173,0,0])
+
+    # psi_i(r) = r * sum_j j F[i, j - 1] r^(j - 1) for i < 4, evaluated in
+    # Horner form (coefficients from the highest power). psi_4 is the series
+    # of F[4] at rho[2], a constant; psi_5 multiplies Xi_5 = 0.
+    HORNER_ = (F[:4] * np.arange(1, 10))[:, ::-1].copy()
+    PSI_4_  = rho[2] * np.polyval((F[4] * np.arange(1, 10))[::-1], rho[2])
+
     def __init__(self):
         np.set_printoptions(precision=7)
         np.set_printoptions(suppress=True)
-        f = np.array([
-             [0.48176287000, -1.17810687000, -0.2405126300, -0.075090970300, -0.21382659500,
-              -0.00701074245, -3.56560121],
-             [-0.22996818000, 0.61145818500, -0.3576334170, -0.039464195900, 0.85313703300,
-              0.03926238030,  8.73657614],
-             [0.67678089000, -1.59127084000,  1.3854592100, -0.037603850100, -1.77422585000,
-              -0.11095677400, -11.83502506],
-             [-0.82687853, 2.18816951999, -2.2662842000,  0.404244668000, 2.11856977,
-              0.175796531,  9.56797096],
-             [0.59684665, -1.66416249,  1.89132269, -0.462622543, -1.53874755,
-              -0.158135317, -4.61464670],
-             [-0.26046265, 0.741574506, -0.896367224,  0.24081461, 0.693737872,
-              0.07524343650,  1.22917766],
-             [0.068249584, -0.192234256, 0.244259366, -0.06689881470, -0.190153915,
-              -0.0146753994, -0.13948161],
-             [-0.0098938026, 0.0268815303, -0.0356830831,  0.00967590594, 0.0290866982,
-              0.,     0.],
-             [0.00060938476    , -0.00156464723, 0.00216704074,  -0.000575094683
-              , -0.00190789666, 0.,     0.],
-             ])
-        self.F   = np.asmatrix(f.transpose())
-        self.rho = np.array([0., 2.970,0.405,2.325,1.113,0.611,1.485,1.101])
-        self.Q   = np.array([-1., 0.,1.,3.,21.,24.83,250.,21.00])
-        self.E   = np.array([1.5, 1.94,1.46,1.02,0.98, 1.173,0,0])
         self.Tr = 289.7 # Ref temperature in Kelvin
         self.Rr = 1000. # Ref density in kg/m3
         self.Rm  = 8.31 # Molar gas constant in J/(mol K)
@@ -64,28 +83,113 @@ class XenonES:
 
     def P(self, T, RHO, perfect=False, temp='C'):
         """Computes pressure as a function of density and temperature for xenon
-        T in Celsius
-        rho in kg/m3
-        P in atm
+        T in Celsius (in Kelvin unless temp == 'C'), as a number
+        RHO and P in system_of_units
+        T and RHO can be broadcastable arrays.
         """
-        t = T  / self.Tr
-        if temp == 'C':
-            t = (T + self.T0) / self.Tr    # relative temperature
-        rho = RHO / (kg/m3)
+        t = self.t_(T, temp)    # relative temperature
+        rho = np.asarray(RHO, dtype=float) / (kg/m3)
         r = rho / self.Rr  # relative density
-
-        if perfect == False:
-            p = r * (t + self.FF_(r, t))  # relative pressure
+        scale = self.R * self.Tr * self.Rr * pascal
+
+        if perfect:
+            return r * t * scale
+
+        # relative pressure r (t + FF): the ideal term is folded into psi_0,
+        # whose Xi_0 is t, and the sum runs once over the broadcast shape
+        s0, = self.sums_(r, t, 'psi')
+        return ((r * scale) * s0)[()]
+
+    def dP_drho(self, T, RHO, temp='C'):
+        """Derivative of P with respect to the density (analytic)"""
+        r = np.asarray(RHO, dtype=float) / (kg/m3) / self.Rr
+        _, dp = self.p_(r, self.t_(T, temp))
+        return (dp * self.R * self.Tr * pascal / (kg/m3))[()]
+
+    def virial_coefficients_(self, TK, gas='Xe'):
+        """a, c such that P2 = a RHO + c RHO^2, for temperatures TK in Kelvin"""
+        TK   = np.asarray(TK, dtype=float)
+        R, M = (self.RXe, self.MXe) if gas == 'Xe' else (self.RHe, self.MHe)
+        B    = self.B(TK) / (meter3/mol)
+        return R * TK, R * TK * B / (g/m3) / M
+
+    def density(self, P, T, perfect=False, virial=False, temp='C', gas='Xe',
+                rho_max=1000 * kg/m3, rtol=1e-12, maxiter=100, rho0=None, full_output=False):
+        """Density as a function of pressure and temperature, the inverse of
+        P (of P2 if virial), for scalars or broadcastable arrays of P and T.
+
+        P is inverted with Newton's method on the analytic dP/drho, started
+        from rho0 (the perfect gas density by default) and safeguarded by a
+        bracket in (0, rho_max), where P increases with the density in the gas
+        phase: steps leaving the bracket are replaced by bisection. Pressures
+        above P(T, rho_max) give NaN. The perfect gas and virial (P2, gas 'Xe'
+        or 'He') densities are computed in closed form.
+
+        With full_output returns (rho, InverseInfo).
+        """
+        P, T  = np.broadcast_arrays(np.asarray(P, dtype=float), np.asarray(T, dtype=float))
+        t     = self.t_(T, temp)
+        scale = self.R * self.Tr * self.Rr * pascal
+        iterations = np.zeros(P.shape, dtype=int)
+
+        if perfect:
+            rho = P / scale / t * self.Rr * kg/m3
+            Pr  = lambda rho: self.P(T, rho, perfect=True, temp=temp)
+        elif virial:
+            a, c = self.virial_coefficients_(t * self.Tr, gas)
+            with np.errstate(invalid='ignore'):
+                rho = 2 * P / (a + np.sqrt(a**2 + 4 * c * P))
+            Pr  = lambda rho: a * rho + c * rho**2
         else:
-            p = r * t
-
-        #return p * self.R * self.Tr * self.Rr * self.pascal_to_atm
-        return p * self.R * self.Tr * self.Rr * pascal
+            r, iterations = self.newton_(P / scale, t, rho_max / (kg/m3) / self.Rr,
+                                         rtol, maxiter, rho0)
+            rho = r * self.Rr * kg/m3
+            Pr  = lambda rho: self.P(T, rho, temp=temp)
+
+        if not full_output:
+            return rho[()]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            residual = np.abs(Pr(rho) / P - 1)
+        converged = np.isfinite(rho) & (iterations < maxiter)
+        return rho[()], InverseInfo(converged[()], iterations[()], residual[()])
+
+    def newton_(self, p, t, rmax, rtol, maxiter, rho0):
+        """Relative density r with p_(r, t) = p (see density) and the number
+        of iterations of each point. Only the points that have not converged
+        are evaluated at each iteration.
+        """
+        shape = np.broadcast(p, t).shape
+        p, t  = (np.broadcast_to(x, shape).ravel() for x in (p, t))
+        r     = p / t if rho0 is None else np.broadcast_to(rho0 / (kg/m3) / self.Rr, shape).ravel()
+        r     = np.clip(r, 0, rmax)
+        lo    = np.zeros(r.shape)
+        hi    = np.full(r.shape, float(rmax))
+        iterations = np.zeros(r.shape, dtype=int)
+
+        reachable = self.p_(hi, t)[0] >= p
+        idx       = np.flatnonzero(reachable)
+        for _ in range(maxiter):
+            if idx.size == 0:
+                break
+            f, df  = self.p_(r[idx], t[idx])
+            f     -= p[idx]
+            lo[idx] = np.where(f <= 0, r[idx], lo[idx])
+            hi[idx] = np.where(f >  0, r[idx], hi[idx])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rn = r[idx] - f / df
+            bisect = ~((rn >= lo[idx]) & (rn <= hi[idx]) & (df > 0))
+            rn     = np.where(bisect, 0.5 * (lo[idx] + hi[idx]), rn)
+            done   = np.abs(rn - r[idx]) <= rtol * rn
+            r[idx] = rn
+            iterations[idx] += 1
+            idx    = idx[~done]
+        iterations[idx] = maxiter
+        r[~reachable]   = np.nan
+        return r.reshape(shape), iterations.reshape(shape)
 
     def P2(self, T, RHO, perfect=False, temp='C', gas='Xe'):
         """Pressure a a function of rho and T, using B --secon virial coefficient--"""
-        if temp == 'C':
-            t = self.T0 + T # kelvin
+        t = self.T0 + T if temp == 'C' else T # kelvin
 
         b = 0
         if perfect == False:
@@ -101,53 +205,26 @@ class XenonES:
 
 
     def B(self,T):
-        Ts = T/self.ek
-        return (2/3) * pi * self.N_A * self.sigma**3 * self.Bs_(Ts)
+        """Second virial coefficient at temperatures T (Kelvin, scalar or array)"""
+        return virial.second_virial(T, self.ek, self.sigma, self.Ls, self.N_A)
 
     def Bs_(self, T):
-        return (self.B0s_(T) + self.Ls**2 * self.B1s_(T) + self.Ls**4 * self.B2s_(T) +
-                self.Ls**6 * self.B3s_(T)  + self.Ls**3 * self.Bps_(T))
+        return virial.bs(T, self.Ls)
 
     def B0s_(self, T):
-        if T < 1.1:
-            return - sqrt(T) * exp(1/T) * (1.18623 + 1.00824 * T + 4.25571 * T**2 -
-                                           18.6033 * T**3 + 20.4732 * T**4 - 8.71903 * T**5 +
-                                           1.14829 * T**6)
-
-        elif 1.1 < T < 10:
-            return - sqrt(T) * exp(1/T) * (0.74685 - 1.0384 * log(T) + 0.31634 * (log(T))**2 -
-                                           0.02096 * (log(T))**3 - 0.01498* (log(T))**4)
-        else:
-            return 0. # can be programmed if needed
+        return virial.b0s(T)
 
     def B1s_(self, T):
-        if T < 1.1:
-            return T**(-3/2) * exp(1/T) * (0.158192 - 0.037145 * T - 0.0103125 * T**2 +
-                                           0.0701852 * T**3 - 0.0328399 * T**4)
-
-        elif 1.1 < T < 10:
-            return T**(-3/2)  * exp(1/T) * (0.148 + 0.0241 * log(T) - 0.0123 * (log(T))**2 +
-                                            0.0096 * (log(T))**3 - 0.0014* (log(T))**4)
-        else:
-            return 0. # can be programmed if needed
+        return virial.b1s(T)
 
     def B2s_(self, T):
-        if T < 10:
-            return T**(-7/2) * exp(1/T) * (0.0152 + 0.0126 * T + 0.0001 * T**2)
-        else:
-            return 0. # can be programmed if needed
+        return virial.b2s(T)
 
     def B3s_(self, T):
-        if T < 1.1:
-            return T**(-11/2) * exp(1/T) * (0.001 + 0.006 * T - 0.0197 * T**3 +
-                                            0.032 * T**4 - 0.0128 * T**5)
-        elif 1.1 < T < 10:
-            return T**(-11/2)  * exp(1/T) * (0.0051 - 0.0112 * T - 0.0021 * T**2)
-        else:
-            return 0. # can be programmed if needed
+        return virial.b3s(T)
 
     def Bps_(self, T):
-        return 0
+        return virial.bps(T)
 
     def psi_(self,i, r):
 
@@ -181,13 +258,115 @@ class XenonES:
         else:
             return 0
 
+    def series_(self, r, t, derivative=False):
+        """psi_i(r) and Xi_i(t) for the terms of FF_ that do not vanish
+        (i < 5), stacked along the first axis, each computed on the shape of
+        its own argument. If derivative, also returns dpsi_i/dr.
+        """
+        r, t = np.asarray(r, dtype=float), np.asarray(t, dtype=float)
+        acc  = np.zeros((4,) + r.shape)
+        dacc = np.zeros((4,) + r.shape)
+        for c in self.HORNER_.T:
+            if derivative:
+                dacc = dacc * r + acc
+            acc = acc * r + c.reshape((4,) + (1,) * r.ndim)
+        psi  = np.concatenate([r * acc, np.full((1,) + r.shape, self.PSI_4_)])
+        xi   = t**(-self.Q[:5].reshape((5,) + (1,) * t.ndim))
+        if not derivative:
+            return psi, xi
+        dpsi = np.concatenate([acc + r * dacc, np.zeros((1,) + r.shape)])
+        return psi, xi, dpsi
+
     def FF_(self, r, t):
+        """Reduced residual pressure sum_i psi_i(r) Xi_i(t), for broadcastable
+        arrays of reduced density r and temperature t
+        """
+        psi, xi = self.series_(r, t)
+        return np.einsum('i...,i...->...', psi, xi)[()]
+
+    def FF_loop_(self, r, t):
+        """Term by term evaluation of FF_ (reference)"""
         f = 0
         for i in range(6):
             f += self.psi_(i, r) * self.Xi_(i, t)
         return f
 
 
+    def t_(self, T, temp='C'):
+        """Relative temperature"""
+        T = np.asarray(T, dtype=float)
+        return (T + self.T0) / self.Tr if temp == 'C' else T / self.Tr
+
+    def p_(self, r, t):
+        """Relative pressure r (t + FF_(r, t)) and its derivative with respect to r"""
+        s0, s1 = self.sums_(r, t, 'psi', 'dpsi')
+        return r * s0, s0 + r * s1
+
+    def sums_(self, r, t, *terms):
+        """Contractions over i of the series (with the ideal term in psi_0)
+        on the broadcast shape of r and t, one for each of terms:
+        'psi' sum psi_i Xi_i, 'dpsi' sum dpsi_i/dr Xi_i and 'q' sum Q_i psi_i Xi_i
+        (so that sum psi_i dXi_i/dt = -q / t). psi and Xi are contracted as
+        they are: the factors depending on r or t only are left to the
+        caller, to be applied once after the sum.
+        """
+        r, t = np.asarray(r, dtype=float), np.asarray(t, dtype=float)
+        psi, xi, *dpsi = self.series_(r, t, derivative='dpsi' in terms)
+        psi[0] += 1
+        operands = {'psi':  lambda: (psi, xi),
+                    'dpsi': lambda: (dpsi[0], xi),
+                    # Q_i Xi_i on the shape of t only
+                    'q':    lambda: (psi, self.Q[:5].reshape((5,) + (1,) * t.ndim) * xi)}
+        return [np.einsum('i...,i...->...', *operands[term]()) for term in terms]
+
+    def reduced_(self, T, RHO, temp):
+        """Relative density and temperature"""
+        return np.asarray(RHO, dtype=float) / (kg/m3) / self.Rr, self.t_(T, temp)
+
+    def state(self, T, RHO, temp='C'):
+        """Pressure and its analytic derivatives at temperatures T (Celsius
+        if temp == 'C') and densities RHO (broadcastable arrays): EOSState with
+        P, dP/drho (at constant T), dP/dT (at constant rho, per kelvin), the
+        compressibility factor Z and the isothermal compressibility kappa_T.
+
+        All come from three contractions of the series (see sums_), with
+        dXi_i/dt = -Q_i Xi_i / t; the factors depending on RHO or T only are
+        applied after them, in place where possible.
+        """
+        r, t       = self.reduced_(T, RHO, temp)
+        scale      = self.R * self.Tr * self.Rr * pascal
+        s0, dp, sq = (np.asarray(s) for s in self.sums_(r, t, 'psi', 'dpsi', 'q'))
+        rscale     = r * scale
+        P          = rscale * s0
+        dp        *= r
+        dp        += s0                            # d(r (t + FF)) / dr
+        Z          = np.divide(s0, t, out=s0)
+        dP_drho    = dp * (scale / (self.Rr * kg/m3))
+        sq        *= -rscale / self.Tr
+        dP_dT      = np.divide(sq, t, out=sq)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            kappa_T = np.reciprocal(np.multiply(rscale, dp, out=dp), out=dp)
+        return EOSState(P[()], dP_drho[()], dP_dT[()], Z[()], kappa_T[()])
+
+    def Z(self, T, RHO, temp='C'):
+        """Compressibility factor P / (rho R T)"""
+        r, t = self.reduced_(T, RHO, temp)
+        s0,  = self.sums_(r, t, 'psi')
+        return (s0 / t)[()]
+
+    def kappa_T(self, T, RHO, temp='C'):
+        """Isothermal compressibility (1 / rho) drho/dP"""
+        r, t    = self.reduced_(T, RHO, temp)
+        s0, dp  = self.sums_(r, t, 'psi', 'dpsi')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (1 / ((r * self.R * self.Tr * self.Rr * pascal) * (s0 + r * dp)))[()]
+
+    def dP_dT(self, T, RHO, temp='C'):
+        """Derivative of P with respect to the temperature at constant density"""
+        r, t = self.reduced_(T, RHO, temp)
+        sq,  = self.sums_(r, t, 'q')
+        return (sq * (-r * self.R * self.Rr * pascal) / t)[()]
+
     def __str__(self):
         return '< F = {}\n rho = {}\n Q = {}\n E = {}>'.format(self.F, self.rho, self.Q, self.E)
 
@@ -195,11 +374,17 @@ class XenonES:
 
 
 class XeHe:
+    """Mixture of xenon and helium: mass m (of the xenon for xHe = 0) in a
+    volume V at temperature tc (Celsius), with molar fractions xHe, xXe.
+    The arguments can be broadcastable arrays (see grid), and the pressures
+    are computed at tc unless another temperature is given.
+    """
     def __init__(self, m, V, tc, xHe, xXe):
         self.R = 8.31441 * J/(K * mol)
         self.T0 = 273.15 # 0 in K
         self.MXe = 131.29 * g/mol
         self.MHe = 4 * g/mol
+        self.tc = tc
         self.T = (self.T0 + tc) * K
         self.m = m
         self.V = V
@@ -214,50 +399,50 @@ class XeHe:
         self.xXe = xXe
         self.xHe = xHe
 
-    def tK(self, tc):
-        return (273.15 + tc) * K
+    @classmethod
+    def grid(cls, m, V, tc, xHe):
+        """Mixtures over the grid (temperature, helium fraction, mass), with
+        xXe = 1 - xHe: tc, xHe and m (scalars or 1-d arrays) are laid along
+        the axes 0, 1 and 2, so that e.g, pB() has shape (len(tc), len(xHe), len(m)).
+        """
+        tc  = np.asarray(tc,  dtype=float).reshape(-1, 1, 1)
+        xHe = np.asarray(xHe, dtype=float).reshape(1, -1, 1)
+        m   = np.asarray(m,   dtype=float).reshape(1, 1, -1)
+        return cls(m, V, tc, xHe, 1 - xHe)
+
+    def tK(self, tc=None):
+        return (273.15 + (self.tc if tc is None else tc)) * K
 
-    def pXe(self, tc):
+    def pXe(self, tc=None):
         return (self.nXe * self.R * self.tK(tc)) / self.V
 
-    def pHe(self, tc):
+    def pHe(self, tc=None):
         return (self.nHe * self.R * self.tK(tc)) / self.V
 
-    def p(self, tc):
+    def p(self, tc=None):
         return self.pXe(tc) + self.pHe(tc)
 
-    def pBXe(self, tc):
+    def pBXe(self, tc=None):
         return self.pXe(tc) * (1 + self.B(self.tK(tc), self.xHe, self.xXe) * self.nXe/self.V)
 
-    def pBHe(self, tc):
+    def pBHe(self, tc=None):
         return self.pHe(tc)  * (1 + self.B(self.tK(tc), self.xHe, self.xXe) * self.nHe/self.V)
 
-    def pB(self, tc):
+    def pB(self, tc=None):
         return self.pBXe(tc) + self.pBHe(tc)
 
 
     def B(self, T, zHe, zXe):
-        if zXe == 1:
-            return self.BXe(T)
-        elif zHe == 1:
-             return self.BHe(T)
-        else:
-            return self.BXeHe(T, zHe, zXe)
+        return virial.b_mixture(T, zHe, zXe)
 
     def BXe(self,T):
-        b0 = 5.797E-5  * (meter**3/mol)
-        L = 1.6940
-        ekb = 181.8     #K
-        D = exp(ekb/T) - 1
-        return b0 * ( 1 - (L**3 -1) * D )
+        return virial.b_xe(T)
 
     def BHe(self,T):
-        return 11.885370 + 6.6508722E-3 * T - 3.305894E-5 * T**2 + 3.1354694E-8 * T**3
+        return virial.b_he(T)
 
     def BXeHe(self, T, x1=0.15, x2=0.85):
-        def B12(T):
-            return 2.756941E-4 + (4.617880) / T - 1.741538 / T**3 + 1.364453E+2 / T**3
-        return x1**2 * self.BHe(T) + x2**2 * self.BXe(T) + 2 * x1 * x2 * B12(T)
+        return virial.b_xehe(T, x1, x2)
 
 
     def __str__(self):
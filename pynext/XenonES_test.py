@@ -0,0 +1,96 @@
+from . XenonES import XenonES
+from pynext.system_of_units import *
+
+from pytest import approx
+import numpy as np
+
+
+def test_density():
+    xe  = XenonES()
+    P   = np.array([[5], [10], [15]]) * bar
+    T   = np.array([0, 20, 50])
+    rho = xe.density(P, T)
+    assert rho.shape == (3, 3)
+    assert np.allclose(xe.P(T, rho), P, rtol=1e-10)
+    assert xe.density(15 * bar, 20) / (kg/m3) == approx(88.5, rel=1e-3)
+    assert np.isnan(xe.density(100 * bar, 20))
+
+
+def test_pressure_grid():
+    xe  = XenonES()
+    T   = np.linspace(-100, 100, 201)[:, np.newaxis]
+    rho = np.linspace(1, 1500, 151) * kg/m3
+    P   = xe.P(T, rho)
+    assert P.shape == (201, 151)
+
+    t   = (T + xe.T0) / xe.Tr
+    r   = rho / (kg/m3) / xe.Rr
+    ref = r * (t + xe.FF_loop_(r, t)) * xe.R * xe.Tr * xe.Rr * pascal
+    assert np.allclose(P, ref, rtol=1e-10, atol=1e-10 * np.abs(ref).max())
+    assert xe.P(20, 89.9 * kg/m3) / bar == approx(15.2077, rel=1e-5)
+
+
+def test_density_newton():
+    xe  = XenonES()
+    P   = np.linspace(1, 50, 200) * bar
+    T   = np.linspace(0, 60, 200)
+    rho, info = xe.density(P, T, full_output=True)
+    assert np.all(info.converged)
+    assert info.iterations.max() <= 8
+    assert info.residual.max() < 1e-12
+
+    rho, info = xe.density(100 * bar, 20, full_output=True)
+    assert np.isnan(rho) and not info.converged
+
+    r = 89.9 * kg/m3
+    h = 1e-6 * r
+    assert xe.dP_drho(20, r) == approx((xe.P(20, r + h) - xe.P(20, r - h)) / (2 * h), rel=1e-6)
+
+
+def test_density_variants():
+    xe = XenonES()
+    rho = xe.density(15 * bar, 20, perfect=True)
+    assert xe.P(20, rho, perfect=True) / bar == approx(15)
+    rho = xe.density(np.array([5, 15]) * bar, 20, virial=True)
+    assert xe.P2(20, rho[1]) / bar == approx(15)
+    assert rho[1] / (kg/m3) == approx(xe.density(15 * bar, 20) / (kg/m3), rel=1e-2)
+
+
+def test_state_derivatives():
+    xe  = XenonES()
+    T   = np.linspace(-20, 100, 61)[:, np.newaxis]
+    rho = np.linspace(1, 400, 81) * kg/m3
+    s   = xe.state(T, rho)
+    assert np.array_equal(s.P, xe.P(T, rho))
+
+    h   = 1e-4
+    dT  = (xe.P(T + h, rho) - xe.P(T - h, rho)) / (2 * h)
+    assert np.allclose(s.dP_dT, dT, rtol=1e-7)
+    assert np.allclose(s.dP_drho, xe.dP_drho(T, rho), rtol=1e-12)
+    assert np.allclose(s.Z, s.P / (rho * xe.R * (T + xe.T0) * J/kg), rtol=1e-12)
+    assert np.allclose(s.kappa_T * rho * s.dP_drho, 1)
+
+    assert xe.Z(20, 89.9 * kg/m3)          == approx(0.9117, abs=1e-4)
+    assert xe.kappa_T(20, 89.9 * kg/m3) * bar == approx(0.0727, abs=1e-4)
+
+
+def test_state_cost(monkeypatch):
+    """state takes three contractions of the series over the broadcast
+    shape, and each single-quantity wrapper only those it needs
+    """
+    xe    = XenonES()
+    T     = np.linspace(-20, 100, 500)[:, np.newaxis]
+    rho   = np.linspace(1, 400, 500) * kg/m3
+    calls = []
+    einsum = np.einsum
+
+    def counting(*args, **kwargs):
+        result = einsum(*args, **kwargs)
+        calls.append(np.shape(result))
+        return result
+
+    monkeypatch.setattr(np, 'einsum', counting)
+    for f, n in ((xe.state, 3), (xe.P, 1), (xe.Z, 1), (xe.dP_dT, 1), (xe.kappa_T, 2)):
+        calls.clear()
+        f(T, rho)
+        assert calls == [(500, 500)] * n
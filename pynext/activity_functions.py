@@ -4,7 +4,6 @@ activity functions
 
 from math import pi, exp, log
 from . system_of_units import *
-import pandas as pd
 from collections import namedtuple
 
 # Cylindrical Vessel Activity (CVA)
@@ -67,6 +66,7 @@ def print_activity_of_CV(act, unit='Bq'):
 
 
 def activity_table(activities):
+    import pandas as pd
 
     df = pd.DataFrame(activities, columns=activities[0]._fields)
     #df2 = df[['name','body_bi214', 'head_bi214', 'body_tl208','head_tl208']].copy()
@@ -0,0 +1,171 @@
+"""
+cache
+On-disk cache for precomputed tables and in-memory cache of derived quantities
+"""
+import os
+import json
+import numpy as np
+from collections import namedtuple, OrderedDict
+
+
+def cache_dir():
+    """Directory holding the cached tables:
+    $PYNEXT_CACHE_DIR if defined, otherwise $XDG_CACHE_HOME/pynext
+    (~/.cache/pynext by default).
+    """
+    path = os.environ.get('PYNEXT_CACHE_DIR')
+    if path is None:
+        xdg  = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+        path = os.path.join(xdg, 'pynext')
+    return path
+
+
+def cache_path(name):
+    return os.path.join(cache_dir(), name)
+
+
+def load_array(name, meta):
+    """Memory-maps the cached array name.npy if its metadata (name.json)
+    matches meta. Returns (array, stored metadata) or (None, None).
+    """
+    path = cache_path(name)
+    try:
+        with open(path + '.json') as f:
+            stored = json.load(f)
+        if any(stored.get(k) != v for k, v in meta.items()):
+            return None, None
+        return np.load(path + '.npy', mmap_mode='r'), stored
+    except (OSError, ValueError):
+        return None, None
+
+
+def save_array(name, array, meta):
+    """Writes name.npy and name.json atomically. Returns False (and leaves
+    the cache untouched) if the cache directory is not writable.
+    """
+    path = cache_path(name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp + '.npy', 'wb') as f:
+            np.save(f, array)
+        with open(tmp + '.json', 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp + '.npy',  path + '.npy')
+        os.replace(tmp + '.json', path + '.json')
+        return True
+    except OSError:
+        return False
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses size')
+
+
+def nbytes(value):
+    """Approximate memory taken by a cached key or value: the data of
+    arrays and bytes, summed over tuples, lists and dicts, and a fixed
+    size (64) for other objects
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 64
+    if isinstance(value, (bytes, str)):
+        return len(value) + 64
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value) + 64
+    if isinstance(value, dict):
+        return sum(nbytes(k) + nbytes(v) for k, v in value.items()) + 64
+    return 64
+
+
+class SharedCache:
+    """Cache of derived quantities shared by all the objects, keyed by
+    value (e.g, the material and the shape of a PhysicalVolume, which are
+    immutable values), so that equal objects built separately compute them
+    once. The least recently used entries are dropped when there are more
+    than maxsize, or when keys and values (arrays, for array materials or
+    shape batches) take more than maxbytes; a single value larger than
+    maxbytes is returned but not stored.
+    """
+    def __init__(self, maxsize=4096, maxbytes=256 * 2**20):
+        self.maxsize  = maxsize
+        self.maxbytes = maxbytes
+        self.values   = OrderedDict()    # key: (value, nbytes)
+        self.nbytes   = 0
+        self.hits     = 0
+        self.misses   = 0
+
+    def lookup(self, key, compute):
+        """(value, True) if key is cached, else (compute(), False)"""
+        try:
+            value, _ = self.values[key]
+            self.values.move_to_end(key)
+            self.hits += 1
+            return value, True
+        except KeyError:
+            value = compute()
+            self.misses += 1
+            size  = nbytes(key) + nbytes(value)
+            if size <= self.maxbytes:
+                self.values[key] = (value, size)
+                self.nbytes     += size
+                while len(self.values) > self.maxsize or self.nbytes > self.maxbytes:
+                    _, (_, dropped) = self.values.popitem(last=False)
+                    self.nbytes    -= dropped
+            return value, False
+
+    def clear(self):
+        self.values.clear()
+        self.nbytes = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, len(self.values))
+
+
+_shared = SharedCache()
+
+
+def shared_cache():
+    """The SharedCache of the derived quantities of physical volumes"""
+    return _shared
+
+
+class DerivedCache:
+    """Per-instance cache of derived quantities (mass, activities...).
+    Every lookup carries a key describing the state the quantities depend on
+    (e.g, the material and the shape of a PhysicalVolume); all stored values
+    are dropped as soon as that key changes. With a SharedCache (shared),
+    values missing from the instance are looked up there, by (key, name),
+    and only computed if no equal object computed them before.
+    """
+    def __init__(self, shared=None):
+        self.values = {}
+        self.key    = None
+        self.shared = shared
+        self.hits   = 0
+        self.misses = 0
+
+    def get(self, key, name, compute):
+        if key != self.key:
+            self.values.clear()
+            self.key = key
+        try:
+            value = self.values[name]
+            self.hits += 1
+        except KeyError:
+            if self.shared is None:
+                value, hit = compute(), False
+            else:
+                value, hit = self.shared.lookup((key, name), compute)
+            self.values[name] = value
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value
+
+    def clear(self):
+        self.values.clear()
+        self.key = None
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, len(self.values))
@@ -0,0 +1,26 @@
+"""
+Test configuration: the tables cached by the package (attenuation and
+self-shielding tables, material catalogs, NIST tables, EOS surfaces) are
+written to a temporary directory, not to the user's cache. The variable is
+set before collection, since importing the materials (e.g, from
+pynext.Material import pb) already loads the catalogs.
+"""
+import os
+import shutil
+import tempfile
+
+_saved = {}
+
+
+def pytest_configure(config):
+    _saved['env']  = os.environ.get('PYNEXT_CACHE_DIR')
+    _saved['path'] = tempfile.mkdtemp(prefix='pynext-cache-')
+    os.environ['PYNEXT_CACHE_DIR'] = _saved['path']
+
+
+def pytest_unconfigure(config):
+    if _saved.get('env') is None:
+        os.environ.pop('PYNEXT_CACHE_DIR', None)
+    else:
+        os.environ['PYNEXT_CACHE_DIR'] = _saved['env']
+    shutil.rmtree(_saved.get('path', ''), ignore_errors=True)
@@ -0,0 +1,181 @@
+"""
+EOS benchmark
+Throughput and accuracy of the pressure models of XenonES:
+- series:  XenonES.P (NIST series),
+- virial:  XenonES.P2 (second virial coefficient),
+- perfect: XenonES.P(perfect=True).
+
+Throughput is measured in evaluations per second, calling the model on
+scalars one by one and once on arrays. Accuracy is the relative deviation
+P_model / P_NIST - 1 over the rows of the NIST tables: the single-phase
+rows (fluid) and the saturated vapor of the two-phase rows (vapor), over
+their whole temperature range.
+
+Results are plain dictionaries, stored as JSON, so a run can be compared
+with a reference run:
+
+python -m pynext.eos_benchmark --output eos.json --reference eos_ref.json
+
+exits with status 1 if a model got slower or less accurate than the
+reference by more than the tolerances.
+"""
+import sys
+import json
+import time
+import platform
+import numpy as np
+from . system_of_units import *
+from . XenonES import XenonES
+from . nist_tables import NIST_DIR, nist_tables
+
+VERSION = 1
+
+
+def models(eos=None):
+    """Pressure models by name, as functions P(T, rho) of T in Celsius"""
+    eos = XenonES() if eos is None else eos
+    return {'series':  lambda T, rho: eos.P(T, rho),
+            'virial':  lambda T, rho: eos.P2(T, rho),
+            'perfect': lambda T, rho: eos.P(T, rho, perfect=True)}
+
+
+def _best_time(f, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        t0   = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def throughput(model, n_scalar=1000, n_vector=100000, repeat=5, seed=0):
+    """Evaluations per second of model on n_scalar scalar calls and on
+    one call with arrays of n_vector gas states (best of repeat)
+    """
+    rng = np.random.default_rng(seed)
+    T   = rng.uniform(-20, 100, n_vector)
+    rho = rng.uniform(1, 500, n_vector) * kg/m3
+    Ts, rhos = T[:n_scalar].tolist(), rho[:n_scalar].tolist()
+
+    def scalar():
+        for t, r in zip(Ts, rhos):
+            model(t, r)
+
+    ts = _best_time(scalar, repeat)
+    tv = _best_time(lambda: model(T, rho), repeat)
+    return dict(scalar  = n_scalar / ts,
+                vector  = n_vector / tv,
+                speedup = (n_vector / tv) / (n_scalar / ts))
+
+
+def nist_states(directory=NIST_DIR):
+    """(T, rho, P) of the NIST tables of directory, by region (fluid, vapor)"""
+    states = {'fluid': [], 'vapor': []}
+    for t in nist_tables(directory).values():
+        for region, rows in (('fluid', ~t.two_phase), ('vapor', t.two_phase)):
+            states[region].append(np.array([t['T'][rows], t['rho_v'][rows], t['P'][rows]]))
+    return {region: np.concatenate(s, axis=1) if s else np.empty((3, 0))
+            for region, s in states.items()}
+
+
+def deviation(model, states):
+    """Relative deviation of model from the states of nist_states: number
+    of states, maximum and rms of |P / P_NIST - 1|, and the temperature of
+    the maximum, by region
+    """
+    result = {}
+    for region, (T, rho, P) in states.items():
+        if len(T) == 0:
+            continue
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            d = np.abs(model(T, rho) / P - 1)
+        i = int(np.nanargmax(d))
+        result[region] = dict(n     = len(T),
+                              max   = float(d[i]),
+                              rms   = float(np.sqrt(np.nanmean(d**2))),
+                              T_max = float(T[i]),
+                              T     = [float(T.min()), float(T.max())])
+    return result
+
+
+def run(eos=None, directory=NIST_DIR, **kwargs):
+    """Benchmark of all the models (kwargs are passed to throughput)"""
+    states = nist_states(directory)
+    result = dict(version = VERSION,
+                  python  = platform.python_version(),
+                  numpy   = np.__version__,
+                  models  = {})
+    for name, model in models(eos).items():
+        result['models'][name] = dict(throughput = throughput(model, **kwargs),
+                                      deviation  = deviation(model, states))
+    return result
+
+
+def save(result, path):
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(result, reference, speed_tol=0.3, accuracy_tol=1e-3):
+    """Regressions of result with respect to reference: throughputs lower
+    by more than a fraction speed_tol, and maximum deviations larger by
+    more than a fraction accuracy_tol. Returns a list of messages.
+    """
+    regressions = []
+    for name, ref in reference['models'].items():
+        cur = result['models'].get(name)
+        if cur is None:
+            regressions.append('{}: model missing'.format(name))
+            continue
+        for mode in ('scalar', 'vector'):
+            r, c = ref['throughput'][mode], cur['throughput'][mode]
+            if c < (1 - speed_tol) * r:
+                regressions.append('{}: {} throughput {:.3g}/s, reference {:.3g}/s'.format(
+                                   name, mode, c, r))
+        for region, d in ref['deviation'].items():
+            c = cur['deviation'].get(region, dict(max=np.inf))['max']
+            if not c <= d['max'] * (1 + accuracy_tol) + 1e-12:
+                regressions.append('{}: {} max deviation {:.3g}, reference {:.3g}'.format(
+                                   name, region, c, d['max']))
+    return regressions
+
+
+def report(result):
+    lines = ['{:8s} {:>12s} {:>12s} {:>8s}   {}'.format(
+             'model', 'scalar/s', 'vector/s', 'speedup', 'max |dP/P| (fluid, vapor)')]
+    for name, m in result['models'].items():
+        t, d = m['throughput'], m['deviation']
+        lines.append('{:8s} {:12.4g} {:12.4g} {:8.1f}   {}'.format(
+                     name, t['scalar'], t['vector'], t['speedup'],
+                     ', '.join('{:.2e}'.format(d[r]['max']) for r in ('fluid', 'vapor') if r in d)))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark of the xenon EOS models')
+    parser.add_argument('--output',       help='JSON file for the results')
+    parser.add_argument('--reference',    help='JSON results to compare with')
+    parser.add_argument('--speed-tol',    type=float, default=0.3)
+    parser.add_argument('--accuracy-tol', type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    result = run()
+    print(report(result))
+    if args.output:
+        save(result, args.output)
+    if args.reference:
+        regressions = compare(result, load(args.reference), args.speed_tol, args.accuracy_tol)
+        for r in regressions:
+            print('REGRESSION', r)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+from . eos_benchmark import run, save, load, compare, report
+
+import copy
+
+
+def test_benchmark(tmp_path):
+    result = run(n_scalar=20, n_vector=1000, repeat=1)
+    assert set(result['models']) == {'series', 'virial', 'perfect'}
+    series = result['models']['series']
+    assert series['throughput']['vector'] > series['throughput']['scalar']
+    assert series['deviation']['fluid']['max'] < 5e-3
+    assert series['deviation']['vapor']['max'] < 5e-3
+    assert result['models']['perfect']['deviation']['fluid']['max'] > 0.05
+    assert 'series' in report(result)
+
+    path = str(tmp_path / 'eos.json')
+    save(result, path)
+    reference = load(path)
+    assert compare(result, reference) == []
+
+    slower = copy.deepcopy(result)
+    slower['models']['series']['throughput']['vector'] /= 10
+    worse  = copy.deepcopy(result)
+    worse['models']['virial']['deviation']['fluid']['max'] *= 2
+    assert len(compare(slower, reference)) == 1
+    assert compare(worse, reference)[0].startswith('virial: fluid')
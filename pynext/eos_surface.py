@@ -0,0 +1,165 @@
+"""
+EOS surfaces
+Equations of state tabulated over a domain and interpolated with bicubic
+splines: pressure of xenon P(T, rho), its inverse rho(T, P), and the
+pressure of xenon-helium mixtures pB(T, xHe).
+
+The grid is refined adaptively: the intervals (of either axis) where the
+interpolation error, measured at the midpoints of the cell edges and at the
+cell centers, exceeds rtol are split in two, until it is below rtol at all
+those midpoints. The bound is measured at the midpoints only, not
+guaranteed between them; the maximum measured relative error is kept as
+max_error. If the grid reaches max_points along an axis first, the
+refinement stops and a RuntimeWarning reports the error reached.
+
+Surfaces are stored in the pynext cache directory, keyed by a digest of the
+EOS coefficients (the dtype, shape and bytes of arrays), the domain and the
+tolerance.
+"""
+import hashlib
+import warnings
+import numpy as np
+from . system_of_units import *
+from . cache import load_array, save_array
+from . XenonES import XenonES, XeHe
+
+
+def _update(h, part):
+    """Feeds part to the hash h: arrays by dtype, shape and bytes, tuples and
+    lists item by item, other values by repr (independent of numpy's print
+    options, which only apply to arrays)
+    """
+    if isinstance(part, np.ndarray):
+        h.update('ndarray{}{}'.format(part.dtype.str, part.shape).encode())
+        h.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, (tuple, list)):
+        h.update('{}{}('.format(type(part).__name__, len(part)).encode())
+        for p in part:
+            _update(h, p)
+        h.update(b')')
+    else:
+        h.update(repr(part).encode())
+        h.update(b',')
+
+
+def _digest(*parts):
+    h = hashlib.sha1()
+    _update(h, parts)
+    return h.hexdigest()
+
+
+class EOSSurface:
+    """Function f(x, y), vectorized over broadcastable arrays, tabulated
+    over domain ((x0, x1), (y0, y1)). key describes f (its coefficients) and
+    keys the cached table together with the domain and rtol.
+    Points outside the domain are computed with f.
+    """
+    VERSION = 2
+
+    def __init__(self, f, domain, key, name='eos_surface', rtol=1e-6, n=9, max_points=1025,
+                 cache=True):
+        self.f      = f
+        self.domain = tuple(tuple(float(v) for v in d) for d in domain)
+        self.rtol   = rtol
+        self.digest = _digest(self.VERSION, key, self.domain, rtol, n, max_points)
+        self.name   = '{}_v{}_{}'.format(name, self.VERSION, self.digest[:16])
+
+        z, stored = load_array(self.name, dict(version=self.VERSION, digest=self.digest)) \
+                    if cache else (None, None)
+        if z is None:
+            self.x, self.y, z, self.max_error = self._refine(n, max_points)
+            if cache:
+                save_array(self.name, z, dict(version=self.VERSION, digest=self.digest,
+                                              x=list(self.x), y=list(self.y),
+                                              max_error=self.max_error))
+        else:
+            self.x, self.y  = np.array(stored['x']), np.array(stored['y'])
+            self.max_error  = stored['max_error']
+        if self.max_error > rtol:
+            warnings.warn('{}: interpolation error {:.2e} above rtol = {:.2e} at {} x {} '
+                          'points (max_points = {})'.format(self.name, self.max_error, rtol,
+                                                            len(self.x), len(self.y), max_points),
+                          RuntimeWarning, stacklevel=2)
+        self.z = np.asarray(z)
+        self._spline()
+
+    def _spline(self):
+        from scipy.interpolate import RectBivariateSpline
+        self.spline = RectBivariateSpline(self.x, self.y, self.z, kx=3, ky=3, s=0)
+
+    def _error(self, x, y):
+        exact = self.f(x[:, np.newaxis], y[np.newaxis, :])
+        return np.abs(self.spline(x, y) / exact - 1)
+
+    def _refine(self, n, max_points):
+        (x0, x1), (y0, y1) = self.domain
+        self.x = np.linspace(x0, x1, n)
+        self.y = np.linspace(y0, y1, n)
+        while True:
+            self.z = self.f(self.x[:, np.newaxis], self.y[np.newaxis, :])
+            if not np.all(np.isfinite(self.z)):
+                raise ValueError('{}: function not finite over the domain {}'.format(
+                                 self.name, self.domain))
+            self._spline()
+            xm = 0.5 * (self.x[1:] + self.x[:-1])
+            ym = 0.5 * (self.y[1:] + self.y[:-1])
+            ec = self._error(xm, ym)
+            ex = np.maximum(ec.max(axis=1), self._error(xm, self.y).max(axis=1))
+            ey = np.maximum(ec.max(axis=0), self._error(self.x, ym).max(axis=0))
+            max_error = float(max(ex.max(), ey.max()))
+
+            split_x = ex > self.rtol
+            split_y = ey > self.rtol
+            full    = (len(self.x) + split_x.sum() > max_points or
+                       len(self.y) + split_y.sum() > max_points)
+            if max_error <= self.rtol or full:
+                return self.x, self.y, self.z, max_error
+            self.x = np.sort(np.concatenate([self.x, xm[split_x]]))
+            self.y = np.sort(np.concatenate([self.y, ym[split_y]]))
+
+    def __call__(self, x, y):
+        """f(x, y) for broadcastable arrays x and y"""
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        (x0, x1), (y0, y1) = self.domain
+        inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+
+        z = np.empty(x.shape)
+        z[inside] = self.spline.ev(x[inside], y[inside])
+        if not np.all(inside):
+            z[~inside] = self.f(x[~inside], y[~inside])
+        return z[()]
+
+    def __str__(self):
+        return '<EOSSurface {}: grid {} x {} over {}, max error = {:.2e}>'.format(
+                self.name, len(self.x), len(self.y), self.domain, self.max_error)
+
+    __repr__ = __str__
+
+
+def _xenon_key(eos, temp):
+    return (type(eos).__name__, eos.F, eos.rho, eos.Q, eos.Tr, eos.Rr, eos.R, temp)
+
+
+def pressure_surface(eos=None, T=(-50, 100), rho=(1 * kg/m3, 500 * kg/m3), temp='C', **kwargs):
+    """P(T, rho) of XenonES over T (Celsius if temp == 'C') and rho"""
+    eos = XenonES() if eos is None else eos
+    return EOSSurface(lambda T, rho: eos.P(T, rho, temp=temp), (T, rho),
+                      key=_xenon_key(eos, temp), name='xenon_pressure', **kwargs)
+
+
+def density_surface(eos=None, T=(20, 100), P=(1 * bar, 50 * bar), temp='C', **kwargs):
+    """rho(T, P) of XenonES (XenonES.density). The domain must lie in the
+    gas phase, where the density is defined.
+    """
+    eos = XenonES() if eos is None else eos
+    return EOSSurface(lambda T, P: eos.density(P, T, temp=temp), (T, P),
+                      key=_xenon_key(eos, temp), name='xenon_density', **kwargs)
+
+
+def xehe_pressure_surface(m, V, T=(-50, 100), xHe=(0, 0.2), **kwargs):
+    """XeHe(m, V, T, xHe, 1 - xHe).pB(T) over T (Celsius) and the helium
+    fraction xHe
+    """
+    def pB(tc, x):
+        return XeHe(m, V, tc, x, 1 - x).pB()
+    return EOSSurface(pB, (T, xHe), key=('XeHe', m, V), name='xehe_pressure', **kwargs)
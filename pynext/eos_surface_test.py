@@ -0,0 +1,56 @@
+from . eos_surface import pressure_surface, density_surface, xehe_pressure_surface
+from . XenonES import XenonES, XeHe
+from pynext.system_of_units import *
+
+import pytest
+from pytest import approx
+import numpy as np
+
+
+def test_surfaces(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    xe  = XenonES()
+    rng = np.random.default_rng(1)
+    T   = rng.uniform(20, 50, 1000)
+
+    ps  = pressure_surface(T=(20, 50), rho=(10 * kg/m3, 200 * kg/m3), rtol=1e-7)
+    rho = rng.uniform(10, 200, 1000) * kg/m3
+    assert ps.max_error <= 1e-7
+    assert np.abs(ps(T, rho) / xe.P(T, rho) - 1).max() < 2 * ps.max_error
+
+    ds  = density_surface(T=(20, 50), P=(5 * bar, 20 * bar))
+    P   = rng.uniform(5, 20, 1000) * bar
+    assert np.abs(ds(T, P) / xe.density(P, T) - 1).max() < 2 * ds.max_error
+    assert ds(10, 10 * bar) == approx(xe.density(10 * bar, 10), rel=1e-12)
+
+    cached = density_surface(T=(20, 50), P=(5 * bar, 20 * bar))
+    assert cached.name == ds.name
+    assert np.array_equal(cached.x, ds.x) and cached(T, P) == approx(ds(T, P), rel=1e-14)
+
+
+def test_xehe_surface(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    s = xehe_pressure_surface(100 * kg, 1 * m3, T=(0, 40), xHe=(0, 0.15))
+    assert s(20, 0.1) == approx(XeHe(100 * kg, 1 * m3, 20, 0.1, 0.9).pB(20), rel=2 * s.max_error)
+
+
+def test_surface_key(tmp_path, monkeypatch):
+    """Coefficients differing beyond the printed precision key different tables"""
+    from . eos_surface import _digest, _xenon_key
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    xe, other = XenonES(), XenonES()
+    other.F   = xe.F + 1e-12
+    assert _digest(_xenon_key(xe, 'C')) != _digest(_xenon_key(other, 'C'))
+    assert _digest((np.arange(3.),)) != _digest((np.arange(3),))
+
+    with np.printoptions(precision=3):
+        assert _digest(_xenon_key(xe, 'C')) == _digest(_xenon_key(XenonES(), 'C'))
+
+
+def test_surface_tolerance_warning(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    with pytest.warns(RuntimeWarning, match='above rtol'):
+        s = pressure_surface(T=(20, 50), rho=(10 * kg/m3, 200 * kg/m3), rtol=1e-14, max_points=17)
+    assert s.max_error > 1e-14 and len(s.x) <= 17
+    with pytest.warns(RuntimeWarning):
+        pressure_surface(T=(20, 50), rho=(10 * kg/m3, 200 * kg/m3), rtol=1e-14, max_points=17)
@@ -0,0 +1,80 @@
+"""
+Frozen
+Base class of the immutable value types (shapes, materials): the fields
+are __slots__, set once by __init__, and compared by value, so that equal
+objects built separately hash alike and share cached results.
+"""
+import numpy as np
+from functools import partial
+
+
+def _hashable(value):
+    """value, with arrays replaced by (shape, bytes), lists by tuples and
+    NaN by a marker (so that unknown values compare equal)
+    """
+    if isinstance(value, float) and value != value:
+        return 'nan'
+    if isinstance(value, np.ndarray):
+        return (value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+class Frozen:
+    """Immutable object with value equality. Subclasses list their fields
+    in __slots__ (names starting with '_' are private state, e.g. lazily
+    computed tables, excluded from equality), take them as keyword
+    arguments of __init__ and set them with _init. replace(**changes)
+    returns a copy with some fields changed.
+
+    The key describing the object is computed once (arrays are converted
+    to bytes) and kept in the slot _key_.
+    """
+    __slots__ = ('_key_',)
+
+    @classmethod
+    def _fields(cls):
+        fields = cls.__dict__.get('_fields_')
+        if fields is None:
+            fields = tuple(name for c in reversed(cls.__mro__)
+                           for name in c.__dict__.get('__slots__', ())
+                           if not name.startswith('_'))
+            setattr(cls, '_fields_', fields)
+        return fields
+
+    def _init(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{} is immutable, use replace()'.format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{} is immutable'.format(type(self).__name__))
+
+    def _asdict(self):
+        return {name: getattr(self, name) for name in self._fields()}
+
+    def replace(self, **changes):
+        return type(self)(**dict(self._asdict(), **changes))
+
+    def _key(self):
+        """Tuple describing the object, used to key caches of derived quantities"""
+        try:
+            return self._key_
+        except AttributeError:
+            key = (type(self),) + tuple(_hashable(v) for v in self._asdict().values())
+            object.__setattr__(self, '_key_', key)
+            return key
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __reduce__(self):
+        return partial(type(self), **self._asdict()), ()
@@ -0,0 +1,98 @@
+"""
+Gamma spectrum
+Emitted, self-shielded and transmitted intensities of the gamma lines
+of Bi-214 and Tl-208, evaluated as dense arrays over
+(component, line, thickness).
+"""
+import numpy as np
+from collections import namedtuple
+from . system_of_units import *
+from . math_functions import attenuation_factor
+
+# isotope is the name of the activity attribute ('bi214', 'tl208'),
+# intensity the number of gammas per decay
+GammaLines = namedtuple('GammaLines', 'isotope energy intensity')
+LineBudget = namedtuple('LineBudget', 'lines emitted self_shielded transmitted')
+
+# Lines above 100 keV with intensity above 1% (NNDC)
+BI214_LINES = GammaLines(isotope   = 'bi214',
+                         energy    = np.array([ 609.31,  665.45,  768.36,  806.17,  934.06,
+                                               1120.29, 1155.19, 1238.11, 1280.96, 1377.67,
+                                               1401.50, 1407.98, 1509.23, 1661.28, 1729.60,
+                                               1764.49, 1847.42, 2118.55, 2204.21, 2447.86]) * keV,
+                         intensity = np.array([45.49,  1.530,  4.892,  1.262,  3.10,
+                                               14.91,  1.635,  5.831,  1.435,  3.968,
+                                                1.330, 2.389,  2.128,  1.047,  2.878,
+                                               15.30,  2.025,  1.158,  4.913,  1.548]) / 100)
+
+TL208_LINES = GammaLines(isotope   = 'tl208',
+                         energy    = np.array([277.37, 510.77, 583.19, 763.13, 860.56,
+                                               2614.51]) * keV,
+                         intensity = np.array([6.6, 22.60, 85.0, 1.79, 12.50,
+                                               99.754]) / 100)
+
+
+def line_attenuation(materials, lines):
+    """Attenuation coefficients, shape (component, line)"""
+    return np.array([m.attenuation_coefficient_at(lines.energy) for m in materials])
+
+
+def line_transmittance(materials, lines, z):
+    """Transmittance of each component for each line and thickness,
+    shape (component, line, thickness). z has shape (thickness,), or
+    (component, thickness) to scan each component over its own thicknesses.
+    """
+    z  = np.atleast_1d(np.asarray(z, dtype=float))
+    z  = np.broadcast_to(z, (len(materials), z.shape[-1]))
+    mu = line_attenuation(materials, lines)
+    return np.exp(-mu[:, :, np.newaxis] * z[:, np.newaxis, :])
+
+
+def stack_transmittance(materials, lines, z):
+    """Transmittance through the stack of all components, shape (line, thickness)"""
+    return line_transmittance(materials, lines, z).prod(axis=0)
+
+
+def spectrum_transmittance(materials, lines, z):
+    """Intensity-weighted transmittance of the lines through the stack,
+    shape (thickness,)
+    """
+    return lines.intensity @ stack_transmittance(materials, lines, z) / lines.intensity.sum()
+
+
+def emitted_intensities(volumes, lines):
+    """Gamma rate of each line emitted by each PhysicalVolume, shape (component, line)"""
+    activity = np.array([getattr(v, 'activity_' + lines.isotope) for v in volumes])
+    return activity[:, np.newaxis] * lines.intensity
+
+
+def self_shielded_intensities(volumes, lines, z):
+    """Rates escaping each PhysicalVolume of thickness z (slab model, see
+    attenuation_factor), shape (component, line, thickness)
+    """
+    z  = np.atleast_1d(np.asarray(z, dtype=float))
+    z  = np.broadcast_to(z, (len(volumes), z.shape[-1]))
+    mu = line_attenuation([v.material for v in volumes], lines)
+    af = attenuation_factor(mu[:, :, np.newaxis], z[:, np.newaxis, :])
+    return emitted_intensities(volumes, lines)[:, :, np.newaxis] * af
+
+
+def line_budget(volumes, lines, z, shields=(), shield_z=()):
+    """Emitted, self-shielded and transmitted rates of the lines.
+    volumes (with thicknesses z) are the sources, and their gammas are
+    transmitted through the materials shields, of thicknesses shield_z.
+    self_shielded and transmitted have shape (component, line, thickness).
+    """
+    emitted = emitted_intensities(volumes, lines)
+    shield  = self_shielded_intensities(volumes, lines, z)
+    T       = (stack_transmittance(shields, lines, np.asarray(shield_z, dtype=float)[:, np.newaxis])
+               if len(shields) else np.ones((len(lines.energy), 1)))
+    return LineBudget(lines         = lines,
+                      emitted       = emitted,
+                      self_shielded = shield,
+                      transmitted   = shield * T[np.newaxis])
+
+
+def cv_stack(cvs):
+    """Materials and body thicknesses of a sequence of CylindricalVessels"""
+    return [cv.material for cv in cvs], np.array([cv.body_thickness for cv in cvs])
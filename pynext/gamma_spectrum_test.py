@@ -0,0 +1,51 @@
+import numpy as np
+from . system_of_units import *
+from . gamma_spectrum import BI214_LINES, TL208_LINES
+from . gamma_spectrum import line_transmittance
+from . gamma_spectrum import spectrum_transmittance
+from . gamma_spectrum import line_budget
+from . gamma_spectrum import cv_stack
+from . math_functions import attenuation_factor
+from . NextData import next100_lead_shield
+from . NextData import next100_copper_shield
+from . NextData import next100_PV
+
+from pytest import approx
+from pytest import fixture
+
+
+@fixture(scope='module')
+def shields():
+    return next100_copper_shield(), next100_lead_shield()
+
+
+def test_line_transmittance(shields):
+    materials, z = cv_stack(shields)
+    T = line_transmittance(materials, TL208_LINES, np.linspace(1, 20, 5) * cm)
+    assert T.shape == (2, len(TL208_LINES.energy), 5)
+
+    pb = materials[1]
+    E  = TL208_LINES.energy[-1]
+    assert T[1, -1, 0] == approx(np.exp(-pb.attenuation_coefficient_at(E) * 1 * cm))
+
+
+def test_spectrum_transmittance(shields):
+    materials, z = cv_stack(shields)
+    T = spectrum_transmittance(materials, TL208_LINES, z[:, np.newaxis])
+    T_2614 = np.prod([m.transmittance(TL208_LINES.energy[-1], t) for m, t in zip(materials, z)])
+    assert T.shape == (1,)
+    assert T[0] > T_2614 * TL208_LINES.intensity[-1] / TL208_LINES.intensity.sum()
+
+
+def test_line_budget(shields):
+    pv = next100_PV()
+    materials, z = cv_stack(shields)
+    budget = line_budget([pv.cv.body], BI214_LINES, [pv.body_thickness], materials, z)
+
+    assert budget.emitted.sum() == approx(pv.body_activity_bi214 * BI214_LINES.intensity.sum())
+    assert budget.self_shielded.shape == (1, len(BI214_LINES.energy), 1)
+
+    mu = pv.material.attenuation_coefficient_at(BI214_LINES.energy[-1])
+    af = attenuation_factor(mu, pv.body_thickness)
+    assert budget.self_shielded[0, -1, 0] == approx(budget.emitted[0, -1] * af)
+    assert np.all(budget.transmitted < budget.self_shielded)
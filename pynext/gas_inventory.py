@@ -0,0 +1,138 @@
+"""
+Gas inventory
+Density and mass of the xenon in a vessel from a stream of slow-control
+samples (timestamp, P, T).
+
+Samples are processed in batches with the inverse EOS (XenonES.density).
+Each batch is warm-started from the last density of the previous batch,
+rescaled to each sample as a perfect gas (rho P T_last / (P_last T)):
+slow-control readings change little between samples, so Newton's method
+converges in one or two iterations.
+"""
+import numpy as np
+from itertools import islice
+from collections import namedtuple
+from . system_of_units import *
+from . XenonES import XenonES
+from . Shapes import Shape, Cylinder
+from . CylindricalVessel import CylindricalVessel
+
+# Slow-control sample: timestamp, pressure and temperature (Celsius)
+Sample = namedtuple('Sample', 't P T')
+
+# Inventory of a batch of samples (arrays): density, mass of xenon in the
+# volume and convergence of the inverse EOS
+Inventory = namedtuple('Inventory', 't P T rho mass converged')
+
+
+def gas_volume(geometry):
+    """Volume of gas of a geometry: a number, a Shape (its volume()) or a
+    CylindricalVessel (the cylinder enclosed by its body)
+    """
+    if isinstance(geometry, CylindricalVessel):
+        return Cylinder(geometry.radius, geometry.length).volume()
+    if isinstance(geometry, Shape):
+        return geometry.volume()
+    return float(geometry)
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of samples. push adds samples (scalars or
+    arrays), overwriting the oldest ones when full; drain returns the
+    samples in arrival order and empties the buffer.
+    """
+
+    def __init__(self, capacity=4096):
+        self.data    = np.empty((3, capacity))
+        self.start   = 0
+        self.size    = 0
+        self.dropped = 0
+
+    @property
+    def capacity(self):
+        return self.data.shape[1]
+
+    def __len__(self):
+        return self.size
+
+    def push(self, t, P, T):
+        new = np.array(np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float))
+                                             for x in (t, P, T))))
+        if new.shape[1] > self.capacity:
+            self.dropped += new.shape[1] - self.capacity
+            new = new[:, -self.capacity:]
+        n   = new.shape[1]
+        end = (self.start + self.size) % self.capacity
+        idx = (end + np.arange(n)) % self.capacity
+        self.data[:, idx] = new
+
+        overflow      = max(0, self.size + n - self.capacity)
+        self.dropped += overflow
+        self.start    = (self.start + overflow) % self.capacity
+        self.size     = min(self.size + n, self.capacity)
+
+    def drain(self):
+        idx = (self.start + np.arange(self.size)) % self.capacity
+        t, P, T    = self.data[:, idx]
+        self.start = self.size = 0
+        return Sample(t, P, T)
+
+
+class GasInventory:
+    """Density and mass of xenon in the volume of geometry (see gas_volume)
+    for samples of P and T (Celsius if temp == 'C').
+    """
+
+    def __init__(self, geometry, eos=None, temp='C', batch=1024, rtol=1e-10):
+        self.volume = gas_volume(geometry)
+        self.eos    = XenonES() if eos is None else eos
+        self.temp   = temp
+        self.batch  = batch
+        self.rtol   = rtol
+        self.last   = None   # (P, T, rho) of the last sample
+
+    def _rho0(self, P, T):
+        perfect = self.eos.density(P, T, perfect=True, temp=self.temp)
+        if self.last is None or not np.isfinite(self.last[2]):
+            return perfect
+        P0, T0, rho = self.last
+        t, t0 = self.eos.t_(T, self.temp), self.eos.t_(T0, self.temp)
+        return rho * (P / P0) * (t0 / t)
+
+    def update(self, t, P, T):
+        """Inventory of a batch of samples (arrays of timestamps, P and T)"""
+        t, P, T = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float))
+                                        for x in (t, P, T)))
+        rho, info = self.eos.density(P, T, temp=self.temp, rtol=self.rtol,
+                                     rho0=self._rho0(P, T), full_output=True)
+        rho = np.atleast_1d(rho)
+        if len(rho):
+            self.last = (P[-1], T[-1], rho[-1])
+        return Inventory(t, P, T, rho, rho * self.volume, np.atleast_1d(info.converged))
+
+    def drain(self, buffer):
+        """Inventory of the samples of a RingBuffer"""
+        return self.update(*buffer.drain())
+
+    def stream(self, samples):
+        """Inventories of an iterable of (t, P, T) samples, in batches"""
+        samples = iter(samples)
+        while True:
+            chunk = list(islice(samples, self.batch))
+            if not chunk:
+                return
+            yield self.update(*np.array(chunk, dtype=float).T)
+
+    @property
+    def rho(self):
+        return np.nan if self.last is None else self.last[2]
+
+    @property
+    def mass(self):
+        return self.rho * self.volume
+
+    def __str__(self):
+        return '<GasInventory: V = {:.4g} m3, rho = {:.4g} kg/m3, mass = {:.4g} kg>'.format(
+                self.volume / m3, self.rho / (kg/m3), self.mass / kg)
+
+    __repr__ = __str__
@@ -0,0 +1,42 @@
+from . gas_inventory import GasInventory, RingBuffer, gas_volume
+from . XenonES import XenonES
+from . Shapes import Cylinder
+from . NextData import next100_PV
+from pynext.system_of_units import *
+
+from pytest import approx
+import numpy as np
+
+
+def test_ring_buffer():
+    buf = RingBuffer(capacity=5)
+    buf.push(0, 10 * bar, 20)
+    buf.push(np.arange(1, 7), np.arange(1, 7) * bar, 20)
+    assert len(buf) == 5 and buf.dropped == 2
+    s = buf.drain()
+    assert list(s.t) == [2, 3, 4, 5, 6]
+    assert len(buf) == 0 and len(buf.drain().t) == 0
+
+
+def test_gas_inventory():
+    pv = next100_PV()
+    assert gas_volume(pv) == approx(Cylinder(pv.radius, pv.length).volume())
+    assert gas_volume(Cylinder(1 * m, 1 * m)) / m3 == approx(np.pi)
+
+    n  = 3000
+    t  = np.arange(n) * 1e-3
+    P  = (15 + 0.1 * np.sin(t)) * bar
+    T  = 20 + 0.5 * np.cos(t)
+    gi = GasInventory(pv, batch=512)
+    inventories = list(gi.stream(zip(t, P, T)))
+    assert len(inventories) == 6
+    rho  = np.concatenate([i.rho for i in inventories])
+    mass = np.concatenate([i.mass for i in inventories])
+    assert np.all(np.concatenate([i.converged for i in inventories]))
+    assert np.allclose(rho, XenonES().density(P, T), rtol=1e-10)
+    assert np.allclose(mass, rho * gas_volume(pv))
+    assert gi.mass == approx(mass[-1])
+
+    buf = RingBuffer()
+    buf.push(t[:100], P[:100], T[:100])
+    assert np.allclose(gi.drain(buf).rho, rho[:100], rtol=1e-10)
@@ -0,0 +1,45 @@
+import numpy as np
+from . system_of_units import *
+from . math_functions import attenuation_factor
+from . math_functions import attenuation_factor_quad
+from . math_functions import AttenuationTable
+
+from pytest import approx
+
+
+def test_attenuation_factor_scalar():
+    mu = 0.039 * cm2/g * 7.87 * g/cm3
+    z  = 10 * mm
+    af = attenuation_factor(mu, z)
+    assert isinstance(af, float)
+    assert af == approx(attenuation_factor_quad(mu, z), abs=1e-8)
+
+
+def test_attenuation_factor_matches_quad():
+    tau = np.logspace(-6, 4, 200)
+    ref = np.array([attenuation_factor_quad(t, 1) for t in tau])
+    assert np.allclose(attenuation_factor(tau, 1), ref, rtol=0, atol=1e-8)
+
+
+def test_attenuation_factor_broadcast():
+    mu = np.array([0.1, 1., 10.]) / cm
+    z  = np.arange(0.1, 20, 0.5)[:, np.newaxis] * cm
+    af = attenuation_factor(mu, z)
+    assert af.shape == (len(z), len(mu))
+    assert af[3, 1] == approx(attenuation_factor_quad(mu[1], z[3, 0]), abs=1e-8)
+
+
+def test_attenuation_table(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    table = AttenuationTable(n=1024)
+    assert table.max_error < 1e-9
+    assert len(list(tmp_path.iterdir())) == 2
+
+    cached = AttenuationTable(n=1024)
+    assert isinstance(cached.table, np.memmap)
+    assert cached.max_error == table.max_error
+
+    tau = np.logspace(-8, 6, 1000)
+    assert np.allclose(cached(tau), attenuation_factor(tau, 1), rtol=0, atol=table.max_error)
+    assert cached(0.5) == approx(attenuation_factor_quad(0.5, 1), abs=1e-8)
+    assert cached(1e-7) == approx(attenuation_factor(1e-7, 1), abs=1e-12)
@@ -0,0 +1,159 @@
+"""
+Monte Carlo estimates of self-shielding (escape fractions)
+An independent check of attenuation_factor and of the finite-geometry
+calculations, extended from the att_factor function of the
+AttenuationFactor notebook.
+
+Samples are drawn in chunks of fixed size, so the memory used does not
+depend on the total number of samples. Chunk k is always generated from the
+k-th child of numpy.random.SeedSequence(seed), so for a given seed and chunk
+size the result does not depend on the number of worker processes.
+"""
+import numpy as np
+from math import pi
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from . Shapes import CylinderShell, Disk
+from . math_functions import THETA_EPS
+
+MCEstimate = namedtuple('MCEstimate', 'value error n')
+
+
+def _slab_chunk(rng, n, mu, z):
+    """Slab of thickness z, with the convention of attenuation_factor:
+    theta is uniform in (-pi/2 + EPS, pi/2 - EPS) and half of the
+    gammas go towards the face.
+    """
+    x = rng.uniform(0, z, n)
+    t = rng.uniform(-pi/2 + THETA_EPS, pi/2 - THETA_EPS, n)
+    w = np.exp(-mu * x / np.cos(t)) * (pi - 2 * THETA_EPS) / (2 * pi)
+    return w.sum(), (w * w).sum()
+
+
+def _isotropic(rng, n):
+    cost = rng.uniform(-1, 1, n)
+    sint = np.sqrt(1 - cost**2)
+    phi  = rng.uniform(0, 2 * pi, n)
+    return sint * np.cos(phi), sint * np.sin(phi), cost
+
+
+def _cylinder_shell_chunk(rng, n, mu, Rin, Rout, L):
+    """Gammas emitted isotropically in the shell that leave it through
+    the inner surface (i.e, entering the volume enclosed by the shell).
+    By symmetry the emission point is taken at azimuth 0.
+    """
+    x  = np.sqrt(rng.uniform(Rin**2, Rout**2, n))
+    z  = rng.uniform(0, L, n)
+    dx, dy, dz = _isotropic(rng, n)
+
+    a    = dx**2 + dy**2
+    b    = x * dx
+    disc = b**2 - a * (x**2 - Rin**2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = (-b - np.sqrt(disc)) / a
+    zs  = z + s * dz
+    hit = (disc >= 0) & (b < 0) & (zs >= 0) & (zs <= L)
+    w   = np.where(hit, np.exp(-mu * np.where(hit, s, 0)), 0.)
+    return w.sum(), (w * w).sum()
+
+
+def _disk_chunk(rng, n, mu, R, t):
+    """Gammas emitted isotropically in the disk that leave it through one
+    of its faces (z = 0), the emission depth being z.
+    """
+    rho = R * np.sqrt(rng.uniform(0, 1, n))
+    z   = rng.uniform(0, t, n)
+    dx, dy, dz = _isotropic(rng, n)
+
+    with np.errstate(divide='ignore'):
+        s = np.where(dz < 0, -z / dz, np.inf)
+    hit = (dz < 0) & ((rho + s * dx)**2 + (s * dy)**2 <= R**2)
+    w   = np.where(hit, np.exp(-mu * np.where(hit, s, 0)), 0.)
+    return w.sum(), (w * w).sum()
+
+
+def _run_chunk(kernel, args, seed, n):
+    return kernel(np.random.default_rng(seed), n, *args)
+
+
+def _estimate(s1, s2, n):
+    mean = s1 / n
+    var  = max(s2 / n - mean**2, 0)
+    return MCEstimate(value=mean, error=np.sqrt(var / n), n=n)
+
+
+def _mc(kernel, args, n, rtol, seed, chunk, workers):
+    """Streams ceil(n / chunk) chunks through kernel, stopping early
+    if the relative error falls below rtol.
+    """
+    ss     = np.random.SeedSequence(seed)
+    sizes  = [chunk] * (n // chunk) + ([n % chunk] if n % chunk else [])
+    s1 = s2 = 0.
+    done   = 0
+
+    def precise():
+        est = _estimate(s1, s2, done)
+        return rtol is not None and est.value > 0 and est.error <= rtol * est.value
+
+    if workers == 1:
+        for size, child in zip(sizes, ss.spawn(len(sizes))):
+            w1, w2 = _run_chunk(kernel, args, child, size)
+            s1, s2, done = s1 + w1, s2 + w2, done + size
+            if precise():
+                break
+        return _estimate(s1, s2, done)
+
+    children = ss.spawn(len(sizes))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for k in range(0, len(sizes), workers):
+            rnd  = list(zip(sizes[k:k + workers], children[k:k + workers]))
+            futs = [pool.submit(_run_chunk, kernel, args, child, size) for size, child in rnd]
+            for (size, _), fut in zip(rnd, futs):
+                w1, w2 = fut.result()
+                s1, s2, done = s1 + w1, s2 + w2, done + size
+            if precise():
+                break
+    return _estimate(s1, s2, done)
+
+
+def slab_escape_fraction_mc(mu, z, n=10**7, rtol=None, seed=None, chunk=10**6, workers=1):
+    """Fraction of the gammas emitted in a slab of thickness z that escape
+    through one face, with the conventions of attenuation_factor.
+
+    n        maximum number of samples
+    rtol     target relative precision: stop as soon as error <= rtol * value
+    seed     seed of the random streams (None: non reproducible)
+    chunk    number of samples drawn at once
+    workers  number of processes
+
+    Returns MCEstimate(value, error, n) where error is the statistical error
+    and n the number of samples used.
+    """
+    return _mc(_slab_chunk, (mu, z), n, rtol, seed, chunk, workers)
+
+
+def cylinder_shell_escape_fraction_mc(mu, Rin, Rout, L, n=10**7, rtol=None, seed=None,
+                                      chunk=10**6, workers=1):
+    """Fraction of the gammas emitted isotropically in a cylinder shell
+    that escape through the inner surface. See slab_escape_fraction_mc.
+    """
+    return _mc(_cylinder_shell_chunk, (mu, Rin, Rout, L), n, rtol, seed, chunk, workers)
+
+
+def disk_escape_fraction_mc(mu, R, t, n=10**7, rtol=None, seed=None, chunk=10**6, workers=1):
+    """Fraction of the gammas emitted isotropically in a disk that escape
+    through one of its faces. See slab_escape_fraction_mc.
+    """
+    return _mc(_disk_chunk, (mu, R, t), n, rtol, seed, chunk, workers)
+
+
+def escape_fraction_mc(mu, shape, **kwargs):
+    """Escape fraction for a CylinderShell, a Disk, or a slab (if shape
+    is a thickness). See slab_escape_fraction_mc for the keyword arguments.
+    """
+    if isinstance(shape, CylinderShell):
+        return cylinder_shell_escape_fraction_mc(mu, shape.Rin, shape.Rout, shape.L, **kwargs)
+    elif isinstance(shape, Disk):
+        return disk_escape_fraction_mc(mu, shape.R, shape.t, **kwargs)
+    else:
+        return slab_escape_fraction_mc(mu, shape, **kwargs)
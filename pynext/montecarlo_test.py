@@ -0,0 +1,36 @@
+from . system_of_units import *
+from . math_functions import attenuation_factor
+from . montecarlo import slab_escape_fraction_mc
+from . montecarlo import disk_escape_fraction_mc
+from . montecarlo import escape_fraction_mc
+from . Shapes import Disk
+from scipy.special import expn
+
+from pytest import approx
+
+
+def test_slab_mc():
+    mu = 0.044 * cm2/g * 11.33 * g/cm3
+    for z in (1 * mm, 1 * cm, 10 * cm):
+        est = slab_escape_fraction_mc(mu, z, n=10**6, seed=2)
+        assert est.n     == 10**6
+        assert est.value == approx(attenuation_factor(mu, z), abs=5 * est.error)
+
+
+def test_thin_disk_mc():
+    tau = 0.5
+    est = escape_fraction_mc(tau / cm, Disk(R=10 * m, t=1 * cm), n=10**6, seed=3)
+    assert est.value == approx((0.5 - expn(3, tau)) / (2 * tau), abs=5 * est.error)
+
+
+def test_mc_streams():
+    serial   = disk_escape_fraction_mc(1 / cm, 1 * m, 10 * cm, n=10**5, seed=4, chunk=10**4)
+    parallel = disk_escape_fraction_mc(1 / cm, 1 * m, 10 * cm, n=10**5, seed=4, chunk=10**4,
+                                       workers=2)
+    assert serial == parallel
+
+
+def test_mc_rtol():
+    est = slab_escape_fraction_mc(0.1 / cm, 1 * cm, n=10**8, rtol=1e-3, seed=5, chunk=10**5)
+    assert est.n < 10**8
+    assert est.error <= 1e-3 * est.value
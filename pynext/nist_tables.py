@@ -0,0 +1,142 @@
+"""
+NIST xenon tables
+Isochoric tables of the properties of xenon from the NIST webbook
+(nb/rho_*.txt: tab separated, one row per temperature, 28 columns; the
+quality is 'undefined' outside the two-phase region). On first use each
+table is converted to a binary columnar store (one contiguous column per
+field, in the units of system_of_units) in the pynext cache directory,
+and memory-mapped.
+
+Fields (l: saturated liquid, v: saturated vapor; in the single-phase region
+both hold the properties of the fluid, as do the l+v fields):
+
+T (Celsius), P, quality, U, H, S (l+v),
+rho_l, v_l, U_l, H_l, S_l, Cv_l, Cp_l, w_l, JT_l, eta_l, k_l,
+rho_v, v_v, U_v, H_v, S_v, Cv_v, Cp_v, w_v, JT_v, eta_v, k_v
+
+with w the sound speed, JT the Joule-Thomson coefficient, eta the viscosity
+and k the thermal conductivity.
+"""
+import os
+import numpy as np
+from glob import glob
+from functools import lru_cache
+from . system_of_units import *
+from . cache import load_array, save_array
+
+_PHASE_FIELDS = ('rho', 'v', 'U', 'H', 'S', 'Cv', 'Cp', 'w', 'JT', 'eta', 'k')
+_PHASE_UNITS  = (kg/m3, m3/kg, 1e3 * J/mol, 1e3 * J/mol, J/(mol * K), J/(mol * K), J/(mol * K),
+                 m/second, K/bar, 1e-6 * pascal * second, watt/(m * K))
+
+FIELDS = (('T', 'P', 'quality', 'U', 'H', 'S') +
+          tuple(f + '_l' for f in _PHASE_FIELDS) + tuple(f + '_v' for f in _PHASE_FIELDS))
+UNITS  = (1, bar, 1, 1e3 * J/mol, 1e3 * J/mol, J/(mol * K)) + _PHASE_UNITS + _PHASE_UNITS
+
+ALIASES = {'temperature':          'T',
+           'pressure':             'P',
+           'internal_energy':      'U',
+           'enthalpy':             'H',
+           'entropy':              'S',
+           'density':              'rho',
+           'volume':               'v',
+           'cv':                   'Cv',
+           'cp':                   'Cp',
+           'sound_speed':          'w',
+           'joule_thomson':        'JT',
+           'viscosity':            'eta',
+           'thermal_conductivity': 'k'}
+
+# liquid and vapor: saturated phases, in the two-phase region;
+# fluid: the single-phase region
+PHASES = ('liquid', 'vapor', 'fluid')
+
+NIST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nb')
+
+
+def read_table(path):
+    """Parses a NIST table, returning an array (row, field) in system_of_units"""
+    with open(path) as f:
+        rows = [line.rstrip('\n').split('\t') for line in f
+                if line.strip() and not line.startswith('#')]
+    data = np.array([[np.nan if x == 'undefined' else float(x) for x in row] for row in rows])
+    if data.shape[1] != len(FIELDS):
+        raise ValueError('{}: {} columns, expected {}'.format(path, data.shape[1], len(FIELDS)))
+    return data * np.array(UNITS)
+
+
+class NISTTable:
+    """Memory-mapped NIST isochore. table[field] is the column of a field,
+    two_phase the rows with a defined quality, and density the density of
+    the isochore.
+    """
+    VERSION = 1
+
+    def __init__(self, path, cache=True):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        st        = os.stat(path)
+        meta      = dict(version=self.VERSION, source=[st.st_mtime_ns, st.st_size],
+                         fields=list(FIELDS))
+        cname     = 'nist_{}_v{}'.format(self.name, self.VERSION)
+
+        data, _ = load_array(cname, meta) if cache else (None, None)
+        if data is None:
+            data = np.ascontiguousarray(read_table(path).T)
+            if cache:
+                save_array(cname, data, meta)
+        self.data      = data
+        self.two_phase = np.isfinite(self['quality'])
+        single         = self['rho_v'][~self.two_phase]
+        self.density   = float(single[0]) if single.size else np.nan
+
+    def __getitem__(self, field):
+        return self.data[FIELDS.index(field)]
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def column(self, prop, phase=None):
+        """Field and rows holding property prop (a field, a field without
+        its _l/_v suffix, or an alias such as 'viscosity') in phase
+        """
+        prop = ALIASES.get(prop, prop)
+        if phase is None:
+            return prop, np.isfinite(self[prop])
+        if phase not in PHASES:
+            raise ValueError('phase must be one of {} or None'.format(PHASES))
+        rows  = ~self.two_phase if phase == 'fluid' else self.two_phase
+        field = prop if prop in ('T', 'P', 'quality') else prop + ('_l' if phase == 'liquid' else '_v')
+        return field, rows & np.isfinite(self[field])
+
+    def interpolate(self, prop, T, phase=None):
+        """Property prop in phase (see PHASES; None for all the rows) at
+        temperatures T (Celsius), interpolated linearly. NaN outside the
+        temperatures covered by the phase.
+        """
+        field, rows = self.column(prop, phase)
+        T = np.asarray(T, dtype=float)
+        if not np.any(rows):
+            return np.full(T.shape, np.nan)[()]
+        Tr, y = self['T'][rows], self[field][rows]
+        return np.where((T >= Tr[0]) & (T <= Tr[-1]), np.interp(T, Tr, y), np.nan)[()]
+
+    def __str__(self):
+        return '<NISTTable {}: rho = {:.2f} kg/m3, {} rows, T in [{:g}, {:g}] C, two-phase below {:g} C>'.format(
+                self.name, self.density / (kg/m3), len(self), self['T'][0], self['T'][-1],
+                self['T'][self.two_phase].max() if self.two_phase.any() else np.nan)
+
+    __repr__ = __str__
+
+
+@lru_cache(maxsize=None)
+def nist_table(name, directory=NIST_DIR):
+    """NISTTable of directory/name.txt, memoized"""
+    return NISTTable(os.path.join(directory, name + '.txt'))
+
+
+def nist_tables(directory=NIST_DIR):
+    """All the tables rho_*.txt of directory, by name, in increasing density"""
+    names  = [os.path.splitext(os.path.basename(p))[0]
+              for p in glob(os.path.join(directory, 'rho_*.txt'))]
+    tables = [nist_table(name, directory) for name in names]
+    return {t.name: t for t in sorted(tables, key=lambda t: t.density)}
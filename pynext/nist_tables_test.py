@@ -0,0 +1,46 @@
+from . nist_tables import NISTTable, FIELDS, NIST_DIR
+from . XenonES import XenonES
+from pynext.system_of_units import *
+
+from pytest import approx
+import numpy as np
+import os
+
+
+def test_nist_table(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    path  = os.path.join(NIST_DIR, 'rho_0520.txt')
+    table = NISTTable(path)
+    assert len(FIELDS) == 28
+    assert len(table) == 261
+    assert table.density / (kg/m3) == approx(30)
+    assert table['T'][table.two_phase].max() == approx(-84.5)
+
+    assert table.interpolate('density', -100, 'liquid') / (kg/m3) == approx(2887.3)
+    assert table.interpolate('P', -99.75) / bar == approx(0.5 * (1.5759 + 1.6171))
+    assert np.isnan(table.interpolate('pressure', -100, 'fluid'))
+    assert np.isnan(table.interpolate('viscosity', 20, 'liquid'))
+    eta = table.interpolate('viscosity', np.array([0, 20]), 'fluid')
+    assert eta.shape == (2,) and np.all(eta > 0)
+
+    cached = NISTTable(path)
+    assert isinstance(cached.data, np.memmap)
+    assert np.array_equal(cached.data, table.data, equal_nan=True)
+
+    P = table.interpolate('P', np.array([0, 20]), 'fluid')
+    assert np.allclose(XenonES().P(np.array([0, 20]), table.density), P, rtol=1e-3)
+
+
+def test_read_table_closes_file(monkeypatch):
+    import builtins
+    from . nist_tables import read_table
+    files, _open = [], builtins.open
+    def recording_open(*args, **kwargs):
+        f = _open(*args, **kwargs)
+        files.append(f)
+        return f
+    monkeypatch.setattr(builtins, 'open', recording_open)
+    data = read_table(os.path.join(NIST_DIR, 'rho_0520.txt'))
+    monkeypatch.undo()
+    assert data.shape[1] == len(FIELDS)
+    assert files and all(f.closed for f in files)
@@ -0,0 +1,178 @@
+"""
+Phase envelope
+Isochores, isotherms and the saturation boundary of xenon, streamed as
+chunks along the scanned axis: only one chunk of the surface is in memory
+at a time.
+
+States are classified with the saturation curve of the NIST tables (the
+two-phase rows of nb/rho_*.txt) and the critical temperature of XenonES
+(Tr):
+- two-phase between the saturated vapor and liquid densities,
+- vapor (liquid) below the vapor (above the liquid) density,
+- supercritical above the critical temperature,
+- unknown where the saturation data do not decide.
+Above the temperatures covered by the data, the saturated vapor density
+only grows and the liquid one only decreases, so densities below (above)
+them at the highest covered temperature are still vapor (liquid).
+
+In the two-phase region the pressure is the saturation pressure.
+"""
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+from . system_of_units import *
+from . XenonES import XenonES
+from . nist_tables import NIST_DIR, nist_tables
+
+UNKNOWN, VAPOR, TWO_PHASE, LIQUID, SUPERCRITICAL = range(5)
+PHASE_NAMES = ('unknown', 'vapor', 'two-phase', 'liquid', 'supercritical')
+
+# Saturation curve: temperature (Celsius), pressure, saturated liquid and
+# vapor densities
+Saturation = namedtuple('Saturation', 'T P rho_l rho_v')
+
+# Chunk of curves: x the values along the curves (temperatures of isochores,
+# densities of isotherms) from index start, y the value of each curve,
+# P and phase of shape (curve, x), and the phase crossings within the chunk
+CurveChunk = namedtuple('CurveChunk', 'start x y P phase crossings')
+
+# Phase crossings (arrays): curve and index (along the curve) of the first
+# state in the new phase, x midway between the two states, phase before and after
+Crossings = namedtuple('Crossings', 'curve index x before after')
+
+
+@lru_cache(maxsize=None)
+def saturation_curve(directory=NIST_DIR):
+    """Saturation of the NIST tables of directory, in increasing temperature"""
+    rows = [np.array([t['T'], t['P'], t['rho_l'], t['rho_v']])[:, t.two_phase]
+            for t in nist_tables(directory).values()]
+    data = np.concatenate(rows, axis=1) if rows else np.empty((4, 0))
+    _, i = np.unique(data[0], return_index=True)
+    return Saturation(*data[:, i])
+
+
+def saturation(T, sat=None):
+    """Saturation interpolated at temperatures T (Celsius), NaN outside the data"""
+    sat = saturation_curve() if sat is None else sat
+    T   = np.asarray(T, dtype=float)
+    if len(sat.T) == 0:
+        nan = np.full(T.shape, np.nan)[()]
+        return Saturation(T[()], nan, nan, nan)
+    inside = (T >= sat.T[0]) & (T <= sat.T[-1])
+    interp = lambda y: np.where(inside, np.interp(T, sat.T, y), np.nan)[()]
+    return Saturation(T[()], interp(sat.P), interp(sat.rho_l), interp(sat.rho_v))
+
+
+def phase(T, rho, sat=None, tc=None):
+    """Phase (VAPOR, TWO_PHASE, ...) of the states (T, rho), for
+    broadcastable arrays of temperatures (Celsius) and densities.
+    tc is the critical temperature (Celsius), by default that of XenonES.
+    """
+    sat     = saturation_curve() if sat is None else sat
+    if tc is None:
+        xe = XenonES()
+        tc = xe.Tr - xe.T0
+    T, rho  = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(rho, dtype=float))
+    codes   = np.full(T.shape, UNKNOWN, dtype=np.int8)
+    if len(sat.T):
+        s     = saturation(T, sat)
+        above = (T > sat.T[-1]) & (T <= tc)
+        with np.errstate(invalid='ignore'):
+            codes[rho <= s.rho_v] = VAPOR
+            codes[rho >= s.rho_l] = LIQUID
+            codes[(rho > s.rho_v) & (rho < s.rho_l)] = TWO_PHASE
+            codes[above & (rho <= sat.rho_v[-1])] = VAPOR
+            codes[above & (rho >= sat.rho_l[-1])] = LIQUID
+    codes[T > tc] = SUPERCRITICAL
+    return codes[()]
+
+
+def _chunks(values, chunk):
+    """Chunks (start, values) of an array, or of np.linspace(*values) for a
+    tuple (start, stop, num), without building the whole axis
+    """
+    if isinstance(values, tuple):
+        x0, x1, num = values
+        step        = (x1 - x0) / (num - 1) if num > 1 else 0.
+        for i in range(0, num, chunk):
+            x = x0 + step * np.arange(i, min(i + chunk, num))
+            if i + chunk >= num:
+                x[-1] = x1
+            yield i, x
+    else:
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        for i in range(0, len(values), chunk):
+            yield i, values[i:i + chunk]
+
+
+def _curves(y, x, chunk, state, sat, tc):
+    """Streams CurveChunks of the curves y over x; state(y, x) gives
+    (T, rho) of shape (curve, x)
+    """
+    y = np.atleast_1d(np.asarray(y, dtype=float))
+    if chunk < 1:
+        raise ValueError('chunk must be positive')
+    eos   = XenonES()
+    sat   = saturation_curve() if sat is None else sat
+    tc    = eos.Tr - eos.T0 if tc is None else tc
+    last  = None
+    for start, xc in _chunks(x, chunk):
+        T, rho = np.broadcast_arrays(*state(y[:, np.newaxis], xc[np.newaxis, :]))
+        codes  = phase(T, rho, sat, tc)
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            P = eos.P(T, rho)
+        two    = codes == TWO_PHASE
+        P[two] = saturation(T[two], sat).P
+
+        xs, cs = xc, codes
+        if last is not None:
+            xs = np.concatenate([[last[0]], xc])
+            cs = np.concatenate([last[1][:, np.newaxis], codes], axis=1)
+        curve, j  = np.nonzero(cs[:, 1:] != cs[:, :-1])
+        offset    = start - (len(xs) - len(xc))
+        crossings = Crossings(curve  = curve,
+                              index  = offset + j + 1,
+                              x      = 0.5 * (xs[j] + xs[j + 1]),
+                              before = cs[curve, j],
+                              after  = cs[curve, j + 1])
+        last = (xc[-1], codes[:, -1])
+        yield CurveChunk(start, xc, y, P, codes, crossings)
+
+
+def isochores(rho, T, chunk=4096, sat=None, tc=None):
+    """Isochores of densities rho, over temperatures T (Celsius; an array,
+    or (start, stop, num) for np.linspace), streamed as CurveChunks of
+    chunk temperatures: P and phase have shape (len(rho), chunk)
+    """
+    return _curves(rho, T, chunk, lambda rho, T: (T, rho), sat, tc)
+
+
+def isotherms(T, rho, chunk=4096, sat=None, tc=None):
+    """Isotherms of temperatures T (Celsius) over densities rho (an array,
+    or (start, stop, num)), streamed as CurveChunks of chunk densities:
+    P and phase have shape (len(T), chunk)
+    """
+    return _curves(T, rho, chunk, lambda T, rho: (T, rho), sat, tc)
+
+
+def saturation_boundary(T=None, chunk=4096, sat=None):
+    """Saturation curve at temperatures T (an array, or (start, stop, num);
+    by default the temperatures of the data), streamed as Saturation chunks
+    """
+    sat = saturation_curve() if sat is None else sat
+    for _, Tc in _chunks(sat.T if T is None else T, chunk):
+        yield saturation(Tc, sat)
+
+
+def phase_crossings(chunks):
+    """Crossings of a stream of CurveChunks, concatenated (empty arrays
+    for an empty stream)
+    """
+    parts = [c.crossings for c in chunks]
+    if not parts:
+        return Crossings(curve  = np.empty(0, dtype=np.intp),
+                         index  = np.empty(0, dtype=np.intp),
+                         x      = np.empty(0),
+                         before = np.empty(0, dtype=np.int8),
+                         after  = np.empty(0, dtype=np.int8))
+    return Crossings(*(np.concatenate(f) for f in zip(*parts)))
@@ -0,0 +1,64 @@
+from . phase_envelope import (isochores, isotherms, saturation_boundary, saturation_curve,
+                              phase, phase_crossings, VAPOR, TWO_PHASE, LIQUID,
+                              SUPERCRITICAL, UNKNOWN)
+from . XenonES import XenonES
+from pynext.system_of_units import *
+
+from pytest import approx
+import numpy as np
+
+
+def test_phase():
+    sat = saturation_curve()
+    assert sat.T[0] == approx(-100) and np.all(np.diff(sat.T) > 0)
+    assert phase(-100, 10 * kg/m3)   == VAPOR
+    assert phase(-100, 500 * kg/m3)  == TWO_PHASE
+    assert phase(-100, 2900 * kg/m3) == LIQUID
+    assert phase(-50, 10 * kg/m3)    == VAPOR
+    assert phase(-50, 500 * kg/m3)   == UNKNOWN
+    assert phase(-120, 10 * kg/m3)   == UNKNOWN
+    assert phase(20, 89.9 * kg/m3)   == SUPERCRITICAL
+
+
+def test_isochores_stream():
+    xe   = XenonES()
+    rho  = np.array([30, 50, 89.9, 2800]) * kg/m3
+    T    = (-100, 30, 2601)
+    full = next(isochores(rho, T, chunk=10000))
+    ch   = list(isochores(rho, T, chunk=500))
+    assert len(ch) == 6 and ch[1].start == 500 and ch[0].P.shape == (4, 500)
+    assert np.concatenate([c.x for c in ch]) == approx(np.linspace(*T))
+    assert np.allclose(np.concatenate([c.P for c in ch], axis=1), full.P, rtol=1e-12)
+
+    c = phase_crossings(ch)
+    o = np.lexsort((c.index, c.curve))
+    assert all(np.array_equal(np.asarray(a)[o], b) for a, b in zip(c, full.crossings))
+
+    # the 30 kg/m3 isochore leaves the two-phase region at -84.5 C < T < -84 C
+    i = np.nonzero((c.curve == 0) & (c.before == TWO_PHASE))[0]
+    assert len(i) == 1 and -84.5 < c.x[i[0]] < -84
+    assert c.after[i[0]] == VAPOR
+
+    two = full.phase == TWO_PHASE
+    assert np.allclose(full.P[two], next(saturation_boundary(full.x[two.nonzero()[1]])).P)
+    gas = full.phase == VAPOR
+    assert np.allclose(full.P[gas], xe.P(np.broadcast_to(full.x, gas.shape)[gas],
+                                         np.broadcast_to(rho[:, np.newaxis], gas.shape)[gas]))
+
+
+def test_isotherms_stream():
+    T  = np.array([-90, 20])
+    ch = list(isotherms(T, np.linspace(1, 3000, 7) * kg/m3, chunk=3))
+    assert [c.start for c in ch] == [0, 3, 6]
+    assert np.all(ch[0].phase[1] == SUPERCRITICAL)
+    assert ch[0].phase[0, 0] == VAPOR and ch[-1].phase[0, -1] == LIQUID
+    c = phase_crossings(ch)
+    assert list(c.before[c.curve == 0]) == [VAPOR, TWO_PHASE]
+    assert list(c.after[c.curve == 0])  == [TWO_PHASE, LIQUID]
+
+
+def test_phase_crossings_empty():
+    c = phase_crossings(isochores([30 * kg/m3], np.empty(0)))
+    assert all(len(f) == 0 for f in c)
+    assert c.x.dtype == float and c.before.dtype == np.int8
+    assert len(phase_crossings([]).curve) == 0
@@ -0,0 +1,110 @@
+"""
+Ray tracing
+Intersections of batches of rays with the shapes, in the local frame of
+the shape: centered at the origin, with the axis of cylinders and disks
+along z and the width, heigth and length of bricks along x, y and z.
+
+Rays are arrays of origins and directions of shape (..., 3), broadcast
+against each other and against the parameters of the shape. Directions
+need not be normalized: distances are measured along the unit direction.
+Only the part of a ray ahead of its origin (t >= 0) is considered.
+
+A shape is an intersection of intervals of t: slabs (|z| <= h), infinite
+cylinders (x^2 + y^2 <= R^2) and spheres. Shells are the solid outer shape
+minus the hollow inner one, so a ray can cross their material twice.
+"""
+import numpy as np
+from collections import namedtuple
+
+# Distance of entry (first) and exit (last) of the ray in the material
+# (NaN if the ray misses it) and length of the path in the material
+RayHits = namedtuple('RayHits', 't_in t_out length')
+
+
+def rays(origin, direction):
+    """Origins and unit directions as float arrays of shape (..., 3)"""
+    o = np.asarray(origin, dtype=float)
+    d = np.asarray(direction, dtype=float)
+    if o.shape[-1] != 3 or d.shape[-1] != 3:
+        raise ValueError('origins and directions must have shape (..., 3)')
+    norm = np.linalg.norm(d, axis=-1, keepdims=True)
+    if not np.all(norm > 0):
+        raise ValueError('directions must be non-zero vectors')
+    return o, d / norm
+
+
+def slab_interval(o, d, h):
+    """t with |o + t d| <= h along one axis (o, d: components on the axis)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (-h - o) / d
+        t2 = ( h - o) / d
+    parallel = d == 0
+    inside   = np.abs(o) <= h
+    t0 = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    t1 = np.where(parallel, np.where(inside,  np.inf, -np.inf), np.maximum(t1, t2))
+    return t0, t1
+
+
+def _quadratic_interval(a, b, c):
+    """t with a t^2 + 2 b t + c <= 0 (a >= 0), empty as (inf, -inf)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        disc = b * b - a * c
+        s    = np.sqrt(np.maximum(disc, 0))
+        t0   = (-b - s) / a
+        t1   = (-b + s) / a
+    miss  = disc < 0
+    line  = a == 0     # ray parallel to the axis of a cylinder
+    t0 = np.where(miss, np.inf,  np.where(line, np.where(c <= 0, -np.inf,  np.inf), t0))
+    t1 = np.where(miss, -np.inf, np.where(line, np.where(c <= 0,  np.inf, -np.inf), t1))
+    return t0, t1
+
+
+def cylinder_interval(o, d, R):
+    """t with x^2 + y^2 <= R^2 (infinite cylinder along z)"""
+    ox, oy, dx, dy = o[..., 0], o[..., 1], d[..., 0], d[..., 1]
+    return _quadratic_interval(dx * dx + dy * dy, ox * dx + oy * dy, ox * ox + oy * oy - R * R)
+
+
+def sphere_interval(o, d, R):
+    """t with |o + t d| <= R"""
+    return _quadratic_interval(np.ones(np.broadcast(o[..., 0], d[..., 0]).shape),
+                               np.einsum('...i,...i->...', o, d),
+                               np.einsum('...i,...i->...', o, o) - R * R)
+
+
+def intersect_intervals(*intervals):
+    """Intersection of intervals (t0, t1), empty if t0 > t1"""
+    t0 = intervals[0][0]
+    t1 = intervals[0][1]
+    for a, b in intervals[1:]:
+        t0, t1 = np.maximum(t0, a), np.minimum(t1, b)
+    return t0, t1
+
+
+def _forward(t0, t1):
+    """Interval clipped to t >= 0 and its length (0 if empty)"""
+    t0 = np.maximum(t0, 0)
+    return t0, t1, np.maximum(t1 - t0, 0)
+
+
+def solid_hits(interval):
+    """RayHits of a solid, the interval of t inside it"""
+    t0, t1, length = _forward(*interval)
+    hit = length > 0
+    return RayHits(np.where(hit, t0, np.nan)[()], np.where(hit, t1, np.nan)[()], length[()])
+
+
+def shell_hits(outer, inner):
+    """RayHits of the material between a solid (interval outer) and a
+    hollow contained in it (interval inner)
+    """
+    a0, a1 = outer
+    b0, b1 = inner
+    hollow = b0 < b1
+    # before and after the hollow; the whole outer interval if the ray misses it
+    s0, s1, l0 = _forward(a0, np.where(hollow, np.minimum(a1, b0), a1))
+    r0, r1, l1 = _forward(np.where(hollow, np.maximum(a0, b1), np.inf), a1)
+    length = l0 + l1
+    t_in   = np.where(l0 > 0, s0, np.where(l1 > 0, r0, np.nan))
+    t_out  = np.where(l1 > 0, r1, np.where(l0 > 0, s1, np.nan))
+    return RayHits(t_in[()], t_out[()], length[()])
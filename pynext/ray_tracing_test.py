@@ -0,0 +1,68 @@
+from . Shapes import Sphere, SphereShell, Cylinder, CylinderShell, Disk, Brick, CylinderShellBatch
+from . PhysicalVolume import PhysicalVolume
+from . Material import RadioactiveMaterial
+from pynext.system_of_units import *
+
+from pytest import approx
+import numpy as np
+import pytest
+
+
+def _radius(p):
+    return np.hypot(p[..., 0], p[..., 1])
+
+
+@pytest.mark.parametrize('shape, inside', [
+    (Sphere(1.5),              lambda p: np.linalg.norm(p, axis=-1) <= 1.5),
+    (SphereShell(1, 2),        lambda p: np.abs(np.linalg.norm(p, axis=-1) - 1.5) <= 0.5),
+    (Cylinder(1, 3),           lambda p: (_radius(p) <= 1) & (np.abs(p[..., 2]) <= 1.5)),
+    (CylinderShell(1, 1.5, 3), lambda p: (np.abs(_radius(p) - 1.25) <= 0.25) &
+                                         (np.abs(p[..., 2]) <= 1.5)),
+    (Disk(2, 0.5),             lambda p: (_radius(p) <= 2) & (np.abs(p[..., 2]) <= 0.25)),
+    (Brick(1, 2, 3),           lambda p: np.all(np.abs(p) <= [0.5, 1, 1.5], axis=-1))])
+def test_path_length(shape, inside):
+    rng = np.random.default_rng(7)
+    o   = rng.uniform(-2.5, 2.5, (100, 3))
+    d   = rng.normal(size=(100, 3))
+    h   = shape.intersect(o, d)
+
+    d  /= np.linalg.norm(d, axis=1, keepdims=True)
+    t   = np.linspace(0, 8, 8001)
+    ref = inside(o[:, None] + t[None, :, None] * d[:, None]).sum(axis=1) * (t[1] - t[0])
+    assert np.allclose(h.length, ref, atol=5e-3)
+    hit = h.length > 0
+    assert hit.sum() > 10
+    assert np.all(np.isnan(h.t_in[~hit])) and np.all(h.t_in[hit] >= 0)
+    assert np.all(h.t_out[hit] - h.t_in[hit] >= h.length[hit] - 1e-12)
+
+
+def test_shell_crossings():
+    cs = CylinderShell(1, 1.5, 3)
+    h  = cs.intersect([-3, 0, 0], [2, 0, 0])
+    assert (h.t_in, h.t_out, h.length) == approx((1.5, 4.5, 1.0))
+    h  = cs.intersect([0, 0, 0], [0, 0, 1])
+    assert np.isnan(h.t_in) and h.length == 0
+    assert cs.path_length([0, 0, 0], [1, 0, 1]) == approx(0.5 * np.sqrt(2))
+
+    batch = CylinderShellBatch([1, 2], 3, 10)
+    assert batch.path_length([0, 0, 0], [[1, 0, 0], [0, 1, 0]]) == approx([2, 1])
+
+
+def test_transmittance_along():
+    fe = RadioactiveMaterial('Fe', 7.87 * g/cm3, 0.04 * cm2/g, 0, 0)
+    pv = PhysicalVolume('shell', fe, CylinderShell(50 * cm, 52 * cm, 4 * m))
+    theta = np.array([0, np.pi / 3])
+    d  = np.stack([np.cos(theta), np.zeros(2), np.sin(theta)], axis=-1)
+    T  = pv.transmittance_along(np.zeros(3), d)
+    assert T[0] == approx(pv.transmittance(2 * cm))
+    assert T[1] == approx(np.exp(-fe.mu * 4 * cm))
+
+
+def test_zero_direction():
+    fe = RadioactiveMaterial('Fe', 7.87 * g/cm3, 0.04 * cm2/g, 0, 0)
+    pv = PhysicalVolume('shell', fe, CylinderShell(50 * cm, 52 * cm, 4 * m))
+    d  = np.array([[1., 0, 0], [0, 0, 0]])
+    with pytest.raises(ValueError):
+        pv.shape.intersect(np.zeros(3), d)
+    with pytest.raises(ValueError):
+        pv.transmittance_along(np.zeros(3), d)
@@ -0,0 +1,97 @@
+"""
+Sampling
+Points distributed uniformly in the volume or on the surfaces of the
+shapes, in the local frame of the shape (see ray_tracing): centered at the
+origin, with the axis of cylinders and disks along z.
+
+All the samplers are exact inverse transforms of uniform variates drawn
+from a numpy.random.Generator (no rejection), so n points always take
+the same number of draws:
+- radius in an annulus Rin <= r <= Rout: r = sqrt(Rin^2 + u (Rout^2 - Rin^2)),
+- radius in a spherical shell: r = cbrt(Rin^3 + u (Rout^3 - Rin^3)),
+- direction on a sphere: cos(theta) = 2 u - 1, phi = 2 pi u,
+- face of a brick: chosen with probability proportional to its area.
+
+points(shape, rng, n, chunk) streams the points in chunks of (chunk, 3)
+arrays, so the memory used does not depend on n. Each point takes three
+consecutive variates of rng, so the points of a shape do not depend on
+the chunk size.
+
+Shape batches (see ShapeBatch) give n points for each shape, arrays of
+shape batch_shape + (n, 3), with the parameters of the shapes broadcast
+against the points.
+"""
+import numpy as np
+from math import pi
+
+SURFACES = ('inner', 'outer')
+
+
+def _stack(x, y, z):
+    return np.stack(np.broadcast_arrays(x, y, z), axis=-1)
+
+
+def _uniform(rng, n, *params):
+    """Uniform variates of shape batch + (n, 3), with batch the broadcast
+    shape of params (() for scalars), and params expanded against the n
+    points (p[..., None])
+    """
+    params = [np.asarray(p, dtype=float) for p in params]
+    batch  = np.broadcast(*params).shape
+    u      = rng.random(batch + (n, 3))
+    return (u[..., 0], u[..., 1], u[..., 2]), [p[..., np.newaxis] for p in params]
+
+
+def cylinder_points(rng, n, Rin, Rout, L):
+    """Points in the cylinder shell Rin <= r <= Rout, |z| <= L/2"""
+    (u, v, w), (Rin, Rout, L) = _uniform(rng, n, Rin, Rout, L)
+    r   = np.sqrt(Rin**2 + u * (Rout**2 - Rin**2))
+    phi = 2 * pi * v
+    return _stack(r * np.cos(phi), r * np.sin(phi), L * (w - 0.5))
+
+
+def sphere_points(rng, n, Rin, Rout):
+    """Points in the spherical shell Rin <= r <= Rout"""
+    (u, v, w), (Rin, Rout) = _uniform(rng, n, Rin, Rout)
+    r    = np.cbrt(Rin**3 + u * (Rout**3 - Rin**3))
+    cost = 2 * v - 1
+    sint = np.sqrt(1 - cost**2)
+    phi  = 2 * pi * w
+    return _stack(r * sint * np.cos(phi), r * sint * np.sin(phi), r * cost)
+
+
+def box_points(rng, n, width, heigth, length):
+    """Points in the box |x| <= width/2, |y| <= heigth/2, |z| <= length/2"""
+    (u, v, w), (width, heigth, length) = _uniform(rng, n, width, heigth, length)
+    return _stack(width * (u - 0.5), heigth * (v - 0.5), length * (w - 0.5))
+
+
+def box_surface_points(rng, n, width, heigth, length):
+    """Points on the six faces of a box"""
+    u, (width, heigth, length) = _uniform(rng, n, width, heigth, length)
+    size = np.stack(np.broadcast_arrays(width, heigth, length), axis=-1)   # batch + (1, 3)
+    # faces normal to x, y, z, each twice, chosen by the first variate
+    area = np.stack(np.broadcast_arrays(heigth * length, width * length, width * heigth),
+                    axis=-1)
+    cum  = np.cumsum(np.repeat(area, 2, axis=-1), axis=-1)
+    cum  = cum / cum[..., -1:]
+    face = np.minimum((u[0][..., np.newaxis] >= cum).sum(axis=-1), 5)
+    axis = (face // 2)[..., np.newaxis]
+    p    = (np.stack(u, axis=-1) - 0.5) * size
+    np.put_along_axis(p, axis, np.where(face % 2, 0.5, -0.5)[..., np.newaxis] *
+                      np.take_along_axis(np.broadcast_to(size, p.shape), axis, axis=-1),
+                      axis=-1)
+    return p
+
+
+def points(shape, rng, n, chunk=10**6, surface=None):
+    """Generator of n points of shape (in its volume, or on its surface
+    'inner' or 'outer' if surface is given), in arrays of at most chunk
+    points drawn from rng
+    """
+    if surface is not None and surface not in SURFACES:
+        raise ValueError('surface must be one of {}'.format(SURFACES))
+    for start in range(0, n, chunk):
+        m = min(chunk, n - start)
+        yield (shape.sample_volume(rng, m) if surface is None else
+               shape.sample_surface(rng, m, surface))
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from pytest import approx
+from . system_of_units import *
+from . Shapes import Sphere, SphereShell, Cylinder, CylinderShell, Disk, Brick
+from . sampling import points
+
+shapes = [Sphere(1 * m), SphereShell(50 * cm, 1 * m), Cylinder(1 * m, 2 * m),
+          CylinderShell(50 * cm, 1 * m, 2 * m), Disk(1 * m, 10 * cm),
+          Brick(10 * cm, 20 * cm, 40 * cm)]
+
+
+def _inside(shape, p, eps=1e-9):
+    x, y, z = p.T
+    r, rho = np.sqrt(x**2 + y**2 + z**2), np.hypot(x, y)
+    if isinstance(shape, Sphere):
+        return r <= shape.R + eps
+    if isinstance(shape, SphereShell):
+        return (r >= shape.Rin - eps) & (r <= shape.Rout + eps)
+    if isinstance(shape, Cylinder):
+        return (rho <= shape.R + eps) & (np.abs(z) <= shape.L / 2 + eps)
+    if isinstance(shape, CylinderShell):
+        return (rho >= shape.Rin - eps) & (rho <= shape.Rout + eps) & (np.abs(z) <= shape.L / 2 + eps)
+    if isinstance(shape, Disk):
+        return (rho <= shape.R + eps) & (np.abs(z) <= shape.t / 2 + eps)
+    size = np.array([shape.width, shape.heigth, shape.length])
+    return np.all(np.abs(p) <= size / 2 + eps, axis=1)
+
+
+@pytest.mark.parametrize('shape', shapes, ids=lambda s: type(s).__name__)
+def test_sample_volume_uniform(shape):
+    """Points in the material, with the fraction in half of the material
+    equal to one half (half of the volume by radius or along z)
+    """
+    rng = np.random.default_rng(1)
+    p   = shape.sample_volume(rng, 200000)
+    assert p.shape == (200000, 3)
+    assert np.all(_inside(shape, p))
+    assert np.mean(p[:, 2] > 0) == approx(0.5, abs=0.01)
+    # the volume enclosed by the sphere of radius r is r^3 of the total
+    if isinstance(shape, SphereShell):
+        r    = np.linalg.norm(p, axis=1)
+        half = np.cbrt((shape.Rin**3 + shape.Rout**3) / 2)
+        assert np.mean(r < half) == approx(0.5, abs=0.01)
+    if isinstance(shape, CylinderShell):
+        r    = np.hypot(p[:, 0], p[:, 1])
+        half = np.sqrt((shape.Rin**2 + shape.Rout**2) / 2)
+        assert np.mean(r < half) == approx(0.5, abs=0.01)
+
+
+def test_sample_surface():
+    rng = np.random.default_rng(2)
+    cs  = CylinderShell(50 * cm, 1 * m, 2 * m)
+    assert np.hypot(*cs.sample_surface(rng, 100, 'inner')[:, :2].T) == approx(50 * cm)
+    assert np.hypot(*cs.sample_surface(rng, 100, 'outer')[:, :2].T) == approx(1 * m)
+    ss  = SphereShell(50 * cm, 1 * m)
+    assert np.linalg.norm(ss.sample_surface(rng, 100, 'inner'), axis=1) == approx(50 * cm)
+    assert Disk(1 * m, 10 * cm).sample_surface(rng, 100)[:, 2] == approx(5 * cm)
+
+    # faces of a brick in proportion to their areas
+    b = Brick(10 * cm, 20 * cm, 40 * cm)
+    p = b.sample_surface(rng, 200000)
+    on_z = np.isclose(np.abs(p[:, 2]), 20 * cm)
+    assert np.mean(on_z) == approx(2 * 10 * 20 / b.surface() * cm2, abs=0.01)
+    assert np.all(_inside(b, p))
+
+    with pytest.raises(ValueError):
+        cs.sample_surface(rng, 10, 'side')
+
+
+def test_points_chunks():
+    shape  = CylinderShell(50 * cm, 1 * m, 2 * m)
+    chunks = list(points(shape, np.random.default_rng(3), 25, chunk=10))
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert np.concatenate(chunks) == approx(shape.sample_volume(np.random.default_rng(3), 25))
+    surface = np.concatenate(list(points(shape, np.random.default_rng(3), 25, 7, 'inner')))
+    assert surface == approx(shape.sample_surface(np.random.default_rng(3), 25, 'inner'))
+
+
+def test_sample_batches():
+    from . Shapes import CylinderShellBatch, BrickBatch, DiskBatch, SphereShellBatch
+    rng = np.random.default_rng(4)
+    cs  = CylinderShellBatch([1 * m, 2 * m, 3 * m], 4 * m, 10 * m)
+    p   = cs.sample_volume(rng, 3)
+    assert p.shape == (3, 3, 3)
+    for i, shape in enumerate(cs):
+        assert np.all(_inside(shape, p[i]))
+    r = np.hypot(*cs.sample_surface(rng, 100, 'inner')[..., :2].transpose(2, 0, 1))
+    assert r == approx(np.array([[1], [2], [3]]) * m * np.ones(100))
+
+    b = BrickBatch([1 * m, 2 * m], 2 * m, 3 * m)
+    q = b.sample_surface(rng, 5000)
+    assert q.shape == (2, 5000, 3)
+    for i, shape in enumerate(b):
+        assert np.all(_inside(shape, q[i]))
+        # on a face: some coordinate at half of the size
+        size = np.array([shape.width, shape.heigth, shape.length])
+        assert np.all(np.isclose(np.abs(q[i]), size / 2).any(axis=1))
+        on_x = np.isclose(np.abs(q[i, :, 0]), size[0] / 2)
+        assert np.mean(on_x) == approx(2 * size[1] * size[2] / shape.surface(), abs=0.03)
+
+    d = DiskBatch([1 * m, 2 * m], [2 * cm, 4 * cm]).sample_surface(rng, 4)
+    assert d[..., 2] == approx(np.array([[1], [2]]) * cm * np.ones(4))
+    assert SphereShellBatch([1 * m, 2 * m], 3 * m).sample_volume(rng, 7).shape == (2, 7, 3)
+    assert np.concatenate(list(points(cs, rng, 25, chunk=10)), axis=-2).shape == (3, 25, 3)
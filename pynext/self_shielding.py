@@ -0,0 +1,237 @@
+"""
+Self-shielding of finite geometries
+Fraction of the gammas emitted (uniformly and isotropically) in a
+CylinderShell that enter the volume it encloses, and of the gammas emitted
+in a Disk that leave it through one of its faces.
+
+The fractions are computed as surface integrals (reciprocity):
+
+F = 1 / (4 pi mu V) Integral_S dA Integral dOmega cos(theta) (1 - exp(-mu l))
+
+where S is the exit surface, theta the angle with its normal and l the
+chord through the material from the surface along -Omega. The integral over
+the position on the surface is done analytically for each direction,
+and the remaining two-dimensional integral with a Gauss-Legendre rule,
+vectorized over any number of geometries.
+
+For an infinite slab both reduce to slab_escape_fraction. Note that this
+is the fraction for isotropic emission in three dimensions, which differs
+from the planar-angle model of math_functions.attenuation_factor.
+"""
+import numpy as np
+from math import pi
+from scipy.special import expn
+from scipy.ndimage import map_coordinates, spline_filter
+from . Shapes import CylinderShell, Disk
+from . cache import load_array, save_array
+
+
+def _gauss(n, a, b):
+    x, w = np.polynomial.legendre.leggauss(n)
+    return 0.5 * (b - a) * x + 0.5 * (b + a), 0.5 * (b - a) * w
+
+
+def _broadcast(*args):
+    return [a[..., np.newaxis, np.newaxis] for a in np.broadcast_arrays(*map(np.asarray, args))]
+
+
+def _result(f):
+    return float(f) if f.ndim == 0 else f
+
+
+def slab_escape_fraction(mu, z):
+    """Fraction of the gammas emitted in an infinite slab of thickness z
+    that escape through one face: (1/2 - E3(mu z)) / (2 mu z)
+    """
+    tau = np.asarray(mu * z, dtype=float)
+    return _result((0.5 - expn(3, tau)) / (2 * tau))
+
+
+def cylinder_shell_escape_fraction(mu, Rin, Rout, L, n=48):
+    """Fraction of the gammas emitted in a cylinder shell that leave it
+    through the inner surface. The arguments can be broadcastable arrays.
+
+    For each direction Omega = (cos(theta), sin(theta) cos(psi), sin(theta) sin(psi))
+    (radial, tangential, axial) the chord from the inner surface is the
+    smallest of lr (distance to the outer surface) and the distance to the
+    end face, and the integral along the length is done analytically.
+    """
+    mu, Rin, Rout, L = _broadcast(mu, Rin, Rout, L)
+    c, wc   = _gauss(n, 0, 1)
+    psi, wp = _gauss(n, 0, pi / 2)
+    c, wc   = c[:, np.newaxis], wc[:, np.newaxis]
+    s       = np.sqrt(1 - c**2)
+
+    ox, oy, oz = c, s * np.cos(psi), s * np.sin(psi)
+    a  = ox**2 + oy**2
+    b  = Rin * ox
+    lr = (-b + np.sqrt(b**2 + a * (Rout**2 - Rin**2))) / a
+
+    # integral over z of (1 - exp(-mu l)): the end face is closer than
+    # the outer surface for z > L - lr oz
+    with np.errstate(divide='ignore'):
+        lz = np.minimum(lr, L / oz)
+    d  = lz * oz
+    G  = L - (L - d) * np.exp(-mu * lr) + oz / mu * np.expm1(-mu * lz)
+
+    V  = pi * (Rout**2 - Rin**2) * L
+    I  = 4 * (G * c * wc * wp).sum(axis=(-2, -1))
+    return _result(2 * pi * Rin[..., 0, 0] * I / (4 * pi * mu[..., 0, 0] * V[..., 0, 0]))
+
+
+def disk_escape_fraction(mu, R, t, n=48):
+    """Fraction of the gammas emitted in a disk of radius R and thickness t
+    that leave it through one of its faces. The arguments can be
+    broadcastable arrays.
+
+    For each direction the chord from the face is the smallest of t / cos(theta)
+    and the distance to the rim. Lines parallel to the direction at offset
+    b = R sin(alpha) cross the face along 2 R cos(alpha), and the integral
+    along them is done analytically.
+    """
+    mu, R, t = _broadcast(mu, R, t)
+    c, wc      = _gauss(n, 0, 1)
+    alpha, wa  = _gauss(n, 0, pi / 2)
+    c, wc      = c[:, np.newaxis], wc[:, np.newaxis]
+    s          = np.sqrt(1 - c**2)
+
+    chord = 2 * R * np.cos(alpha)
+    et    = np.exp(-mu * t / c)
+    # part of the chord closer to the rim than t tan(theta), where the rim is hit first
+    m_s   = np.minimum(chord / s, t / c)
+    m     = m_s * s
+    H     = m * et + s / mu * np.expm1(-mu * m_s)
+
+    inner = 2 * (H * R * np.cos(alpha) * wa).sum(axis=-1, keepdims=True)
+    A     = pi * R**2
+    I     = (c * wc * (A * (1 - et) + inner)).sum(axis=(-2, -1))
+    V     = A * t
+    return _result(2 * pi * I / (4 * pi * mu[..., 0, 0] * V[..., 0, 0]))
+
+
+def escape_fraction(mu, shape):
+    """Escape fraction for a CylinderShell (through its inner surface)
+    or a Disk (through one face)
+    """
+    if isinstance(shape, CylinderShell):
+        return cylinder_shell_escape_fraction(mu, shape.Rin, shape.Rout, shape.L)
+    elif isinstance(shape, Disk):
+        return disk_escape_fraction(mu, shape.R, shape.t)
+    else:
+        raise TypeError('no finite-geometry self-shielding for {}'.format(type(shape).__name__))
+
+
+# Dimensionless parameters of the tables: name, range and number of points
+# (uniform in log). The thickness is t = Rout - Rin for cylinder shells.
+_TABLES = {'disk':           (('mu t',   1e-2, 1e2, 41),
+                              ('R/t',    1e-1, 1e3, 41)),
+           'cylinder_shell': (('mu t',   1e-2, 1e2, 33),
+                              ('t/Rin',  1e-3, 1e1, 33),
+                              ('L/t',    1e-1, 1e3, 33))}
+
+
+def _disk_ratio(tau, q):
+    return disk_escape_fraction(tau, q, 1.) / slab_escape_fraction(tau, 1.)
+
+
+def _cylinder_shell_ratio(tau, q1, q2):
+    Rin = 1 / q1
+    return cylinder_shell_escape_fraction(tau, Rin, Rin + 1, q2) / slab_escape_fraction(tau, 1.)
+
+
+class EscapeFractionTable:
+    """Precomputed escape fractions for Disks or CylinderShells, as a
+    function of the dimensionless parameters
+
+    disk:            mu t, R/t
+    cylinder_shell:  mu t, t/Rin, L/t    (t = Rout - Rin)
+
+    The table holds the logarithm of the ratio to the infinite slab, on a grid
+    uniform in the logarithm of the parameters (extended by PAD nodes beyond
+    each end, to keep the spline boundary conditions away from the domain),
+    and is interpolated with cubic splines. The maximum relative interpolation
+    error (max_error), measured at the centers of the grid cells when the table
+    is built, is about 1e-4.
+    Geometries outside the table are computed with the quadrature.
+
+    Tables are stored in the pynext cache directory and memory-mapped.
+    """
+    VERSION = 1
+    PAD     = 4
+
+    def __init__(self, geometry='cylinder_shell', cache=True):
+        self.geometry = geometry
+        self.params   = _TABLES[geometry]
+        self.ratio    = _disk_ratio if geometry == 'disk' else _cylinder_shell_ratio
+        self.lo       = np.log([p[1] for p in self.params])
+        self.hi       = np.log([p[2] for p in self.params])
+        self.shape    = tuple(p[3] for p in self.params)
+        self.h        = (self.hi - self.lo) / (np.array(self.shape) - 1)
+
+        name = 'escape_fraction_{}_v{}'.format(geometry, self.VERSION)
+        meta = dict(version=self.VERSION, params=[list(p) for p in self.params])
+        coeffs, stored = load_array(name, meta) if cache else (None, None)
+        if coeffs is None:
+            pad    = self.PAD
+            axes   = [np.exp(np.linspace(l - pad * h, u + pad * h, n + 2 * pad))
+                      for l, u, h, n in zip(self.lo, self.hi, self.h, self.shape)]
+            grid   = np.meshgrid(*axes, indexing='ij')
+            coeffs = spline_filter(np.log(self._ratio(grid)), order=3, mode='nearest')
+            self.coeffs    = coeffs
+            self.max_error = self._max_error()
+            if cache:
+                save_array(name, coeffs, dict(meta, max_error=self.max_error))
+        else:
+            self.coeffs    = coeffs
+            self.max_error = stored['max_error']
+
+    def _max_error(self):
+        axes = [np.exp(np.linspace(l + h / 2, u - h / 2, n - 1))
+                for l, u, h, n in zip(self.lo, self.hi, self.h, self.shape)]
+        grid = np.meshgrid(*axes, indexing='ij')
+        return float(np.abs(self._interpolate(grid) / self._ratio(grid) - 1).max())
+
+    def _ratio(self, grid, chunk=1024):
+        """ratio to the slab over the grid, in chunks to bound the memory used"""
+        flat = [g.ravel() for g in grid]
+        r    = np.concatenate([self.ratio(*[f[i:i + chunk] for f in flat])
+                               for i in range(0, flat[0].size, chunk)])
+        return r.reshape(grid[0].shape)
+
+    def _interpolate(self, q):
+        idx = [(np.log(x) - l) / h + self.PAD for x, l, h in zip(q, self.lo, self.h)]
+        return np.exp(map_coordinates(np.asarray(self.coeffs), np.array(idx), order=3,
+                                      mode='nearest', prefilter=False))
+
+    def _parameters(self, mu, *dims):
+        if self.geometry == 'disk':
+            R, t = dims
+            return t, [mu * t, R / t]
+        Rin, Rout, L = dims
+        t = Rout - Rin
+        return t, [mu * t, t / Rin, L / t]
+
+    def __call__(self, mu, *dims):
+        """Escape fraction for mu, R, t (disk) or mu, Rin, Rout, L (cylinder_shell),
+        which can be broadcastable arrays
+        """
+        args = np.broadcast_arrays(*map(lambda x: np.asarray(x, dtype=float), (mu,) + dims))
+        t, q = self._parameters(*args)
+        inside = np.all([(x >= p[1]) & (x <= p[2]) for x, p in zip(q, self.params)], axis=0)
+
+        f = np.empty(t.shape)
+        if np.any(inside):
+            f[inside] = (self._interpolate([x[inside] for x in q]) *
+                         slab_escape_fraction(q[0][inside], 1.))
+        if not np.all(inside):
+            out    = ~inside
+            direct = disk_escape_fraction if self.geometry == 'disk' else cylinder_shell_escape_fraction
+            f[out] = direct(*[a[out] for a in args])
+        return _result(f)
+
+    def __str__(self):
+        return '<EscapeFractionTable: {}, parameters {}, max error = {:.2e}>'.format(
+                self.geometry, ', '.join('{} in [{:g}, {:g}]'.format(*p[:3]) for p in self.params),
+                self.max_error)
+
+    __repr__ = __str__
@@ -0,0 +1,59 @@
+import numpy as np
+from . system_of_units import *
+from . self_shielding import slab_escape_fraction
+from . self_shielding import cylinder_shell_escape_fraction
+from . self_shielding import disk_escape_fraction
+from . self_shielding import EscapeFractionTable
+from . montecarlo import cylinder_shell_escape_fraction_mc
+from . montecarlo import disk_escape_fraction_mc
+from . NextData import next100_lead_shield
+
+from pytest import approx
+from pytest import fixture
+
+
+@fixture(scope='module')
+def lead():
+    n100_pb = next100_lead_shield()
+    return n100_pb.cv.body, n100_pb.cv.head
+
+
+def test_thin_geometries():
+    tau = np.array([0.05, 0.5, 5.])
+    slab = slab_escape_fraction(tau, 1)
+    assert np.allclose(disk_escape_fraction(tau / cm, 100 * m, 1 * cm), slab, rtol=1e-4)
+    assert np.allclose(cylinder_shell_escape_fraction(tau / cm, 100 * m, 100 * m + 1 * cm,
+                                                      1000 * m), slab, rtol=1e-3)
+
+
+def test_cylinder_shell_mc(lead):
+    body, _ = lead
+    s   = body.shape
+    mu  = body.material.mu
+    est = cylinder_shell_escape_fraction_mc(mu, s.Rin, s.Rout, s.L, n=10**6, seed=1)
+    assert cylinder_shell_escape_fraction(mu, s.Rin, s.Rout, s.L) == approx(est.value,
+                                                                            abs=5 * est.error)
+    assert body.activity_bi214_finite_self_shield() == approx(body.activity_bi214 * est.value,
+                                                              abs=5 * est.error * body.activity_bi214)
+
+
+def test_disk_mc(lead):
+    _, head = lead
+    s   = head.shape
+    mu  = head.material.mu
+    est = disk_escape_fraction_mc(mu, s.R, s.t, n=10**6, seed=1)
+    assert disk_escape_fraction(mu, s.R, s.t) == approx(est.value, abs=5 * est.error)
+
+
+def test_escape_fraction_table(tmp_path, monkeypatch, lead):
+    monkeypatch.setenv('PYNEXT_CACHE_DIR', str(tmp_path))
+    _, head = lead
+    s  = head.shape
+    mu = head.material.mu
+
+    table = EscapeFractionTable('disk')
+    assert table.max_error < 1e-3
+    R = s.R * np.linspace(0.5, 2, 10)
+    assert np.allclose(table(mu, R, s.t), disk_escape_fraction(mu, R, s.t), rtol=table.max_error)
+    assert EscapeFractionTable('disk').max_error == table.max_error
+    assert table(mu, 1e5 * s.t, s.t) == approx(disk_escape_fraction(mu, 1e5 * s.t, s.t))
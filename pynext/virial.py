@@ -0,0 +1,96 @@
+"""
+Virial coefficients
+Second virial coefficient of xenon in reduced form (corresponding states):
+
+B*(T*) = B0*(T*) + L^2 B1*(T*) + L^4 B2*(T*) + L^6 B3*(T*) + L^3 Bp*(T*)
+
+with T* = T / (epsilon / k) and L = Lambda*, and the second virial
+coefficients of xenon-helium mixtures used by XeHe.
+
+All functions take scalars or arrays. The reduced coefficients are fitted
+in the ranges T* < 1.1 and 1.1 <= T* < 10, and vanish above.
+"""
+import numpy as np
+from math import pi
+from . system_of_units import *
+
+
+def _piecewise(T, low, high):
+    """low(T) for T < 1.1, high(T) for 1.1 <= T < 10, 0 above"""
+    T = np.asarray(T, dtype=float)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        return np.select([T < 1.1, T < 10], [low(T), high(T)], 0.)[()]
+
+
+def b0s(T):
+    return _piecewise(T,
+        lambda T: - np.sqrt(T) * np.exp(1/T) * (1.18623 + 1.00824 * T + 4.25571 * T**2 -
+                                                18.6033 * T**3 + 20.4732 * T**4 - 8.71903 * T**5 +
+                                                1.14829 * T**6),
+        lambda T: - np.sqrt(T) * np.exp(1/T) * (0.74685 - 1.0384 * np.log(T) +
+                                                0.31634 * np.log(T)**2 - 0.02096 * np.log(T)**3 -
+                                                0.01498 * np.log(T)**4))
+
+
+def b1s(T):
+    return _piecewise(T,
+        lambda T: T**(-3/2) * np.exp(1/T) * (0.158192 - 0.037145 * T - 0.0103125 * T**2 +
+                                             0.0701852 * T**3 - 0.0328399 * T**4),
+        lambda T: T**(-3/2) * np.exp(1/T) * (0.148 + 0.0241 * np.log(T) - 0.0123 * np.log(T)**2 +
+                                             0.0096 * np.log(T)**3 - 0.0014 * np.log(T)**4))
+
+
+def b2s(T):
+    B2 = lambda T: T**(-7/2) * np.exp(1/T) * (0.0152 + 0.0126 * T + 0.0001 * T**2)
+    return _piecewise(T, B2, B2)
+
+
+def b3s(T):
+    return _piecewise(T,
+        lambda T: T**(-11/2) * np.exp(1/T) * (0.001 + 0.006 * T - 0.0197 * T**3 +
+                                              0.032 * T**4 - 0.0128 * T**5),
+        lambda T: T**(-11/2) * np.exp(1/T) * (0.0051 - 0.0112 * T - 0.0021 * T**2))
+
+
+def bps(T):
+    return np.zeros(np.shape(T))[()]
+
+
+def bs(T, Ls):
+    """Reduced second virial coefficient B*(T*) for Lambda* = Ls"""
+    return b0s(T) + Ls**2 * b1s(T) + Ls**4 * b2s(T) + Ls**6 * b3s(T) + Ls**3 * bps(T)
+
+
+def second_virial(T, ek, sigma, Ls, N_A):
+    """B(T) = 2/3 pi N_A sigma^3 B*(T / ek)"""
+    return (2/3) * pi * N_A * sigma**3 * bs(np.asarray(T, dtype=float) / ek, Ls)
+
+
+# Xenon-helium mixtures (as in XeHe: B of xenon in m3/mol; B of helium
+# and the cross coefficient B12 as numbers)
+
+def b_xe(T):
+    b0  = 5.797E-5  * (meter**3/mol)
+    L   = 1.6940
+    ekb = 181.8     #K
+    D   = np.exp(ekb / np.asarray(T, dtype=float)) - 1
+    return b0 * (1 - (L**3 - 1) * D)
+
+
+def b_he(T):
+    return 11.885370 + 6.6508722E-3 * T - 3.305894E-5 * T**2 + 3.1354694E-8 * T**3
+
+
+def b_12(T):
+    return 2.756941E-4 + (4.617880) / T - 1.741538 / T**3 + 1.364453E+2 / T**3
+
+
+def b_xehe(T, x1=0.15, x2=0.85):
+    """B of a mixture of fractions x1 of helium and x2 of xenon"""
+    return x1**2 * b_he(T) + x2**2 * b_xe(T) + 2 * x1 * x2 * b_12(T)
+
+
+def b_mixture(T, zHe, zXe):
+    """B of xenon (zXe == 1), helium (zHe == 1) or of their mixture"""
+    T, zHe, zXe = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (T, zHe, zXe)))
+    return np.where(zXe == 1, b_xe(T), np.where(zHe == 1, b_he(T), b_xehe(T, zHe, zXe)))[()]
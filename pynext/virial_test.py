@@ -0,0 +1,37 @@
+from . virial import b0s, b1s, b2s, b3s, bs, b_mixture, b_xe, b_he
+from . XenonES import XenonES, XeHe
+from pynext.system_of_units import *
+
+from pytest import approx
+import numpy as np
+
+
+def test_reduced_coefficients():
+    T = np.array([0.6, 1.0, 1.1, 2.0, 9.9, 10, 20])
+    for b in (b0s, b1s, b2s, b3s):
+        B = b(T)
+        assert B.shape == T.shape
+        assert np.all(B[-2:] == 0)
+        assert all(b(t) == approx(Bt) for t, Bt in zip(T, B))
+    assert b0s(0.6) == approx(-np.sqrt(0.6) * np.exp(1/0.6) *
+                              (1.18623 + 1.00824 * 0.6 + 4.25571 * 0.6**2 - 18.6033 * 0.6**3 +
+                               20.4732 * 0.6**4 - 8.71903 * 0.6**5 + 1.14829 * 0.6**6))
+    assert bs(2.0, 0.06) == approx(b0s(2.0) + 0.06**2 * b1s(2.0) + 0.06**4 * b2s(2.0) +
+                                   0.06**6 * b3s(2.0))
+
+
+def test_mixtures():
+    T = np.array([250., 300.])
+    assert np.allclose(b_mixture(T, 0, 1), b_xe(T))
+    assert np.allclose(b_mixture(T, 1, 0), b_he(T))
+
+    xe = XenonES()
+    assert xe.P2(np.array([0, 20]), 89.9 * kg/m3)[1] == approx(xe.P2(20, 89.9 * kg/m3))
+
+    tc  = np.linspace(0, 40, 5)
+    xHe = np.array([0, 0.1, 0.2])
+    m   = np.array([50, 100]) * kg
+    pB  = XeHe.grid(m, 1 * m3, tc, xHe).pB()
+    assert pB.shape == (5, 3, 2)
+    assert pB[2, 1, 1] == approx(XeHe(100 * kg, 1 * m3, 20, 0.1, 0.9).pB(20))
+    assert pB[2, 0, 1] == approx(XeHe(100 * kg, 1 * m3, 20, 0, 1).pB(20))
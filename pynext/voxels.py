@@ -0,0 +1,221 @@
+"""
+Voxels
+Rasterization of placed physical volumes onto a regular 3D grid of voxels.
+Each voxel holds the id of its material (0 for void, i for the i-th
+material of the model), the density and the activity density (activity
+per unit volume) of Bi-214 and Tl-208, in the internal units of
+system_of_units.
+
+A voxel belongs to a volume if its center is in the material of the shape
+(Shape.contains). Volumes are placed by translation only (shapes keep
+their axis along z) and are painted in order, so a later placement
+overrides an earlier one where they overlap.
+
+The grids are .npy files in a directory, written and read as memory maps,
+so that grids of 1000^3 voxels (4 GB per float32 array) are paged from
+disk instead of held in memory. The arrays are laid out (nz, ny, nx), so
+that a slab of z planes is one contiguous block of each file. They are
+filled by slabs, each slab vectorized per shape over its bounding box;
+with workers > 1 the slabs are filled in parallel by worker processes,
+each writing its own block of the memory maps.
+
+Materials must have a single density: XenonMaterials with an array of
+densities are rejected (use material.replace(rho=...) for each density).
+"""
+import os
+import json
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from . system_of_units import *
+
+# A PhysicalVolume with its shape centered at center (x, y, z)
+Placement = namedtuple('Placement', 'name volume center')
+
+# Grid of nx, ny, nz voxels of size spacing (dx, dy, dz), from the corner
+# origin (x, y, z) of voxel (0, 0, 0); the arrays have shape (nz, ny, nx)
+VoxelGrid = namedtuple('VoxelGrid', 'origin spacing dims')
+
+ARRAYS = {'material':       np.uint16,
+          'density':        np.float32,
+          'activity_bi214': np.float32,
+          'activity_tl208': np.float32}
+
+# What is painted for each placement: shape, center and voxel values
+_Paint = namedtuple('_Paint', 'shape center id density activity_bi214 activity_tl208')
+
+
+def grid_around(placements, spacing, margin=0):
+    """VoxelGrid of voxels of size spacing (scalar or (dx, dy, dz))
+    enclosing the bounding boxes of the placements, plus margin
+    """
+    spacing = np.broadcast_to(np.asarray(spacing, dtype=float), (3,))
+    lo = np.min([np.asarray(p.center) - p.volume.shape.half_extent() for p in placements], axis=0)
+    hi = np.max([np.asarray(p.center) + p.volume.shape.half_extent() for p in placements], axis=0)
+    lo, hi = lo - margin, hi + margin
+    dims = np.maximum(np.ceil((hi - lo) / spacing - 1e-9).astype(int), 1)
+    return VoxelGrid(tuple(float(x) for x in lo), tuple(float(d) for d in spacing),
+                     tuple(int(n) for n in dims))
+
+
+def voxel_centers(grid, axis, start=0, stop=None):
+    """Centers of the voxels start:stop along axis (0, 1, 2 for x, y, z)"""
+    stop = grid.dims[axis] if stop is None else stop
+    return grid.origin[axis] + (np.arange(start, stop) + 0.5) * grid.spacing[axis]
+
+
+def _index_range(grid, axis, lo, hi, start, stop):
+    """Voxels of start:stop along axis whose centers are in [lo, hi]"""
+    o, d = grid.origin[axis], grid.spacing[axis]
+    i0   = int(np.ceil((lo - o) / d - 0.5))
+    i1   = int(np.floor((hi - o) / d - 0.5)) + 1
+    return max(i0, start), min(i1, stop)
+
+
+def _paints(placements):
+    """_Paint of each placement and the names of the materials (by id)"""
+    ids, names, paints = {}, ['void'], []
+    for p in placements:
+        m = p.volume.material
+        if m not in ids:
+            ids[m] = len(names)
+            names.append(m.name)
+        if np.ndim(m.rho):
+            raise ValueError('{}: material {} has an array of densities {}, '
+                             'voxels need a single one'.format(p.name, m.name, np.shape(m.rho)))
+        a_bi214 = getattr(m, 'mass_activity_bi214', 0)
+        a_tl208 = getattr(m, 'mass_activity_tl208', 0)
+        paints.append(_Paint(p.volume.shape, tuple(float(c) for c in p.center), ids[m],
+                             float(m.rho), float(m.rho * a_bi214), float(m.rho * a_tl208)))
+    return paints, names
+
+
+def _fill_slab(directory, grid, paints, k0, k1):
+    """Paints the z planes k0:k1 of the grids of directory"""
+    arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r+')
+              for name in ARRAYS}
+    nx, ny, _ = grid.dims
+    for p in paints:
+        h = p.shape.half_extent()
+        (i0, i1), (j0, j1), (l0, l1) = (
+            _index_range(grid, a, p.center[a] - h[a], p.center[a] + h[a], 0, n)
+            for a, n in enumerate((nx, ny, k1)))
+        l0 = max(l0, k0)
+        if i0 >= i1 or j0 >= j1 or l0 >= l1:
+            continue
+        x = voxel_centers(grid, 0, i0, i1) - p.center[0]
+        y = voxel_centers(grid, 1, j0, j1) - p.center[1]
+        z = voxel_centers(grid, 2, l0, l1) - p.center[2]
+        points = np.stack(np.broadcast_arrays(x[None, None, :], y[None, :, None],
+                                              z[:, None, None]), axis=-1)
+        inside = p.shape.contains(points)
+        for name, value in (('material', p.id), ('density', p.density),
+                            ('activity_bi214', p.activity_bi214),
+                            ('activity_tl208', p.activity_tl208)):
+            block = arrays[name][l0:l1, j0:j1, i0:i1]
+            block[inside] = value
+    for a in arrays.values():
+        a.flush()
+
+
+class Voxels:
+    """Voxelized model in directory: grid, material names (by id) and the
+    memory-mapped arrays (nz, ny, nx) material, density, activity_bi214
+    and activity_tl208.
+    """
+
+    def __init__(self, directory, mode='r'):
+        with open(os.path.join(directory, 'voxels.json')) as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.grid      = VoxelGrid(tuple(meta['origin']), tuple(meta['spacing']),
+                                   tuple(meta['dims']))
+        self.materials = meta['materials']
+        self.volumes   = meta['volumes']
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, name + '.npy'), mmap_mode=mode))
+
+    def index(self, point):
+        """Index (k, j, i) in the arrays of the voxel containing point
+        (x, y, z). Raises IndexError for points outside the grid.
+        """
+        ijk = np.floor((np.asarray(point, dtype=float) - self.grid.origin) / self.grid.spacing)
+        if not np.all((ijk >= 0) & (ijk < self.grid.dims)):
+            raise IndexError('point {} outside the grid {}'.format(tuple(point), self.grid))
+        return tuple(int(i) for i in ijk[::-1])
+
+    @property
+    def voxel_volume(self):
+        return float(np.prod(self.grid.spacing))
+
+    def mass(self, slab=8):
+        """Mass of the material of the grid, summed by contiguous slabs of z planes"""
+        nz = self.grid.dims[2]
+        return sum(float(self.density[k:k + slab].sum(dtype=float))
+                   for k in range(0, nz, slab)) * self.voxel_volume
+
+    def __str__(self):
+        return '<Voxels: {} voxels of {} mm, {} materials in {}>'.format(
+                'x'.join(str(n) for n in self.grid.dims),
+                'x'.join('{:.4g}'.format(d / mm) for d in self.grid.spacing),
+                len(self.materials) - 1, self.directory)
+
+    __repr__ = __str__
+
+
+def voxelize(placements, grid, directory, slab=8, workers=1):
+    """Voxels of the placements (painted in order) on grid, written to
+    directory, filling slabs of slab z planes with workers processes
+    """
+    placements = list(placements)
+    paints, names = _paints(placements)
+    os.makedirs(directory, exist_ok=True)
+    for name, dtype in ARRAYS.items():
+        a = np.lib.format.open_memmap(os.path.join(directory, name + '.npy'), mode='w+',
+                                      dtype=dtype, shape=tuple(grid.dims[::-1]))
+        del a
+    with open(os.path.join(directory, 'voxels.json'), 'w') as f:
+        json.dump(dict(origin    = [float(x) for x in grid.origin],
+                       spacing   = [float(x) for x in grid.spacing],
+                       dims      = [int(n) for n in grid.dims],
+                       materials = names,
+                       volumes   = [p.name for p in placements]), f, indent=2)
+
+    nz     = grid.dims[2]
+    slabs  = [(k, min(k + slab, nz)) for k in range(0, nz, slab)]
+    if workers == 1:
+        for k0, k1 in slabs:
+            _fill_slab(directory, grid, paints, k0, k1)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for fut in [pool.submit(_fill_slab, directory, grid, paints, k0, k1)
+                        for k0, k1 in slabs]:
+                fut.result()
+    return Voxels(directory)
+
+
+def vessel_placements(vessel, center=(0, 0, 0)):
+    """Placements of the body and the two heads of an assembly Vessel"""
+    cvd = vessel.cvd
+    c   = np.asarray(center, dtype=float)
+    dz  = np.array([0, 0, (cvd.L + cvd.th_head) / 2])
+    head = vessel.heads.volume
+    return [Placement(vessel.path + '/body',  vessel.body.volume, tuple(c)),
+            Placement(vessel.path + '/head-', head, tuple(c - dz)),
+            Placement(vessel.path + '/head+', head, tuple(c + dz))]
+
+
+def assembly_placements(component, center=(0, 0, 0)):
+    """Placements of an Assembly with all its components coaxial and
+    centered at center: Vessels as body and heads, and components with a
+    volume counted once. Components counted several times (e.g, field
+    cage electrodes) have no position in the assembly and are skipped.
+    """
+    from . Assembly import Vessel
+    placements = []
+    for _, c in component.walk():
+        if isinstance(c, Vessel):
+            placements.extend(vessel_placements(c, center))
+        elif c.volume is not None and c.count == 1 and not isinstance(c.parent, Vessel):
+            placements.append(Placement(c.path, c.volume, tuple(center)))
+    return placements
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from pytest import approx
+from . system_of_units import *
+from . Material import RadioactiveMaterial, XenonMaterial
+from . PhysicalVolume import PhysicalVolume
+from . Shapes import Brick, CylinderShell, Sphere
+from . Assembly import next100_assembly
+from . voxels import Placement, VoxelGrid, grid_around, voxelize, assembly_placements
+
+fe = RadioactiveMaterial('Fe', 8 * g/cm3,  0.04 * cm2/g, 1 * mBq/kg, 2 * mBq/kg)
+cu = RadioactiveMaterial('Cu', 9 * g/cm3,  0.04 * cm2/g, 3 * mBq/kg, 0)
+
+
+def test_contains():
+    cs = CylinderShell(50 * cm, 52 * cm, 1 * m)
+    p  = np.array([[51 * cm, 0, 0], [0, 49 * cm, 0], [0, 51 * cm, 60 * cm]])
+    assert list(cs.contains(p)) == [True, False, False]
+    assert cs.half_extent() == (52 * cm, 52 * cm, 50 * cm)
+
+
+def test_voxelize(tmp_path):
+    brick  = PhysicalVolume('brick',  fe, Brick(20 * cm, 20 * cm, 20 * cm))
+    sphere = PhysicalVolume('sphere', cu, Sphere(5 * cm))
+    placements = [Placement('brick', brick, (0, 0, 0)),
+                  Placement('sphere', sphere, (0, 0, 5 * cm))]
+    grid = VoxelGrid((-15 * cm,) * 3, (5 * mm,) * 3, (60, 60, 60))
+    v    = voxelize(placements, grid, str(tmp_path / 'a'), slab=4)
+
+    assert v.materials == ['void', 'Fe', 'Cu']
+    assert v.material[v.index((0, 0, 5 * cm))] == 2
+    assert v.material[v.index((0, 0, -5 * cm))] == 1
+    assert v.material[v.index((12 * cm, 0, 0))] == 0
+    assert v.density[v.index((0, 0, -5 * cm))] == approx(8 * g/cm3, rel=1e-6)
+    assert v.activity_bi214[v.index((0, 0, 5 * cm))] == approx(9 * g/cm3 * 3 * mBq/kg, rel=1e-6)
+
+    # brick exactly, sphere within the discretization
+    n_sphere = np.sum(v.material == 2)
+    assert n_sphere * v.voxel_volume == approx(sphere.V, rel=0.05)
+    assert np.sum(v.material == 1) * v.voxel_volume == approx(brick.V - n_sphere * v.voxel_volume)
+
+    # the grid does not depend on the slabs or on the number of workers
+    w = voxelize(placements, grid, str(tmp_path / 'b'), slab=16, workers=2)
+    assert np.array_equal(v.material, w.material)
+    assert np.array_equal(v.activity_tl208, w.activity_tl208)
+
+    # z planes are contiguous blocks of the files
+    assert v.density.shape == (60, 60, 60) and v.density[:4].flags['C_CONTIGUOUS']
+    with pytest.raises(IndexError):
+        v.index((0, 0, -16 * cm))
+    with pytest.raises(IndexError):
+        v.index((15 * cm, 0, 0))
+
+
+def test_layout_and_errors(tmp_path):
+    brick = PhysicalVolume('brick', fe, Brick(2 * cm, 4 * cm, 6 * cm))
+    grid  = VoxelGrid((-5 * cm,) * 3, (1 * cm,) * 3, (10, 12, 14))
+    v     = voxelize([Placement('brick', brick, (0, 0, 0))], grid, str(tmp_path / 'a'))
+    assert v.material.shape == (14, 12, 10)
+    assert v.material.sum(axis=(1, 2)).tolist().count(8) == 6    # 2 x 4 voxels per z plane
+    assert v.index((-5 * cm, -5 * cm, 8.9 * cm)) == (13, 0, 0)
+
+    xe = PhysicalVolume('gas', XenonMaterial([10, 20] * np.ones(2) * kg/m3), Sphere(1 * cm))
+    with pytest.raises(ValueError):
+        voxelize([Placement('gas', xe, (0, 0, 0))], grid, str(tmp_path / 'b'))
+
+
+def test_assembly_voxels(tmp_path):
+    placements = assembly_placements(next100_assembly())
+    names      = [p.name for p in placements]
+    assert 'next100/lead_shield/head+' in names
+    assert 'next100/field_cage' in names
+    assert not any('electrodes' in n for n in names)
+
+    shell = [p for p in placements if p.name == 'next100/copper_shield/body'][0]
+    grid  = grid_around([shell], 2 * cm)
+    v     = voxelize([shell], grid, str(tmp_path / 'cs'))
+    assert v.mass() == approx(shell.volume.mass, rel=0.05)